@@ -0,0 +1,172 @@
+import io
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import matplotlib.pyplot as plt
+
+from chart_data import figure_charts, series_table, vega_spec
+
+# Rasterização de figuras matplotlib fora da thread do script.
+#
+# As figuras são enviadas para um conjunto de workers à medida que são criadas; o script
+# continua a correr e, a cada nova figura, os espaços reservados (st.empty) cujas imagens
+# já estão prontas são preenchidos; no fim espera-se pelas restantes. Se o conjunto de
+# processos falhar (BrokenProcessPool) é descartado, as figuras em falta são renderizadas
+# de forma síncrona e a reexecução seguinte cria um conjunto novo. O mesmo acontece se as
+# figuras pendentes não ficarem prontas em RENDER_TIMEOUT segundos (worker bloqueado);
+# figuras que não se deixam serializar (pickle) são renderizadas logo na thread do script. A concorrência é configurada por variáveis de ambiente:
+#
+#   OPCOES_RENDER_WORKERS  número de workers (0 = renderização síncrona com st.pyplot)
+#   OPCOES_RENDER_POOL     "process" (por omissão) ou "thread"
+#   OPCOES_RENDER_TIMEOUT  espera máxima (s) pelas figuras pendentes no fim da execução
+#   OPCOES_CHART_MODE      "png" (por omissão) ou "data": figuras só com linhas são enviadas
+#                          como dados binários (Arrow) e desenhadas no browser (chart_data.py)
+#
+# A renderização Agg mantém o GIL, pelo que só processos dão paralelismo real; com um
+# único CPU a omissão é renderizar de forma síncrona.
+
+_cpus = os.cpu_count() or 1
+RENDER_WORKERS = int(os.environ.get("OPCOES_RENDER_WORKERS", min(4, _cpus) if _cpus > 1 else 0))
+RENDER_POOL = os.environ.get("OPCOES_RENDER_POOL", "process")
+RENDER_TIMEOUT = float(os.environ.get("OPCOES_RENDER_TIMEOUT", 30))
+RENDER_DPI = 200
+CHART_MODE = os.environ.get("OPCOES_CHART_MODE", "png")
+
+_executor = None
+
+
+# Os workers são criados por fork: com "spawn" ou "forkserver" cada processo voltaria a
+# executar o script da aplicação, que o Streamlit regista como __main__. Para não fazer
+# fork a meio de uma execução, com outras threads do servidor a segurar locks, o conjunto
+# é criado e os processos lançados logo na importação do módulo (e, depois de uma falha,
+# no início da reexecução seguinte), antes de haver figuras em renderização.
+def _new_executor():
+    if RENDER_POOL == "thread" or "fork" not in multiprocessing.get_all_start_methods():
+        return ThreadPoolExecutor(max_workers=RENDER_WORKERS)
+    executor = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("fork"))
+    try:
+        executor.submit(os.getpid).result(timeout=RENDER_TIMEOUT)
+    except (BrokenProcessPool, TimeoutError):
+        reset_executor(executor)
+        return None
+    return executor
+
+
+def get_executor():
+    global _executor
+    if _executor is None and RENDER_WORKERS > 0:
+        _executor = _new_executor()
+    return _executor
+
+
+# Descarta um conjunto avariado ou bloqueado, terminando os processos que ainda existam
+def reset_executor(executor):
+    global _executor
+    if _executor is executor:
+        _executor = None
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def render_png(fig, dpi=RENDER_DPI):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def _render_pickled(data, dpi=RENDER_DPI):
+    return render_png(pickle.loads(data), dpi)
+
+
+class FigureQueue:
+    def __init__(self, st, executor=None, mode=CHART_MODE):
+        self.st = st
+        self.executor = executor if executor is not None else get_executor()
+        self.mode = mode
+        self.pending = {}
+        # Tamanho dos dados e tempo de preparação de cada gráfico enviado como dados
+        self.stats = []
+
+    # Substituto de st.pyplot: reserva o lugar do gráfico e envia a figura para renderizar
+    def pyplot(self, fig):
+        if self.mode == "data" and self._send_data(fig):
+            return
+        if self.executor is None:
+            self.st.pyplot(fig)
+            plt.close(fig)
+            return
+
+        placeholder = self.st.empty()
+        try:
+            if isinstance(self.executor, ProcessPoolExecutor):
+                future = self.executor.submit(_render_pickled, pickle.dumps(fig))
+            else:
+                future = self.executor.submit(render_png, fig)
+        except BrokenProcessPool:
+            self._discard_executor()
+            self._fill(placeholder, fig, None)
+            return
+        except (pickle.PicklingError, TypeError, AttributeError):
+            self._fill(placeholder, fig, None)
+            return
+        self.pending[future] = (placeholder, fig)
+        self._drain()
+
+    def _discard_executor(self):
+        if self.executor is not None:
+            reset_executor(self.executor)
+            self.executor = None
+
+    def _fill(self, placeholder, fig, future):
+        try:
+            image = future.result() if future is not None else render_png(fig)
+        except BrokenProcessPool:
+            self._discard_executor()
+            image = render_png(fig)
+        placeholder.image(image)
+        plt.close(fig)
+
+    # Preenche, sem esperar, os lugares cujas imagens já estão prontas
+    def _drain(self):
+        for future in [f for f in self.pending if f.done()]:
+            self._fill(*self.pending.pop(future), future)
+
+    def _send_data(self, fig):
+        charts = figure_charts(fig)
+        if charts is None:
+            return False
+        for chart in charts:
+            # Tamanho dos buffers Arrow da tabela, sem a serializar: o Streamlit fá-lo ao enviá-la
+            start = time.perf_counter()
+            table = series_table(chart["series"])
+            self.stats.append({
+                "chart": chart["title"] or chart["ylabel"],
+                "points": sum(len(x) for _, _, x, _ in chart["series"]),
+                "sent": table.num_rows if "series" in table.column_names else table.num_rows * (table.num_columns - 1),
+                "bytes": table.nbytes,
+                "ms": (time.perf_counter() - start) * 1e3,
+            })
+            self.st.vega_lite_chart(table, vega_spec(chart, table))
+        plt.close(fig)
+        return True
+
+    # Preenche os lugares restantes pela ordem em que as imagens ficam prontas; as que não
+    # ficarem prontas a tempo são renderizadas aqui e o conjunto de workers é descartado
+    def flush(self, timeout=RENDER_TIMEOUT):
+        try:
+            for future in as_completed(list(self.pending), timeout=timeout):
+                self._fill(*self.pending.pop(future), future)
+        except TimeoutError:
+            self._discard_executor()
+            for future in list(self.pending):
+                self._fill(*self.pending.pop(future), None)
+
+
+# Lançamento dos workers na importação, com todas as funções do módulo já definidas
+get_executor()
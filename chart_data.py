@@ -0,0 +1,261 @@
+import argparse
+import json
+import os
+
+import matplotlib.colors as mcolors
+import numpy as np
+import pyarrow as pa
+
+import kernels
+from timing import best_time
+
+# Dados dos gráficos enviados ao browser como buffers binários em vez de imagens PNG.
+#
+# As curvas de uma figura matplotlib (linhas em coordenadas de dados) são lidas
+# diretamente dos arrays NumPy das linhas, convertidas para float32 e embrulhadas em
+# tabelas Arrow sem passar por listas Python (pa.array sobre um array contíguo não copia).
+# O Streamlit envia a tabela ao front-end em formato Arrow IPC e o gráfico é desenhado com
+# Vega-Lite. Curvas com mais de CHART_POINTS pontos são reduzidas por LTTB (Largest
+# Triangle Three Buckets), que mantém picos e mudanças de inclinação.
+
+CHART_POINTS = int(os.environ.get("OPCOES_CHART_POINTS", 1000))
+
+
+# Índices dos n_out pontos escolhidos pelo LTTB: o primeiro, o último e, em cada balde
+# intermédio, o ponto que forma o maior triângulo com o ponto anterior escolhido e a
+# média do balde seguinte
+def lttb(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    if kernels.JIT_ENABLED:
+        return kernels.lttb_jit(x, y, edges, keep)
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+# Traços e marcadores matplotlib equivalentes em Vega-Lite (strokeDash em px, shape);
+# o "x" não existe em Vega-Lite e é desenhado como caminho SVG
+DASHES = {"-": None, "--": [6, 4], ":": [1.5, 3], "-.": [6, 3, 1.5, 3]}
+MARKERS = {
+    "o": "circle", ".": "circle", "s": "square", "D": "diamond", "d": "diamond", "+": "cross",
+    "^": "triangle-up", "v": "triangle-down", "<": "triangle-left", ">": "triangle-right",
+    "x": "M-1,-1L1,1M-1,1L1,-1",
+}
+
+
+def _line_style(line):
+    linestyle, marker = line.get_linestyle(), line.get_marker()
+    return {
+        "dash": DASHES.get(linestyle),
+        "line": linestyle not in ("None", "", " "),
+        "marker": None if marker in ("None", "", " ", None) else MARKERS.get(marker, "circle"),
+        "filled": line.get_fillstyle() != "none" and marker not in ("x", "+"),
+        "width": line.get_linewidth(),
+        "opacity": 1.0 if line.get_alpha() is None else line.get_alpha(),
+    }
+
+
+# Linha de referência (axvline / axhline a toda a altura ou largura do eixo): ("x" | "y", valor),
+# ou None se a linha não for uma delas
+def _reference_line(ax, line):
+    transform = line.get_transform()
+    for axis, along, other in (("x", line.get_xdata(), line.get_ydata()), ("y", line.get_ydata(), line.get_xdata())):
+        blended = ax.get_xaxis_transform(which="grid") if axis == "x" else ax.get_yaxis_transform(which="grid")
+        if transform is blended and along[0] == along[-1] and list(other) == [0, 1]:
+            return axis, float(along[0])
+    return None
+
+
+# Curvas de cada eixo da figura: [{"title", "xlabel", "ylabel", "series": [(nome, cor, x, y)],
+# "styles": [estilo de cada curva], "rules": [linhas de referência]}]. Devolve None se a
+# figura tiver algo que o gráfico Vega-Lite não reproduz (áreas, barras, histogramas, texto,
+# eixos gémeos, linhas noutras coordenadas), caso em que deve ser enviada como imagem.
+def figure_charts(fig):
+    charts = []
+    for ax in fig.axes:
+        if ax.patches or ax.collections or ax.images or ax.texts or len(ax.get_shared_x_axes().get_siblings(ax)) > 1:
+            return None
+        series, styles, rules = [], [], []
+        for i, line in enumerate(ax.get_lines()):
+            label = line.get_label()
+            name = label if not label.startswith("_") else None
+            color = mcolors.to_hex(line.get_color())
+            if line.get_transform() is ax.transData:
+                series.append((name or f"Série {i + 1}", color, np.asarray(line.get_xdata()), np.asarray(line.get_ydata())))
+                styles.append(_line_style(line))
+                continue
+            reference = _reference_line(ax, line)
+            if reference is None:
+                return None
+            rules.append({"axis": reference[0], "value": reference[1], "name": name, "color": color, **_line_style(line)})
+        if not series:
+            continue
+        charts.append({
+            "title": ax.get_title(), "xlabel": ax.get_xlabel(), "ylabel": ax.get_ylabel(),
+            "series": series, "styles": styles, "rules": rules,
+        })
+    return charts or None
+
+
+# Tabela Arrow com colunas float32. Se todas as curvas partilham o eixo x (o caso habitual,
+# p.ex. S_range), formato largo: x e uma coluna y0, y1, ... por curva, com os índices LTTB
+# das várias curvas reunidos; caso contrário, formato longo (x, y, série), com a série
+# codificada como dicionário (códigos int16 + nomes).
+def series_table(series, max_points=CHART_POINTS):
+    names = [name for name, _, _, _ in series]
+    x0 = series[0][2]
+    if all(len(x) == len(x0) and (x is x0 or np.array_equal(x, x0)) for _, _, x, _ in series):
+        x = np.ascontiguousarray(x0, dtype=np.float32)
+        ys = [np.ascontiguousarray(y, dtype=np.float32) for _, _, _, y in series]
+        if max_points and len(x) > max_points:
+            keep = np.unique(np.concatenate([lttb(x, y, max_points) for y in ys]))
+            x, ys = x[keep], [y[keep] for y in ys]
+        return pa.table({"x": pa.array(x), **{f"y{i}": pa.array(y) for i, y in enumerate(ys)}})
+
+    xs, ys, lengths = [], [], []
+    for _, _, x, y in series:
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        y = np.ascontiguousarray(y, dtype=np.float32)
+        if max_points and len(x) > max_points:
+            keep = lttb(x, y, max_points)
+            x, y = x[keep], y[keep]
+        xs.append(x)
+        ys.append(y)
+        lengths.append(len(x))
+    codes = np.repeat(np.arange(len(series), dtype=np.int16), lengths)
+    return pa.table({
+        "x": pa.array(np.concatenate(xs)),
+        "y": pa.array(np.concatenate(ys)),
+        "series": pa.DictionaryArray.from_arrays(pa.array(codes), pa.array(names)),
+    })
+
+
+def _mark(style, kind):
+    mark = {"type": kind, "strokeWidth": style["width"], "opacity": style["opacity"]}
+    if style["dash"]:
+        mark["strokeDash"] = style["dash"]
+    return mark
+
+
+# Gráfico Vega-Lite em camadas com as cores, traços e marcadores das linhas matplotlib:
+# uma camada por curva (no formato largo a coluna y{i} da curva passa a y) e uma camada
+# "rule" por linha de referência. As linhas de referência com legenda entram na escala de cor.
+def vega_spec(chart, table):
+    wide = "series" not in table.column_names
+    x = {"field": "x", "type": "quantitative", "title": chart["xlabel"], "scale": {"zero": False}}
+    y = {"field": "y", "type": "quantitative", "title": chart["ylabel"]}
+    names, colors = [], []
+    for name, color in [(n, c) for n, c, _, _ in chart["series"]] + [(r["name"], r["color"]) for r in chart["rules"]]:
+        if name is not None and name not in names:
+            names.append(name)
+            colors.append(color)
+    color = {"field": "series", "type": "nominal", "title": None, "scale": {"domain": names, "range": colors}}
+
+    layers = []
+    for i, ((name, _, _, _), style) in enumerate(zip(chart["series"], chart["styles"])):
+        if not style["line"] and not style["marker"]:
+            continue
+        if wide:
+            transform = [{"calculate": f"datum.y{i}", "as": "y"}, {"calculate": json.dumps(name), "as": "series"}]
+        else:
+            transform = [{"filter": {"field": "series", "equal": name}}]
+        point = {"shape": style["marker"], "filled": style["filled"]} if style["marker"] else None
+        if style["line"]:
+            mark = _mark(style, "line")
+            if point:
+                mark["point"] = point
+        else:
+            mark = {**_mark(style, "point"), **point}
+        layers.append({"transform": transform, "mark": mark, "encoding": {"x": x, "y": y, "color": color}})
+
+    for rule in chart["rules"]:
+        axis = x if rule["axis"] == "x" else y
+        value = {axis["field"]: rule["value"]}
+        encoding = {rule["axis"]: axis}
+        mark = _mark(rule, "rule")
+        if rule["name"] is None:
+            mark["color"] = rule["color"]
+        else:
+            value["series"] = rule["name"]
+            encoding["color"] = color
+        layers.append({"data": {"values": [value]}, "mark": mark, "encoding": encoding})
+
+    return {"title": chart["title"], "layer": layers}
+
+
+# Formatos de transporte, para medição
+
+def encode_arrow(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+# Cabeçalho JSON (colunas, comprimento, dtype) seguido das colunas float32 little-endian
+# escritas num único buffer
+def encode_float32(columns):
+    names = list(columns)
+    n = len(columns[names[0]])
+    header = json.dumps({"columns": names, "length": n, "dtype": "<f4"}).encode()
+    data = np.empty(len(names) * n, dtype="<f4")
+    for i, name in enumerate(names):
+        data[i * n:(i + 1) * n] = columns[name]
+    return b"".join([len(header).to_bytes(4, "little"), header, memoryview(data)])
+
+
+def encode_json(columns):
+    return json.dumps({name: np.asarray(values).tolist() for name, values in columns.items()}).encode()
+
+# Tamanho e tempo de serialização de um gráfico com as curvas dadas ({nome: y}, x comum)
+def payload_report(x, curves, max_points=CHART_POINTS):
+    columns = {"x": x, **curves}
+    series = [(name, "#000000", x, y) for name, y in curves.items()]
+    rows = []
+    for label, fn in [
+        ("JSON (listas)", lambda: encode_json(columns)),
+        ("float32 LE", lambda: encode_float32(columns)),
+        ("Arrow IPC", lambda: encode_arrow(series_table(series, max_points=None))),
+        (f"Arrow IPC + LTTB ({max_points})", lambda: encode_arrow(series_table(series, max_points))),
+    ]:
+        payload, elapsed = best_time(fn)
+        rows.append((label, len(payload), elapsed))
+    return rows
+
+
+def main():
+    from pricing import black_scholes, black_scholes_greeks
+
+    parser = argparse.ArgumentParser(description="Tamanho e tempo de serialização dos dados dos gráficos")
+    parser.add_argument("--points", type=int, nargs="+", default=[100, 10_000, 1_000_000])
+    parser.add_argument("--max-points", type=int, default=CHART_POINTS)
+    args = parser.parse_args()
+
+    # Gráficos da página "Preço do Ativo Subjacente": preços e deltas de calls e puts
+    lttb(np.arange(10.0), np.arange(10.0), 5)
+    for n in args.points:
+        S_range = np.linspace(70, 130, n)
+        call_prices, put_prices = black_scholes(S_range, 100, 0.05, 1.0, 0.2)
+        greeks = black_scholes_greeks(S_range, 100, 0.05, 1.0, 0.2)
+        for chart, curves in [
+            ("preços", {"call": call_prices, "put": put_prices}),
+            ("deltas", {"call_delta": greeks["call_delta"], "put_delta": greeks["put_delta"]}),
+        ]:
+            print(f"{chart}, {n} pontos por curva")
+            for label, size, elapsed in payload_report(S_range, curves, args.max_points):
+                print(f"  {label:<28}{size / 1e3:>12.1f} kB{elapsed * 1e3:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from payoffs import call_payoff, put_payoff, binary_call_payoff, binary_put_payoff
+from pricing import black_scholes, d1_d2
+from timing import measure
+
+# Contratos de opções num array estruturado NumPy: um registo compacto (33 bytes) por
+# contrato, com campos tipados. Estratégias são simplesmente arrays de contratos (pernas)
+# e todas as funções abaixo operam sobre o array inteiro de uma vez.
+
+OPTION_TYPES = ["call", "put", "binary_call", "binary_put"]
+CALL, PUT, BINARY_CALL, BINARY_PUT = range(4)
+
+CONTRACT_DTYPE = np.dtype([
+    ("type", np.uint8),
+    ("strike", np.float64),
+    ("expiry", np.float64),
+    ("quantity", np.float64),
+    ("premium", np.float64),
+])
+
+PAYOFFS = [call_payoff, put_payoff, binary_call_payoff, binary_put_payoff]
+
+
+def make_contracts(option_type, strike, expiry=1.0, quantity=1.0, premium=0.0):
+    option_type = np.asarray(option_type)
+    if option_type.dtype.kind in "US":
+        names, inverse = np.unique(option_type, return_inverse=True)
+        option_type = np.array([OPTION_TYPES.index(str(n)) for n in names], dtype=np.uint8)[inverse.reshape(option_type.shape)]
+
+    fields = np.broadcast_arrays(option_type, strike, expiry, quantity, premium)
+    contracts = np.empty(fields[0].size, dtype=CONTRACT_DTYPE)
+    for name, values in zip(CONTRACT_DTYPE.names, fields):
+        contracts[name] = values.ravel()
+    return contracts
+
+
+def _per_contract(contracts, S):
+    S = np.asarray(S, dtype=float)
+    column = (-1,) + (1,) * S.ndim
+    return S, column
+
+
+# Payoff unitário de cada contrato no vencimento: array (n_contratos, *S.shape)
+def contract_payoffs(contracts, S):
+    S, column = _per_contract(contracts, S)
+    strike = contracts["strike"].reshape(column)
+    out = np.empty((len(contracts),) + S.shape)
+    for code in np.unique(contracts["type"]):
+        rows = contracts["type"] == code
+        out[rows] = PAYOFFS[code](S, strike[rows])
+    return out
+
+
+# Preço Black-Scholes unitário de cada contrato (binárias: cash-or-nothing de 1€)
+def contract_prices(contracts, S, r, vol):
+    S, column = _per_contract(contracts, S)
+    K = contracts["strike"].reshape(column)
+    T = contracts["expiry"].reshape(column)
+    kind = contracts["type"].reshape(column)
+
+    call, put = black_scholes(S, K, r, T, vol)
+    _, d2 = d1_d2(S, K, r, T, vol)
+    discount = np.exp(-r * T)
+    return np.select(
+        [kind == CALL, kind == PUT, kind == BINARY_CALL],
+        [call, put, discount * norm.cdf(d2)],
+        discount * norm.cdf(-d2),
+    )
+
+
+# Delta Black-Scholes unitário de cada contrato
+def contract_deltas(contracts, S, r, vol):
+    S, column = _per_contract(contracts, S)
+    K = contracts["strike"].reshape(column)
+    T = contracts["expiry"].reshape(column)
+    kind = contracts["type"].reshape(column)
+
+    d1, d2 = d1_d2(S, K, r, T, vol)
+    call_delta = norm.cdf(d1)
+    binary_delta = np.exp(-r * T) * norm.pdf(d2) / (S * vol * np.sqrt(T))
+    return np.select(
+        [kind == CALL, kind == PUT, kind == BINARY_CALL],
+        [call_delta, call_delta - 1, binary_delta],
+        -binary_delta,
+    )
+
+
+# Payoff, lucro e valor de uma estratégia: soma das pernas ponderadas pela quantidade
+def _weighted_sum(contracts, values):
+    quantity = contracts["quantity"].reshape((-1,) + (1,) * (values.ndim - 1))
+    return (quantity * values).sum(axis=0)
+
+
+# Payoff de cada perna já multiplicado pela quantidade (negativo nas posições curtas)
+def leg_payoffs(contracts, S):
+    values = contract_payoffs(contracts, S)
+    return contracts["quantity"].reshape((-1,) + (1,) * (values.ndim - 1)) * values
+
+
+def strategy_payoff(contracts, S):
+    return _weighted_sum(contracts, contract_payoffs(contracts, S))
+
+
+def strategy_profit(contracts, S):
+    return strategy_payoff(contracts, S) - np.dot(contracts["quantity"], contracts["premium"])
+
+
+def strategy_value(contracts, S, r, vol):
+    return _weighted_sum(contracts, contract_prices(contracts, S, r, vol))
+
+
+def strategy_delta(contracts, S, r, vol):
+    return _weighted_sum(contracts, contract_deltas(contracts, S, r, vol))
+
+
+# Pernas das estratégias da página "Estratégias de Opções"
+def strategy_contracts(name, K1, K2=None, K3=None, expiry=1.0):
+    legs = {
+        "Bull Spread": (["call", "call"], [K1, K2], [1, -1]),
+        "Bear Spread": (["put", "put"], [K2, K1], [1, -1]),
+        "Straddle": (["call", "put"], [K1, K1], [1, 1]),
+        "Strangle": (["call", "put"], [K2, K1], [1, 1]),
+        "Butterfly Spread": (["call", "call", "call"], [K1, K2, K3], [1, -2, 1]),
+        "Risk Reversal": (["put", "call"], [K1, K2], [-1, 1]),
+    }
+    option_type, strike, quantity = legs[name]
+    return make_contracts(option_type, strike, expiry, quantity)
+
+
+# Sliders de exercício de cada estratégia, pela ordem da página: (rótulo, limite inferior,
+# limite superior, valor inicial); o limite inferior é função dos valores anteriores, como
+# nos st.slider encadeados. Partilhado pela aplicação e pela exportação estática.
+STRATEGY_SLIDERS = {
+    "Bull Spread": [("Preço de Exercício Mais Baixo (€)", lambda: 70, 100, 90), ("Preço de Exercício Mais Alto (€)", lambda K1: K1, 130, 110)],
+    "Bear Spread": [("Preço de Exercício Mais Baixo (€)", lambda: 70, 100, 90), ("Preço de Exercício Mais Alto (€)", lambda K1: K1, 130, 110)],
+    "Straddle": [("Preço de Exercício (€)", lambda: 70, 130, 100)],
+    "Strangle": [("Preço de Exercício da Put (€)", lambda: 70, 100, 90), ("Preço de Exercício da Call (€)", lambda K1: K1, 130, 110)],
+    "Butterfly Spread": [
+        ("Preço de Exercício Mais Baixo (€)", lambda: 70, 90, 80),
+        ("Preço de Exercício Médio (€)", lambda K1: K1 + 10, 110, 100),
+        ("Preço de Exercício Mais Alto (€)", lambda K1, K2: K2 + 10, 130, 120),
+    ],
+    "Risk Reversal": [("Preço de Exercício da Put (€)", lambda: 70, 95, 90), ("Preço de Exercício da Call (€)", lambda K1: 105, 130, 110)],
+}
+
+# Memória de n contratos: array estruturado vs lista de dicionários vs DataFrame
+def memory_benchmark(n=1_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    types = rng.integers(0, 4, n)
+    strikes = rng.integers(50, 151, n).astype(float)
+    expiries = rng.choice([0.25, 0.5, 1.0, 2.0], n)
+    quantities = rng.integers(-10, 11, n).astype(float)
+    premiums = rng.uniform(0, 20, n)
+
+    rows = []
+    contracts, size, _, elapsed = measure(lambda: make_contracts(types.astype(np.uint8), strikes, expiries, quantities, premiums))
+    rows.append(("array estruturado", size, elapsed))
+
+    names = np.array(OPTION_TYPES)[types].tolist()
+    columns = [strikes.tolist(), expiries.tolist(), quantities.tolist(), premiums.tolist()]
+    records, size, _, elapsed = measure(lambda: [
+        {"type": t, "strike": k, "expiry": e, "quantity": q, "premium": p}
+        for t, k, e, q, p in zip(names, *columns)
+    ])
+    rows.append(("lista de dicionários", size, elapsed))
+    del records
+
+    frame = pd.DataFrame({"type": names, "strike": strikes, "expiry": expiries, "quantity": quantities, "premium": premiums})
+    rows.append(("DataFrame (type como texto)", frame.memory_usage(deep=True).sum(), None))
+    frame["type"] = frame["type"].astype("category")
+    rows.append(("DataFrame (type categórico)", frame.memory_usage(deep=True).sum(), None))
+
+    S = np.linspace(50, 150, 100)
+    start = time.perf_counter()
+    strategy_payoff(contracts[:100_000], S)
+    rows.append(("payoff de 10^5 contratos x 100 preços", None, time.perf_counter() - start))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contratos de opções em arrays estruturados")
+    parser.add_argument("command", choices=["benchmark"])
+    parser.add_argument("-n", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{args.n} contratos")
+    for label, size, elapsed in memory_benchmark(args.n):
+        size_text = f"{size / 1e6:10.1f} MB" if size is not None else " " * 13
+        time_text = f"{elapsed * 1e3:10.1f} ms" if elapsed is not None else ""
+        print(f"{label:<40}{size_text}{time_text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import pandas as pd
+
+# Leitura de ficheiros locais de dados (CSV ou Parquet), dados por caminho ou como ficheiro
+# carregado no Streamlit. O formato é escolhido pela extensão do nome.
+
+CHUNK_ROWS = 100_000
+
+
+def open_source(source):
+    if hasattr(source, "read"):
+        source.seek(0)
+        return source
+    return open(source, "rb")
+
+
+def source_name(source):
+    return getattr(source, "name", str(source))
+
+
+def is_parquet(source):
+    return source_name(source).lower().endswith(".parquet")
+
+
+# Ficheiro inteiro num DataFrame
+def read_frame(source):
+    f = open_source(source)
+    try:
+        return pd.read_parquet(f) if is_parquet(source) else pd.read_csv(f)
+    finally:
+        if f is not source:
+            f.close()
+
+
+# Nomes das colunas, sem ler os dados
+def column_names(source):
+    f = open_source(source)
+    try:
+        if not is_parquet(source):
+            return list(pd.read_csv(f, nrows=0).columns)
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            return list(pd.read_parquet(f).columns)
+        return list(pq.ParquetFile(f).schema_arrow.names)
+    finally:
+        if f is not source:
+            f.close()
+
+
+# Blocos de até chunk_rows linhas como DataFrames (só as colunas pedidas, se dadas); sem
+# pyarrow, um Parquet é lido inteiro num só bloco
+def iter_frames(source, chunk_rows=CHUNK_ROWS, columns=None):
+    f = open_source(source)
+    try:
+        if not is_parquet(source):
+            yield from pd.read_csv(f, usecols=columns, chunksize=chunk_rows)
+            return
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            yield pd.read_parquet(f, columns=columns)
+            return
+        for batch in pq.ParquetFile(f).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    finally:
+        if f is not source:
+            f.close()
@@ -0,0 +1,272 @@
+import argparse
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from payoffs import call_payoff, put_payoff
+from surface_cache import FIELDS as PRICE_FIELDS, exact_fields
+from timing import measure
+
+# Avaliação por blocos de grelhas S x K x T demasiado grandes para a memória.
+#
+# A grelha é percorrida na ordem C (S mais lento, T mais rápido) em blocos de no máximo
+# `chunk_size` pontos. Cada bloco é um sub-tensor contíguo da grelha (vários planos K x T,
+# várias linhas de T ou um troço de uma linha), calculado por broadcasting como no caminho
+# em memória, sem arrays de índices. Os blocos são entregues a redutores (extremos,
+# momentos, histogramas, esboço de quantis) ou escritos em disco; a memória máxima depende
+# só do tamanho do bloco.
+
+CHUNK_SIZE = 1 << 18
+PAYOFF_FIELDS = ["call_payoff", "put_payoff"]
+FIELDS = PAYOFF_FIELDS + PRICE_FIELDS
+
+
+def _block_slices(shape, chunk_size):
+    n_S, n_K, n_T = shape
+    plane, row = n_K * n_T, n_T
+    if chunk_size >= plane:
+        step = chunk_size // plane
+        for i in range(0, n_S, step):
+            yield slice(i, min(i + step, n_S)), slice(0, n_K), slice(0, n_T)
+    elif chunk_size >= row:
+        step = chunk_size // row
+        for i in range(n_S):
+            for j in range(0, n_K, step):
+                yield slice(i, i + 1), slice(j, min(j + step, n_K)), slice(0, n_T)
+    else:
+        for i in range(n_S):
+            for j in range(n_K):
+                for k in range(0, n_T, chunk_size):
+                    yield slice(i, i + 1), slice(j, j + 1), slice(k, min(k + chunk_size, n_T))
+
+
+# Gerador de (posição inicial na grelha achatada, {campo: valores 1-D do bloco})
+def iter_grid_blocks(S, K, T, fields=("call", "put"), r=0.05, vol=0.2, chunk_size=CHUNK_SIZE):
+    S, K, T = (np.asarray(x, dtype=float).ravel() for x in (S, K, T))
+    shape = (len(S), len(K), len(T))
+    price_fields = [f for f in fields if f in PRICE_FIELDS]
+
+    for s, k, t in _block_slices(shape, chunk_size):
+        S_b, K_b, T_b = S[s, None, None], K[None, k, None], T[None, None, t]
+        block_shape = (len(S_b), K_b.shape[1], T_b.shape[2])
+        start = (s.start * shape[1] + k.start) * shape[2] + t.start
+
+        values = exact_fields(S_b, K_b, r, T_b, vol, price_fields) if price_fields else {}
+        if "call_payoff" in fields:
+            values["call_payoff"] = call_payoff(S_b, K_b)
+        if "put_payoff" in fields:
+            values["put_payoff"] = put_payoff(S_b, K_b)
+        yield start, {f: np.broadcast_to(values[f], block_shape).reshape(-1) for f in fields}
+
+
+# Mínimo e máximo, com as posições na grelha achatada
+class Extrema:
+    def __init__(self):
+        self.min, self.max = math.inf, -math.inf
+        self.argmin = self.argmax = -1
+
+    def update(self, start, values):
+        i, j = int(values.argmin()), int(values.argmax())
+        if values[i] < self.min:
+            self.min, self.argmin = float(values[i]), start + i
+        if values[j] > self.max:
+            self.max, self.argmax = float(values[j]), start + j
+
+    def result(self):
+        return {"min": self.min, "argmin": self.argmin, "max": self.max, "argmax": self.argmax}
+
+
+# Contagem, soma, média e desvio-padrão, combinando os blocos pela fórmula de Chan
+# (estável mesmo com muitos blocos)
+class Moments:
+    def __init__(self):
+        self.count, self.sum, self.mean, self.m2 = 0, 0.0, 0.0, 0.0
+
+    def update(self, start, values):
+        n = len(values)
+        if not n:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta**2 * self.count * n / total
+        self.sum += mean * n
+        self.count = total
+
+    def result(self):
+        std = math.sqrt(self.m2 / self.count) if self.count else math.nan
+        return {"count": self.count, "sum": self.sum, "mean": self.mean, "std": std}
+
+
+# Histograma com limites fixos; os valores fora de [low, high] contam à parte
+class Histogram:
+    def __init__(self, low, high, bins=50):
+        self.edges = np.linspace(low, high, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.below = self.above = 0
+
+    def update(self, start, values):
+        self.counts += np.histogram(values, self.edges)[0]
+        self.below += int((values < self.edges[0]).sum())
+        self.above += int((values > self.edges[-1]).sum())
+
+    def result(self):
+        return {"edges": self.edges, "counts": self.counts, "below": self.below, "above": self.above}
+
+
+# Esboço de quantis com erro relativo garantido (DDSketch): cada valor conta num balde
+# logarítmico ceil(log_gamma |x|), com gamma = (1 + a) / (1 - a); o valor representativo
+# do balde está a menos de a (relativo) de qualquer valor que lá caia. Os valores com
+# |x| < min_value contam como zero. A memória é o número de baldes ocupados.
+class QuantileSketch:
+    def __init__(self, relative_accuracy=0.01, min_value=1e-9):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.stores = {1: (0, np.zeros(0, dtype=np.int64)), -1: (0, np.zeros(0, dtype=np.int64))}
+        self.zeros = 0
+
+    def _add(self, sign, keys):
+        if not len(keys):
+            return
+        offset, counts = self.stores[sign]
+        lo, hi = int(keys.min()), int(keys.max())
+        if not len(counts):
+            offset = lo
+        new_offset = min(offset, lo)
+        size = max(offset + len(counts), hi + 1) - new_offset
+        if new_offset != offset or size != len(counts):
+            grown = np.zeros(size, dtype=np.int64)
+            grown[offset - new_offset:offset - new_offset + len(counts)] = counts
+            offset, counts = new_offset, grown
+        counts += np.bincount(keys - offset, minlength=len(counts))
+        self.stores[sign] = (offset, counts)
+
+    def update(self, start, values):
+        magnitude = np.abs(values)
+        small = magnitude < self.min_value
+        self.zeros += int(small.sum())
+        keys = np.ceil(np.log(np.where(small, 1.0, magnitude)) / self.log_gamma).astype(np.int64)
+        self._add(1, keys[(values > 0) & ~small])
+        self._add(-1, keys[(values < 0) & ~small])
+
+    def quantiles(self, q):
+        # Valores representativos em ordem crescente: negativos (do maior |x| ao menor),
+        # zero, positivos
+        neg_offset, neg = self.stores[-1]
+        pos_offset, pos = self.stores[1]
+        centre = lambda keys: 2 * self.gamma**keys / (self.gamma + 1)
+        values = np.concatenate([
+            -centre(np.arange(neg_offset, neg_offset + len(neg)))[::-1], [0.0],
+            centre(np.arange(pos_offset, pos_offset + len(pos))),
+        ])
+        counts = np.concatenate([neg[::-1], [self.zeros], pos])
+        cumulative = np.cumsum(counts)
+        rank = np.asarray(q, dtype=float) * (cumulative[-1] - 1)
+        return values[np.searchsorted(cumulative, rank, side="right")]
+
+    def result(self, q=(0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)):
+        return dict(zip(q, self.quantiles(q)))
+
+
+# Escreve a grelha num .npy (sequencialmente, bloco a bloco); o ficheiro pode depois ser
+# lido com np.load(..., mmap_mode="r") com a forma (n_S, n_K, n_T)
+class NpyWriter:
+    def __init__(self, path, shape, dtype=np.float32):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.file = open(path, "wb")
+        header = {"descr": np.lib.format.dtype_to_descr(self.dtype), "fortran_order": False, "shape": tuple(shape)}
+        np.lib.format.write_array_header_2_0(self.file, header)
+        self.written = 0
+
+    def update(self, start, values):
+        if start != self.written:
+            raise ValueError("Os blocos têm de chegar pela ordem da grelha")
+        values.astype(self.dtype).tofile(self.file)
+        self.written += len(values)
+
+    def result(self):
+        self.file.close()
+        return {"path": self.path, "elements": self.written, "bytes": os.path.getsize(self.path)}
+
+
+# Percorre a grelha uma vez e entrega cada bloco a todos os redutores do seu campo
+# ({campo: [redutor, ...]}). Devolve {campo: [resultado, ...]}.
+def stream_grid(S, K, T, reducers, r=0.05, vol=0.2, chunk_size=CHUNK_SIZE):
+    for start, block in iter_grid_blocks(S, K, T, list(reducers), r, vol, chunk_size):
+        for field, values in block.items():
+            for reducer in reducers[field]:
+                reducer.update(start, values)
+    return {field: [reducer.result() for reducer in group] for field, group in reducers.items()}
+
+def _axes(n_S, n_K, n_T):
+    return np.linspace(50, 150, n_S), np.linspace(60, 140, n_K), np.linspace(0.05, 2.0, n_T)
+
+
+# Grelha inteira em memória e as mesmas reduções, para comparação
+def in_memory_summary(S, K, T, field="call", r=0.05, vol=0.2):
+    S_g, K_g, T_g = S[:, None, None], K[None, :, None], T[None, None, :]
+    if field in PRICE_FIELDS:
+        values = exact_fields(S_g, K_g, r, T_g, vol, [field])[field]
+    else:
+        values = (call_payoff if field == "call_payoff" else put_payoff)(S_g, K_g)
+        values = np.broadcast_to(values, (len(S), len(K), len(T)))
+    return {"min": float(values.min()), "max": float(values.max()), "mean": float(values.mean()),
+            "q50": float(np.quantile(values, 0.5))}
+
+
+def benchmark(shape=(200, 200, 100), field="call", chunk_sizes=(1 << 14, 1 << 16, 1 << 18, 1 << 20)):
+    S, K, T = _axes(*shape)
+    rows = []
+    exact, _, peak, elapsed = measure(lambda: in_memory_summary(S, K, T, field))
+    rows.append(("em memória", peak, elapsed, exact["max"], exact["mean"], exact["q50"]))
+    for chunk_size in chunk_sizes:
+        reducers = {field: [Extrema(), Moments(), QuantileSketch()]}
+        (extrema, moments, sketch), _, peak, elapsed = measure(lambda: stream_grid(S, K, T, reducers, chunk_size=chunk_size)[field])
+        rows.append((f"blocos de {chunk_size}", peak, elapsed, extrema["max"], moments["mean"], sketch[0.5]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avaliação por blocos de grelhas S x K x T")
+    parser.add_argument("command", choices=["benchmark", "summary"])
+    parser.add_argument("--shape", type=int, nargs=3, default=[200, 200, 100], metavar=("N_S", "N_K", "N_T"))
+    parser.add_argument("--field", choices=FIELDS, default="call")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--range", type=float, nargs=2, default=[0.0, 100.0], metavar=("LOW", "HIGH"),
+                        help="limites do histograma")
+    parser.add_argument("--out", default=None, help="ficheiro .npy onde escrever a grelha (float32)")
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        print(f"grelha {' x '.join(map(str, args.shape))} = {np.prod(args.shape):,} pontos, campo {args.field}")
+        print(f"{'modo':<20}{'memória máx.':>14}{'tempo (s)':>11}{'pontos/s':>12}{'máximo':>10}{'média':>10}{'mediana':>10}")
+        for label, peak, elapsed, maximum, mean, median in benchmark(tuple(args.shape), args.field):
+            print(f"{label:<20}{peak / 1e6:>11.1f} MB{elapsed:>11.2f}{np.prod(args.shape) / elapsed:>12.2e}"
+                  f"{maximum:>10.4f}{mean:>10.4f}{median:>10.4f}")
+        return
+
+    S, K, T = _axes(*args.shape)
+    reducers = {args.field: [Extrema(), Moments(), Histogram(*args.range, bins=20), QuantileSketch()]}
+    out = args.out or os.path.join(tempfile.gettempdir(), f"grid_{args.field}.npy")
+    reducers[args.field].append(NpyWriter(out, args.shape))
+    results, _, peak, elapsed = measure(lambda: stream_grid(S, K, T, reducers, chunk_size=args.chunk_size))
+    extrema, moments, histogram, sketch, written = results[args.field]
+
+    print(f"{moments['count']:,} pontos em {elapsed:.2f}s, memória máxima {peak / 1e6:.1f} MB")
+    for label, key in (("mínimo", "min"), ("máximo", "max")):
+        i, j, k = np.unravel_index(extrema["arg" + key], args.shape)
+        print(f"{label}: {extrema[key]:.4f} em S={S[i]:.2f}, K={K[j]:.2f}, T={T[k]:.3f}")
+    print(f"média {moments['mean']:.4f}, desvio-padrão {moments['std']:.4f}")
+    print("quantis: " + ", ".join(f"{q:.0%} {v:.4f}" for q, v in sketch.items()))
+    print(f"histograma ({histogram['below']} abaixo, {histogram['above']} acima): {histogram['counts'].tolist()}")
+    print(f"grelha escrita em {written['path']} ({written['bytes'] / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
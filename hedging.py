@@ -0,0 +1,128 @@
+import argparse
+import time
+
+import numpy as np
+
+from contracts import make_contracts, strategy_contracts, strategy_delta, strategy_payoff, strategy_value
+from payoffs import simulate_gbm_paths
+
+# Simulação de cobertura delta discreta de uma estratégia vendida (array de contratos,
+# ver contracts.py) sobre muitas trajetórias em simultâneo. O ciclo é sobre os passos de
+# tempo; em cada rebalanceamento o delta, a transação e os custos são calculados para
+# todas as trajetórias de uma vez (custo O(trajetórias) por passo).
+
+REBALANCE_FREQUENCIES = {"Diária": 1, "Semanal": 5, "Mensal": 21}
+
+
+# Valor das pernas no fim da cobertura: payoff das que venceram, Black-Scholes das restantes
+def _liability(contracts, S, r, vol):
+    expired = contracts["expiry"] <= 1e-12
+    return strategy_payoff(contracts[expired], S) + strategy_value(contracts[~expired], S, r, vol)
+
+
+# O vendedor recebe o valor teórico da estratégia, compra delta unidades do subjacente e
+# rebalanceia a cada `rebalance_every` passos; o caixa capitaliza à taxa r. `cost` é o custo
+# de transação proporcional ao montante negociado e `realized_vol` a volatilidade das
+# trajetórias (por omissão igual à usada na cobertura).
+def simulate_delta_hedge(contracts, S0, r, vol, n_paths=10_000, steps_per_year=252, rebalance_every=1,
+                         cost=0.0, realized_vol=None, seed=None):
+    horizon = float(contracts["expiry"].min())
+    n_steps = max(int(round(horizon * steps_per_year)), 1)
+    dt = horizon / n_steps
+    realized_vol = vol if realized_vol is None else realized_vol
+
+    # Ordem Fortran: o preço de todas as trajetórias num passo é uma coluna contígua
+    buffer = np.empty((n_paths, n_steps), order="F")
+    paths = simulate_gbm_paths(S0, r, realized_vol, horizon, n_paths, n_steps, np.random.default_rng(seed), out=buffer).paths
+
+    premium = float(strategy_value(contracts, S0, r, vol))
+    delta = np.full(n_paths, float(strategy_delta(contracts, S0, r, vol)))
+    costs = cost * np.abs(delta) * S0
+    cash = premium - delta * S0 - costs
+    growth = np.exp(r * dt)
+    remaining = contracts.copy()
+    rebalances = 1
+
+    for step in range(1, n_steps):
+        cash *= growth
+        if step % rebalance_every:
+            continue
+        S = paths[:, step - 1]
+        remaining["expiry"] = contracts["expiry"] - step * dt
+        new_delta = strategy_delta(remaining, S, r, vol)
+        trade = new_delta - delta
+        trade_cost = cost * np.abs(trade) * S
+        cash -= trade * S + trade_cost
+        costs += trade_cost
+        delta = new_delta
+        rebalances += 1
+
+    cash *= growth
+    S_T = paths[:, -1]
+    remaining["expiry"] = contracts["expiry"] - horizon
+    return {
+        "error": cash + delta * S_T - _liability(remaining, S_T, r, vol),
+        "costs": costs,
+        "premium": premium,
+        "rebalances": rebalances,
+    }
+
+
+def hedge_error_summary(result):
+    error = result["error"]
+    q05, q50, q95 = np.quantile(error, [0.05, 0.5, 0.95])
+    return {
+        "mean": error.mean(),
+        "std": error.std(ddof=1),
+        "q05": q05,
+        "median": q50,
+        "q95": q95,
+        "mean_costs": result["costs"].mean(),
+        "rebalances": result["rebalances"],
+    }
+
+
+# Mesmas trajetórias (mesma semente) para todas as frequências de rebalanceamento
+def frequency_comparison(contracts, S0, r, vol, frequencies=REBALANCE_FREQUENCIES, **kwargs):
+    kwargs.setdefault("seed", 0)
+    return {
+        label: hedge_error_summary(simulate_delta_hedge(contracts, S0, r, vol, rebalance_every=every, **kwargs))
+        for label, every in frequencies.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulação de cobertura delta discreta")
+    parser.add_argument("--strategy", default="call", help="call, put ou uma estratégia de contracts.py (p.ex. Straddle)")
+    parser.add_argument("--strike", type=float, default=100.0)
+    parser.add_argument("--strike2", type=float, default=110.0)
+    parser.add_argument("--strike3", type=float, default=120.0, help="terceiro exercício (Butterfly Spread)")
+    parser.add_argument("--expiry", type=float, default=1.0)
+    parser.add_argument("--vol", type=float, default=0.2)
+    parser.add_argument("--realized-vol", type=float, default=None)
+    parser.add_argument("--rate", type=float, default=0.05)
+    parser.add_argument("--cost", type=float, default=0.0, help="custo proporcional por transação (p.ex. 0.001)")
+    parser.add_argument("--paths", type=int, default=10_000)
+    args = parser.parse_args()
+
+    if args.strategy in ("call", "put"):
+        contracts = make_contracts(args.strategy, args.strike, args.expiry)
+    else:
+        try:
+            contracts = strategy_contracts(args.strategy, args.strike, args.strike2, args.strike3, expiry=args.expiry)
+        except KeyError:
+            parser.error(f"estratégia desconhecida: {args.strategy}")
+
+    print(f"{'frequência':<12}{'rebal.':>8}{'média':>10}{'desvio':>10}{'q5%':>10}{'q95%':>10}{'custos':>10}{'tempo (ms)':>12}")
+    for label, every in REBALANCE_FREQUENCIES.items():
+        start = time.perf_counter()
+        result = simulate_delta_hedge(contracts, 100.0, args.rate, args.vol, n_paths=args.paths, rebalance_every=every,
+                                      cost=args.cost, realized_vol=args.realized_vol, seed=0)
+        elapsed = time.perf_counter() - start
+        s = hedge_error_summary(result)
+        print(f"{label:<12}{s['rebalances']:>8}{s['mean']:>10.3f}{s['std']:>10.3f}{s['q05']:>10.3f}{s['q95']:>10.3f}"
+              f"{s['mean_costs']:>10.3f}{elapsed * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from data_files import column_names, iter_frames, open_source
+
+# Estimação de volatilidade a partir de ficheiros locais de preços OHLC (CSV ou Parquet),
+# sem acesso à rede. Os resultados ficam em cache em disco, indexados pelo hash do
+# ficheiro, pelo que só há nova estimação quando os dados mudam; o ajuste GARCH não depende
+# da janela da volatilidade realizada e é guardado à parte.
+
+TRADING_DAYS = 252
+CHUNK_ROWS = 100_000
+CLOSE_COLUMNS = ["adj close", "adj_close", "adjclose", "close"]
+CACHE_DIR = ".vol_cache"
+
+
+def file_hash(source, chunk_size=1 << 20):
+    f = open_source(source)
+    digest = hashlib.sha256()
+    try:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    finally:
+        if f is not source:
+            f.close()
+        else:
+            source.seek(0)
+    return digest.hexdigest()
+
+
+def _close_column(columns):
+    lookup = {str(c).strip().lower(): c for c in columns}
+    for name in CLOSE_COLUMNS:
+        if name in lookup:
+            return lookup[name]
+    raise ValueError("O ficheiro de preços não tem uma coluna de fecho (Close ou Adj Close)")
+
+
+# Leitura em blocos apenas da coluna de fecho, para históricos longos: gera um array de
+# preços válidos por bloco
+def iter_close_prices(source, chunk_rows=CHUNK_ROWS):
+    column = _close_column(column_names(source))
+    for frame in iter_frames(source, chunk_rows, [column]):
+        prices = frame[column].to_numpy(dtype=float)
+        yield prices[np.isfinite(prices) & (prices > 0)]
+
+
+# Histórico completo (necessário para o GARCH)
+def read_close_prices(source, chunk_rows=CHUNK_ROWS):
+    blocks = list(iter_close_prices(source, chunk_rows))
+    return np.concatenate(blocks) if blocks else np.empty(0)
+
+
+# Redução bloco a bloco: número de preços e os últimos n, sem carregar o histórico inteiro
+def tail_close_prices(source, n, chunk_rows=CHUNK_ROWS):
+    count, tail = 0, np.empty(0)
+    for prices in iter_close_prices(source, chunk_rows):
+        count += len(prices)
+        tail = np.concatenate([tail, prices])[-n:]
+    return count, tail
+
+
+def log_returns(prices):
+    return np.diff(np.log(prices))
+
+
+# Volatilidade realizada anualizada numa janela móvel (somas acumuladas, sem ciclos)
+def rolling_realized_vol(returns, window=21, periods_per_year=TRADING_DAYS):
+    if len(returns) < window:
+        return np.empty(0)
+    csum = np.concatenate([[0.0], np.cumsum(returns)])
+    csum_sq = np.concatenate([[0.0], np.cumsum(returns**2)])
+    total = csum[window:] - csum[:-window]
+    total_sq = csum_sq[window:] - csum_sq[:-window]
+    variance = (total_sq - total**2 / window) / (window - 1)
+    return np.sqrt(np.maximum(variance, 0.0) * periods_per_year)
+
+
+# Volatilidade anualizada média prevista por um GARCH(p, q) para o horizonte dado
+def fit_garch(returns, p=1, q=1, horizon=TRADING_DAYS, periods_per_year=TRADING_DAYS):
+    from arch import arch_model
+
+    model = arch_model(100 * returns, mean="Constant", vol="GARCH", p=p, q=q, dist="normal")
+    result = model.fit(disp="off")
+    variance = result.forecast(horizon=horizon, reindex=False).variance.to_numpy()[-1]
+    return float(np.sqrt(variance.mean() * periods_per_year) / 100)
+
+
+def _cached(cache_dir, key, compute):
+    cache_path = os.path.join(cache_dir, f"{key}.json") if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            return json.load(f)
+    result = compute()
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump(result, f)
+    return result
+
+
+# A volatilidade realizada da última janela só precisa dos últimos window + 1 preços e é
+# calculada numa passagem em blocos; o GARCH usa o histórico completo e não depende da
+# janela, pelo que fica em cache apenas por ficheiro e ordens (p, q)
+def _realized(source, window):
+    count, tail = tail_close_prices(source, window + 1)
+    returns = log_returns(tail)
+    if count < 3:
+        raise ValueError("O ficheiro de preços tem observações insuficientes")
+    realized = rolling_realized_vol(returns, window)
+    return {
+        "observations": int(count - 1),
+        "realized_vol": float(realized[-1]) if len(realized) else float(np.std(returns, ddof=1) * np.sqrt(TRADING_DAYS)),
+    }
+
+
+def _garch(source, p, q):
+    returns = log_returns(read_close_prices(source))
+    return {"garch_vol": fit_garch(returns, p, q) if len(returns) >= 100 else None}
+
+
+def estimate_volatility(source, window=21, p=1, q=1, cache_dir=CACHE_DIR):
+    digest = file_hash(source)
+    result = _cached(cache_dir, f"{digest}-w{window}", lambda: _realized(source, window))
+    result.update(_cached(cache_dir, f"{digest}-p{p}-q{q}", lambda: _garch(source, p, q)))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Volatilidade histórica e GARCH a partir de ficheiros de preços locais")
+    parser.add_argument("files", nargs="+", help="ficheiros CSV/Parquet com coluna Close ou Adj Close")
+    parser.add_argument("--window", type=int, default=21, help="janela da volatilidade realizada (dias)")
+    parser.add_argument("--p", type=int, default=1)
+    parser.add_argument("--q", type=int, default=1)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    for path in args.files:
+        result = estimate_volatility(path, args.window, args.p, args.q, args.cache_dir)
+        garch = f"{result['garch_vol']:.2%}" if result["garch_vol"] is not None else "n/d"
+        print(f"{path}: n={result['observations']} realizada={result['realized_vol']:.2%} GARCH={garch}")
+
+
+if __name__ == "__main__":
+    main()
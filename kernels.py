@@ -0,0 +1,209 @@
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+
+from timing import best_time
+
+# Núcleos compilados (Numba) para Black-Scholes, gregos e payoffs de calls e puts.
+#
+# Cada núcleo é um único ciclo paralelo sobre os pontos, que calcula d1, d2, a função de
+# distribuição normal e o desconto sem criar arrays temporários intermédios. Os núcleos
+# são compilados na primeira utilização e guardados em disco (cache=True), pelo que as
+# execuções seguintes não pagam a compilação. Sem Numba, ou com
+# OPCOES_PRICING_BACKEND=numpy, usa-se a implementação NumPy.
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+JIT_AVAILABLE = numba is not None
+JIT_ENABLED = JIT_AVAILABLE and os.environ.get("OPCOES_PRICING_BACKEND", "numba") != "numpy"
+
+# O Streamlit chama os núcleos a partir da thread do script de cada sessão: o TBB lançado
+# fora da thread principal bloqueia a saída do processo e o workqueue não aceita chamadas
+# concorrentes, pelo que se prefere o OpenMP (salvo escolha explícita em NUMBA_THREADING_LAYER)
+if JIT_AVAILABLE and "NUMBA_THREADING_LAYER" not in os.environ:
+    numba.config.THREADING_LAYER_PRIORITY = ["omp", "tbb", "workqueue"]
+
+# Abaixo destes números de pontos o custo de lançar as threads não compensa (um payoff é
+# uma única operação NumPy, pelo que só ganha em grelhas bem maiores)
+JIT_MIN_SIZE = 4096
+PAYOFF_JIT_MIN_SIZE = 100_000
+
+
+def use_jit(*args, min_size=JIT_MIN_SIZE):
+    return JIT_ENABLED and int(np.prod(np.broadcast_shapes(*(np.shape(a) for a in args)))) >= min_size
+
+
+# Argumentos como arrays 1-D do tamanho do resultado, ou de tamanho 1 para escalares
+# (evita materializar os parâmetros constantes)
+def _flat_args(*args):
+    shape = np.broadcast_shapes(*(np.shape(a) for a in args))
+    flat = []
+    for a in args:
+        a = np.asarray(a, dtype=np.float64)
+        if a.size == 1:
+            flat.append(a.reshape(1))
+        elif a.shape == shape:
+            flat.append(np.ascontiguousarray(a).reshape(-1))
+        else:
+            flat.append(np.broadcast_to(a, shape).reshape(-1))
+    return shape, flat
+
+
+if JIT_AVAILABLE:
+    SQRT2 = math.sqrt(2.0)
+    INV_SQRT_2PI = 1.0 / math.sqrt(2.0 * math.pi)
+
+    @numba.njit(cache=True, inline="always")
+    def _at(a, i):
+        return a[i] if a.shape[0] > 1 else a[0]
+
+    @numba.njit(cache=True, inline="always")
+    def _norm_cdf(x):
+        return 0.5 * math.erfc(-x / SQRT2)
+
+    @numba.njit(parallel=True, cache=True)
+    def _black_scholes_kernel(S, K, r, T, vol, call, put):
+        for i in numba.prange(call.shape[0]):
+            s, k, rate, t, v = _at(S, i), _at(K, i), _at(r, i), _at(T, i), _at(vol, i)
+            vol_sqrt_t = v * math.sqrt(t)
+            d1 = (math.log(s / k) + (rate + 0.5 * v * v) * t) / vol_sqrt_t
+            d2 = d1 - vol_sqrt_t
+            discounted_k = k * math.exp(-rate * t)
+            call[i] = s * _norm_cdf(d1) - discounted_k * _norm_cdf(d2)
+            put[i] = discounted_k * _norm_cdf(-d2) - s * _norm_cdf(-d1)
+
+    @numba.njit(parallel=True, cache=True)
+    def _greeks_kernel(S, K, r, T, vol, out):
+        for i in numba.prange(out.shape[1]):
+            s, k, rate, t, v = _at(S, i), _at(K, i), _at(r, i), _at(T, i), _at(vol, i)
+            sqrt_t = math.sqrt(t)
+            vol_sqrt_t = v * sqrt_t
+            d1 = (math.log(s / k) + (rate + 0.5 * v * v) * t) / vol_sqrt_t
+            d2 = d1 - vol_sqrt_t
+            discounted_k = k * math.exp(-rate * t)
+            pdf_d1 = math.exp(-0.5 * d1 * d1) * INV_SQRT_2PI
+            call_delta = _norm_cdf(d1)
+            decay = -s * pdf_d1 * v / (2.0 * sqrt_t)
+            out[0, i] = call_delta
+            out[1, i] = call_delta - 1.0
+            out[2, i] = pdf_d1 / (s * vol_sqrt_t)
+            out[3, i] = s * pdf_d1 * sqrt_t
+            out[4, i] = decay - rate * discounted_k * _norm_cdf(d2)
+            out[5, i] = decay + rate * discounted_k * _norm_cdf(-d2)
+
+    @numba.njit(parallel=True, cache=True)
+    def _payoff_kernel(S, K, sign, out):
+        for i in numba.prange(out.shape[0]):
+            out[i] = max(sign * (_at(S, i) - _at(K, i)), 0.0)
+
+    # LTTB (ver chart_data.py): sequencial, cada balde depende do ponto escolhido no anterior
+    @numba.njit(cache=True)
+    def _lttb_kernel(x, y, edges, keep):
+        n = x.shape[0]
+        a = 0
+        for i in range(keep.shape[0] - 2):
+            lo, hi = edges[i], edges[i + 1]
+            next_hi = edges[i + 2] if i + 2 < edges.shape[0] else n
+            avg_x, avg_y = 0.0, 0.0
+            for j in range(hi, next_hi):
+                avg_x += x[j]
+                avg_y += y[j]
+            avg_x /= next_hi - hi
+            avg_y /= next_hi - hi
+            best, best_area = lo, -1.0
+            for j in range(lo, hi):
+                area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+                if area > best_area:
+                    best, best_area = j, area
+            a = best
+            keep[i + 1] = a
+
+
+def black_scholes_jit(S, K, r, T, vol):
+    shape, args = _flat_args(S, K, r, T, vol)
+    size = int(np.prod(shape))
+    call, put = np.empty(size), np.empty(size)
+    _black_scholes_kernel(*args, call, put)
+    return call.reshape(shape), put.reshape(shape)
+
+
+GREEK_NAMES = ["call_delta", "put_delta", "gamma", "vega", "call_theta", "put_theta"]
+
+
+def black_scholes_greeks_jit(S, K, r, T, vol):
+    shape, args = _flat_args(S, K, r, T, vol)
+    out = np.empty((len(GREEK_NAMES), int(np.prod(shape))))
+    _greeks_kernel(*args, out)
+    return {name: out[j].reshape(shape) for j, name in enumerate(GREEK_NAMES)}
+
+
+def payoff_jit(S, K, sign):
+    shape, args = _flat_args(S, K)
+    out = np.empty(int(np.prod(shape)))
+    _payoff_kernel(*args, float(sign), out)
+    return out.reshape(shape)
+
+
+def lttb_jit(x, y, edges, keep):
+    _lttb_kernel(np.ascontiguousarray(x, dtype=np.float64), np.ascontiguousarray(y, dtype=np.float64), edges, keep)
+    return keep
+
+def benchmark(sizes=(10_000, 100_000, 1_000_000, 10_000_000)):
+    # O interruptor é o do módulo importado por pricing/payoffs (não o de __main__)
+    import kernels
+    from payoffs import call_payoff
+    from pricing import black_scholes, black_scholes_greeks
+
+    cases = {
+        "black_scholes": lambda S: black_scholes(S, 100.0, 0.05, 1.0, 0.2),
+        "black_scholes_greeks": lambda S: black_scholes_greeks(S, 100.0, 0.05, 1.0, 0.2),
+        "call_payoff": lambda S: call_payoff(S, 100.0),
+    }
+
+    # Primeira chamada: compilação ou leitura da cache em disco
+    S = np.linspace(50, 150, JIT_MIN_SIZE)
+    start = time.perf_counter()
+    for fn in cases.values():
+        fn(S)
+    rows = [("primeira chamada (compilação/cache)", JIT_MIN_SIZE, None, time.perf_counter() - start)]
+
+    enabled = kernels.JIT_ENABLED
+    try:
+        for n in sizes:
+            S = np.linspace(50, 150, n)
+            for name, fn in cases.items():
+                kernels.JIT_ENABLED = False
+                _, numpy_time = best_time(lambda: fn(S))
+                kernels.JIT_ENABLED = enabled
+                _, jit_time = best_time(lambda: fn(S))
+                rows.append((name, n, numpy_time, jit_time))
+    finally:
+        kernels.JIT_ENABLED = enabled
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Núcleos compilados de preços e payoffs")
+    parser.add_argument("command", choices=["benchmark"])
+    parser.parse_args()
+
+    if not JIT_ENABLED:
+        print("Numba indisponível ou desativado: só a implementação NumPy está ativa")
+        return
+    print(f"threads Numba: {numba.get_num_threads()}")
+    print(f"{'função':<36}{'pontos':>10}{'NumPy (ms)':>12}{'JIT (ms)':>12}{'ganho':>8}")
+    for name, n, numpy_time, jit_time in benchmark():
+        if numpy_time is None:
+            print(f"{name:<36}{n:>10}{'':>12}{jit_time * 1e3:>12.1f}")
+        else:
+            print(f"{name:<36}{n:>10}{numpy_time * 1e3:>12.2f}{jit_time * 1e3:>12.2f}{numpy_time / jit_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import random
+import resource
+import subprocess
+import threading
+import time
+import traceback
+
+import numpy as np
+
+# Teste de carga da aplicação: N sessões concorrentes, cada uma num processo próprio, com
+# o AppTest do Streamlit (o script corre como num servidor, mas sem websocket nem browser).
+#
+# Cada sessão segue um guião determinista (semente + índice da sessão): percorre as
+# páginas da barra lateral, em cada página passa por todas as estratégias / fatores e
+# move sliders, botões de opção e caixas de seleção escolhidos ao acaso. Mede-se a
+# duração de cada reexecução do script e, por sessão, o tempo de CPU e a memória
+# residente. Os resultados são guardados em JSON, com a versão (commit) da aplicação,
+# para comparar versões com `python load_test.py compare antes.json depois.json`.
+# Sessões que falham (exceção, processo terminado, tempo limite) ficam registadas em
+# "failed" e não entram nas métricas.
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opcoes-derivados-app.py")
+NAVIGATION = "Ir para"
+VIEW_SELECTORS = ["Selecionar Estratégia", "Selecionar Fator para Explorar"]
+PERCENTILES = (50, 95, 99)
+SESSION_TIMEOUT = 1800
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+# Valor ao acaso dentro dos limites e do passo do slider, do mesmo tipo que o atual
+def _slider_value(slider, rng):
+    n_steps = int(round((slider.max - slider.min) / slider.step))
+    pick = lambda: slider.min + slider.step * rng.randint(0, n_steps)
+    cast = int if isinstance(np.ravel(slider.value)[0].item(), int) else lambda v: round(v, 10)
+    if isinstance(slider.value, (tuple, list)):
+        return tuple(sorted(cast(pick()) for _ in slider.value))
+    return cast(pick())
+
+
+# Um movimento ao acaso: slider, botão de opção ou caixa de seleção da página atual
+def _random_move(at, rng):
+    widgets = [("slider", w) for w in at.slider]
+    widgets += [("radio", w) for w in at.radio if w.label != NAVIGATION and len(w.options) > 1]
+    widgets += [("selectbox", w) for w in at.selectbox if w.label not in VIEW_SELECTORS and len(w.options) > 1]
+    if not widgets:
+        return None
+    kind, widget = rng.choice(widgets)
+    value = _slider_value(widget, rng) if kind == "slider" else rng.choice(widget.options)
+    widget.set_value(value)
+    return kind, widget.label
+
+
+def run_session(index, moves=2, seed=0, app=APP_PATH, timeout=120):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed * 100_003 + index)
+    at = AppTest.from_file(app, default_timeout=timeout)
+    steps = []
+
+    def rerun(page, kind, label):
+        start = time.perf_counter()
+        at.run()
+        steps.append({
+            "page": page, "kind": kind, "label": label, "seconds": time.perf_counter() - start,
+            "error": str(at.exception[0].message) if at.exception else None,
+        })
+
+    rerun(None, "arranque", None)
+    for page in at.sidebar.radio[0].options:
+        at.sidebar.radio[0].set_value(page)
+        rerun(page, "navegação", page)
+
+        selectors = [w for w in at.selectbox if w.label in VIEW_SELECTORS]
+        views = selectors[0].options if selectors else [None]
+        for view in views:
+            if view is not None:
+                [w for w in at.selectbox if w.label in VIEW_SELECTORS][0].set_value(view)
+                rerun(page, "vista", view)
+            for _ in range(moves):
+                move = _random_move(at, rng)
+                if move is not None:
+                    rerun(page, *move)
+    return steps
+
+
+# Processo de uma sessão: aquece os módulos (imports, caches de compilação) fora da
+# medição, espera pelas outras sessões e corre o guião. Uma falha interrompe a barreira,
+# para que as outras sessões não fiquem à espera, e é enviada ao processo principal.
+def _session_process(index, moves, seed, app, barrier, queue, timeout=SESSION_TIMEOUT):
+    try:
+        _run_session_process(index, moves, seed, app, barrier, queue, timeout)
+    except BaseException as e:
+        barrier.abort()
+        detail = "barreira interrompida por outra sessão" if isinstance(e, threading.BrokenBarrierError) else None
+        queue.put({"session": index, "error": detail or traceback.format_exc()})
+
+
+def _run_session_process(index, moves, seed, app, barrier, queue, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    AppTest.from_file(app, default_timeout=120).run()
+    baseline_rss = _rss_mb()
+    barrier.wait(timeout)
+
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    steps = run_session(index, moves, seed, app)
+    queue.put({
+        "session": index,
+        "steps": steps,
+        "wall_seconds": time.perf_counter() - wall,
+        "cpu_seconds": time.process_time() - cpu,
+        "baseline_rss_mb": baseline_rss,
+        "rss_mb": _rss_mb(),
+        "peak_rss_mb": _peak_rss_mb(),
+    })
+
+
+def _git_version(directory):
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=directory, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentiles(values):
+    values = np.asarray(values, dtype=float)
+    return {f"p{p}": float(np.percentile(values, p)) * 1e3 for p in PERCENTILES} if len(values) else {}
+
+
+def summarize(sessions, failed=()):
+    if not sessions:
+        return {"reruns": 0, "errors": 0, "failed_sessions": len(failed), "latency_ms": {}, "latency_ms_by_page": {}}
+    steps = [s for session in sessions for s in session["steps"] if s["kind"] != "arranque"]
+    by_page = {}
+    for s in steps:
+        by_page.setdefault(s["page"], []).append(s["seconds"])
+    per_session = lambda key: [session[key] for session in sessions]
+    return {
+        "reruns": len(steps),
+        "errors": sum(s["error"] is not None for s in steps),
+        "failed_sessions": len(failed),
+        "latency_ms": _percentiles([s["seconds"] for s in steps]),
+        "latency_ms_by_page": {page: _percentiles(values) for page, values in by_page.items()},
+        "cpu_seconds_per_session": float(np.mean(per_session("cpu_seconds"))),
+        "cpu_ms_per_rerun": float(np.sum(per_session("cpu_seconds")) / max(len(steps), 1) * 1e3),
+        "rss_mb_per_session": float(np.mean(per_session("rss_mb"))),
+        "peak_rss_mb_per_session": float(np.max(per_session("peak_rss_mb"))),
+        "rss_growth_mb_per_session": float(np.mean([s["rss_mb"] - s["baseline_rss_mb"] for s in sessions])),
+    }
+
+
+# Recolhe os resultados até todas as sessões responderem, todos os processos terminarem
+# ou se esgotar o tempo limite; os processos ainda vivos no fim são terminados
+def _collect(processes, queue, timeout):
+    deadline = time.monotonic() + timeout
+    results = {}
+    while len(results) < len(processes):
+        try:
+            item = queue.get(timeout=1)
+            results[item["session"]] = item
+            continue
+        except queue_module.Empty:
+            pass
+        if time.monotonic() > deadline or not any(p.is_alive() for p in processes):
+            break
+    while True:
+        try:
+            item = queue.get(timeout=0.1)
+            results[item["session"]] = item
+        except queue_module.Empty:
+            break
+
+    timed_out = [p for p in processes if p.is_alive()]
+    for p in timed_out:
+        p.terminate()
+    for p in processes:
+        p.join()
+
+    sessions, failed = [], []
+    for i, p in enumerate(processes):
+        result = results.get(i)
+        if result is not None and "error" not in result:
+            sessions.append(result)
+            continue
+        if result is not None:
+            error = result["error"]
+        elif p in timed_out:
+            error = f"tempo limite excedido ({timeout} s)"
+        else:
+            error = f"processo terminou sem resultados (código {p.exitcode})"
+        failed.append({"session": i, "exitcode": p.exitcode, "error": error})
+    return sessions, failed
+
+
+def load_test(n_sessions=4, moves=2, seed=0, app=APP_PATH, timeout=SESSION_TIMEOUT):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(n_sessions)
+    queue = context.Queue()
+    processes = [
+        context.Process(target=_session_process, args=(i, moves, seed, app, barrier, queue, timeout))
+        for i in range(n_sessions)
+    ]
+    for p in processes:
+        p.start()
+    sessions, failed = _collect(processes, queue, timeout)
+
+    import streamlit
+    return {
+        "meta": {
+            "version": _git_version(os.path.dirname(os.path.abspath(app))),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sessions": n_sessions, "moves": moves, "seed": seed,
+            "cpus": os.cpu_count(), "python": platform.python_version(), "streamlit": streamlit.__version__,
+            "render_workers": os.environ.get("OPCOES_RENDER_WORKERS"),
+            "pricing_backend": os.environ.get("OPCOES_PRICING_BACKEND"),
+            "chart_mode": os.environ.get("OPCOES_CHART_MODE"),
+        },
+        "summary": summarize(sessions, failed),
+        "sessions": sessions,
+        "failed": failed,
+    }
+
+
+def _print_summary(result):
+    meta, summary = result["meta"], result["summary"]
+    print(f"versão {meta['version']}, {meta['sessions']} sessões concorrentes, {summary['reruns']} reexecuções, "
+          f"{summary['errors']} erros, {meta['cpus']} CPU")
+    for failure in result["failed"]:
+        print(f"sessão {failure['session']} falhou: {failure['error'].strip().splitlines()[-1]}")
+    if not result["sessions"]:
+        return
+    latency = summary["latency_ms"]
+    print("latência (ms): " + ", ".join(f"{k} {v:.0f}" for k, v in latency.items()))
+    for page, values in summary["latency_ms_by_page"].items():
+        print(f"  {page:<30}" + "".join(f"{k} {v:>7.0f}  " for k, v in values.items()))
+    print(f"CPU por sessão {summary['cpu_seconds_per_session']:.1f}s ({summary['cpu_ms_per_rerun']:.0f} ms por reexecução)")
+    print(f"RSS por sessão {summary['rss_mb_per_session']:.0f} MB (pico {summary['peak_rss_mb_per_session']:.0f} MB, "
+          f"+{summary['rss_growth_mb_per_session']:.0f} MB durante a sessão)")
+
+
+# Métricas lado a lado de duas execuções (p.ex. duas versões da aplicação); None quando a
+# execução não tem a métrica (p.ex. nenhuma sessão concluída)
+def compare(before, after):
+    latency = lambda result, key: result["summary"].get("latency_ms", {}).get(key)
+    rows = []
+    for key in ("p50", "p95", "p99"):
+        rows.append((f"latência {key} (ms)", latency(before, key), latency(after, key)))
+    for key, label in (("cpu_ms_per_rerun", "CPU por reexecução (ms)"), ("rss_mb_per_session", "RSS por sessão (MB)"),
+                       ("peak_rss_mb_per_session", "pico de RSS (MB)")):
+        rows.append((label, before["summary"].get(key), after["summary"].get(key)))
+    return rows
+
+
+def _cell(value, width, fmt):
+    return f"{'n/d' if value is None else format(value, fmt):>{width}}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da aplicação com sessões AppTest concorrentes")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run")
+    run.add_argument("--sessions", type=int, default=4)
+    run.add_argument("--moves", type=int, default=2, help="movimentos de widgets por vista")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--app", default=APP_PATH)
+    run.add_argument("--timeout", type=float, default=SESSION_TIMEOUT, help="tempo limite da execução (s)")
+    run.add_argument("--out", default=None, help="ficheiro JSON com os resultados")
+    diff = sub.add_parser("compare")
+    diff.add_argument("before")
+    diff.add_argument("after")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        result = load_test(args.sessions, args.moves, args.seed, args.app, args.timeout)
+        _print_summary(result)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(result, f, indent=1)
+        if result["failed"]:
+            raise SystemExit(1)
+        return
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(f"{'':<28}{before['meta']['version'] or 'antes':>14}{after['meta']['version'] or 'depois':>14}{'variação':>10}")
+    for label, a, b in compare(before, after):
+        change = (b - a) / a if a and b is not None else None
+        print(f"{label:<28}{_cell(a, 14, '.1f')}{_cell(b, 14, '.1f')}{_cell(change, 10, '+.1%')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,27 @@
-        st.markdown("""
-        A linha verde (Call - Put) sobrepõe-se perfeitamente à linha preta tracejada (Ativo - Exercício) no vencimento,
-        demonstrando a paridade put-call.
-        """)import streamlit as st
+import streamlit as st
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
+import time
 from math import exp
 from scipy.stats import norm
+from vol_surface import default_vol_surface, load_quotes, calibrate_vol_surface
+from historical_vol import estimate_volatility, file_hash
+from surface_cache import exact_fields
+from async_render import FigureQueue
+from payoffs import call_payoff, put_payoff
+from portfolio import Portfolio, sample_portfolio
+from contracts import STRATEGY_SLIDERS, make_contracts, strategy_contracts, leg_payoffs, strategy_payoff, strategy_profit, strategy_value
+from hedging import REBALANCE_FREQUENCIES, simulate_delta_hedge, hedge_error_summary
+from parity_scanner import scan_parity
+from strategy_optimizer import optimize_strategies, result_contracts
+from probabilities import LognormalDensity, implied_density, strategy_metrics
 
 st.set_page_config(page_title="Explorador de Opções e Derivativos", layout="wide")
 
+# Os gráficos são rasterizados fora da thread do script e preenchidos à medida que ficam prontos
+charts = FigureQueue(st)
+
 st.title("Explorador de Opções e Derivativos")
 st.markdown("""
 Esta aplicação ajuda-o a compreender os conceitos-chave de opções e derivativos através de visualizações interativas.
@@ -39,20 +51,52 @@ with st.expander("Licença e Aviso Legal"):
 
 # Barra lateral para navegação
 st.sidebar.title("Navegação")
-page = st.sidebar.radio("Ir para", ["Opções Básicas", "Estratégias de Opções", "Paridade Put-Call", "Fatores que Afetam o Preço"])
+page = st.sidebar.radio("Ir para", ["Opções Básicas", "Estratégias de Opções", "Paridade Put-Call", "Fatores que Afetam o Preço", "Carteira de Opções"])
 
-# Funções básicas para calcular payoffs
-def call_payoff(S, K):
-    return np.maximum(S - K, 0)
+# Gráficos de linhas enviados como dados binários (Arrow) e desenhados no browser
+interactive_charts = st.sidebar.checkbox("Gráficos Interativos (dados binários)", value=charts.mode == "data")
+charts.mode = "data" if interactive_charts else "png"
 
-def put_payoff(S, K):
-    return np.maximum(K - S, 0)
+# Preços e gregos Black-Scholes calculados exatamente. A cache pré-calculada em disco
+# (surface_cache.py) não é usada aqui: nas curvas de 100 pontos da aplicação não é mais
+# rápida e a interpolação em T e σ perde precisão (ver `python surface_cache.py report`)
+def option_prices(S, K, r, T, vol, fields=("call", "put")):
+    return exact_fields(S, K, r, T, vol, fields)
 
-def binary_call_payoff(S, K):
-    return (S > K).astype(int)
+# Cálculos pesados em cache (st.cache_data): só se repetem quando os argumentos mudam, e não
+# a cada reexecução provocada por outros widgets
+cached_optimize_strategies = st.cache_data(max_entries=64)(optimize_strategies)
+cached_delta_hedge = st.cache_data(max_entries=32)(simulate_delta_hedge)
 
-def binary_put_payoff(S, K):
-    return (S < K).astype(int)
+# Sliders de exercício de uma estratégia, definidos em contracts.STRATEGY_SLIDERS (os mesmos
+# limites usados pela exportação estática)
+def strike_sliders(strategy):
+    values = []
+    for label, low, high, default in STRATEGY_SLIDERS[strategy]:
+        values.append(st.slider(label, low(*values), high, default))
+    return values
+
+# Volatilidade usada nos preços teóricos: constante ou estimada a partir de um ficheiro local de preços
+vol_estimate = 0.2
+if page in ["Paridade Put-Call", "Fatores que Afetam o Preço", "Carteira de Opções"]:
+    st.sidebar.subheader("Volatilidade")
+    vol_source = st.sidebar.radio("Estimativa de Volatilidade", ["Constante (20%)", "Histórica", "GARCH(1,1)"])
+    if vol_source != "Constante (20%)":
+        prices_file = st.sidebar.file_uploader("Ficheiro de Preços OHLC (CSV/Parquet)", type=["csv", "parquet"])
+        window = st.sidebar.slider("Janela da Volatilidade Realizada (dias)", 5, 252, 21)
+        if prices_file is not None:
+            try:
+                estimate = estimate_volatility(prices_file, window=window)
+                if vol_source == "Histórica":
+                    vol_estimate = estimate["realized_vol"]
+                elif estimate["garch_vol"] is not None:
+                    vol_estimate = estimate["garch_vol"]
+                else:
+                    st.sidebar.warning("Observações insuficientes para o GARCH; a usar a volatilidade histórica")
+                    vol_estimate = estimate["realized_vol"]
+                st.sidebar.markdown(f"**Volatilidade estimada**: {vol_estimate*100:.1f}% ({estimate['observations']} retornos)")
+            except ValueError as e:
+                st.sidebar.error(str(e))
 
 # Página de Opções Básicas
 if page == "Opções Básicas":
@@ -82,25 +126,24 @@ if page == "Opções Básicas":
         option_type = st.radio("Tipo de Opção", ["Call", "Put", "Call Binária", "Put Binária"])
         
         if option_type == "Call":
-            payoff = call_payoff(S_range, K)
-            profit = call_payoff(S_range, K) - premium
+            contract = make_contracts("call", K, premium=premium)
             title = f"Opção de Compra (K={K}€)"
             formula = r"Payoff Call = max(S - K, 0)"
         elif option_type == "Put":
-            payoff = put_payoff(S_range, K)
-            profit = put_payoff(S_range, K) - premium
+            contract = make_contracts("put", K, premium=premium)
             title = f"Opção de Venda (K={K}€)"
             formula = r"Payoff Put = max(K - S, 0)"
         elif option_type == "Call Binária":
-            payoff = binary_call_payoff(S_range, K)
-            profit = binary_call_payoff(S_range, K) - premium
+            contract = make_contracts("binary_call", K, premium=premium)
             title = f"Opção de Compra Binária (K={K}€)"
             formula = r"Payoff Call Binária = 1 se S > K, 0 caso contrário"
         else:  # Put Binária
-            payoff = binary_put_payoff(S_range, K)
-            profit = binary_put_payoff(S_range, K) - premium
+            contract = make_contracts("binary_put", K, premium=premium)
             title = f"Opção de Venda Binária (K={K}€)"
             formula = r"Payoff Put Binária = 1 se S < K, 0 caso contrário"
+        
+        payoff = strategy_payoff(contract, S_range)
+        profit = strategy_profit(contract, S_range)
     
     with col2:
         st.subheader("Diagrama de Payoff")
@@ -137,19 +180,11 @@ if page == "Opções Básicas":
         ax.grid(True, alpha=0.3)
         ax.legend()
         
-        st.pyplot(fig)
+        charts.pyplot(fig)
         
         # Resumo de valor
         st.subheader("Resumo do Valor Atual")
-        current_intrinsic = 0
-        if option_type == "Call":
-            current_intrinsic = max(S0 - K, 0)
-        elif option_type == "Put":
-            current_intrinsic = max(K - S0, 0)
-        elif option_type == "Call Binária":
-            current_intrinsic = 1 if S0 > K else 0
-        else:  # Put Binária
-            current_intrinsic = 1 if S0 < K else 0
+        current_intrinsic = float(strategy_payoff(contract, S0))
             
         time_value = max(0, premium - current_intrinsic)
         
@@ -212,12 +247,11 @@ elif page == "Estratégias de Opções":
         - Reduz o custo em comparação com apenas comprar uma opção de compra
         """)
         
-        K1 = st.slider("Preço de Exercício Mais Baixo (€)", 70, 100, 90)
-        K2 = st.slider("Preço de Exercício Mais Alto (€)", K1, 130, 110)
+        K1, K2 = strike_sliders("Bull Spread")
         
-        long_call = call_payoff(S_range, K1)
-        short_call = -call_payoff(S_range, K2)
-        spread_payoff = long_call + short_call
+        legs = strategy_contracts("Bull Spread", K1, K2)
+        long_call, short_call = leg_payoffs(legs, S_range)
+        spread_payoff = strategy_payoff(legs, S_range)
         
         fig, ax = plt.subplots(figsize=(10, 6))
         ax.plot(S_range, long_call, 'b--', label=f'Call Longa (K={K1}€)')
@@ -231,7 +265,7 @@ elif page == "Estratégias de Opções":
         ax.grid(True, alpha=0.3)
         ax.legend()
         
-        st.pyplot(fig)
+        charts.pyplot(fig)
         
         st.markdown(f"""
         **Lucro Máximo**: {K2-K1}€ (quando o preço do ativo ≥ {K2}€)  
@@ -251,12 +285,11 @@ elif page == "Estratégias de Opções":
         - Reduz o custo em comparação com apenas comprar uma opção de venda
         """)
         
-        K1 = st.slider("Preço de Exercício Mais Baixo (€)", 70, 100, 90)
-        K2 = st.slider("Preço de Exercício Mais Alto (€)", K1, 130, 110)
+        K1, K2 = strike_sliders("Bear Spread")
         
-        long_put = put_payoff(S_range, K2)
-        short_put = -put_payoff(S_range, K1)
-        spread_payoff = long_put + short_put
+        legs = strategy_contracts("Bear Spread", K1, K2)
+        long_put, short_put = leg_payoffs(legs, S_range)
+        spread_payoff = strategy_payoff(legs, S_range)
         
         fig, ax = plt.subplots(figsize=(10, 6))
         ax.plot(S_range, long_put, 'b--', label=f'Put Longa (K={K2}€)')
@@ -270,7 +303,7 @@ elif page == "Estratégias de Opções":
         ax.grid(True, alpha=0.3)
         ax.legend()
         
-        st.pyplot(fig)
+        charts.pyplot(fig)
         
         st.markdown(f"""
         **Lucro Máximo**: {K2-K1}€ (quando o preço do ativo ≤ {K1}€)  
@@ -290,11 +323,11 @@ elif page == "Estratégias de Opções":
         - Lucrativa se o preço se mover mais do que os prémios combinados
         """)
         
-        K = st.slider("Preço de Exercício (€)", 70, 130, 100)
+        K, = strike_sliders("Straddle")
         
-        call = call_payoff(S_range, K)
-        put = put_payoff(S_range, K)
-        straddle_payoff = call + put
+        legs = strategy_contracts("Straddle", K)
+        call, put = leg_payoffs(legs, S_range)
+        straddle_payoff = strategy_payoff(legs, S_range)
         
         fig, ax = plt.subplots(figsize=(10, 6))
         ax.plot(S_range, call, 'b--', label=f'Call (K={K}€)')
@@ -310,7 +343,7 @@ elif page == "Estratégias de Opções":
         ax.grid(True, alpha=0.3)
         ax.legend()
         
-        st.pyplot(fig)
+        charts.pyplot(fig)
         
         st.markdown(f"""
         **Lucro Máximo**: Ilimitado (aumenta à medida que o preço se afasta do exercício)  
@@ -329,12 +362,11 @@ elif page == "Estratégias de Opções":
         - Utilizada quando se espera volatilidade significativa mas com maior tolerância ao risco
         """)
         
-        K1 = st.slider("Preço de Exercício da Put (€)", 70, 100, 90)
-        K2 = st.slider("Preço de Exercício da Call (€)", K1, 130, 110)
+        K1, K2 = strike_sliders("Strangle")
         
-        call = call_payoff(S_range, K2)
-        put = put_payoff(S_range, K1)
-        strangle_payoff = call + put
+        legs = strategy_contracts("Strangle", K1, K2)
+        call, put = leg_payoffs(legs, S_range)
+        strangle_payoff = strategy_payoff(legs, S_range)
         
         fig, ax = plt.subplots(figsize=(10, 6))
         ax.plot(S_range, call, 'b--', label=f'Call (K={K2}€)')
@@ -351,7 +383,7 @@ elif page == "Estratégias de Opções":
         ax.grid(True, alpha=0.3)
         ax.legend()
         
-        st.pyplot(fig)
+        charts.pyplot(fig)
         
         st.markdown(f"""
         **Lucro Máximo**: Ilimitado (aumenta à medida que o preço se afasta dos exercícios)  
@@ -371,14 +403,11 @@ elif page == "Estratégias de Opções":
         - Utilizada quando se espera baixa volatilidade ou um preço estável
         """)
         
-        K1 = st.slider("Preço de Exercício Mais Baixo (€)", 70, 90, 80)
-        K2 = st.slider("Preço de Exercício Médio (€)", K1+10, 110, 100)
-        K3 = st.slider("Preço de Exercício Mais Alto (€)", K2+10, 130, 120)
+        K1, K2, K3 = strike_sliders("Butterfly Spread")
         
-        call1 = call_payoff(S_range, K1)
-        call2 = -2 * call_payoff(S_range, K2)
-        call3 = call_payoff(S_range, K3)
-        butterfly_payoff = call1 + call2 + call3
+        legs = strategy_contracts("Butterfly Spread", K1, K2, K3)
+        call1, call2, call3 = leg_payoffs(legs, S_range)
+        butterfly_payoff = strategy_payoff(legs, S_range)
         
         fig, ax = plt.subplots(figsize=(10, 6))
         ax.plot(S_range, call1, 'b--', label=f'Call Longa (K={K1}€)')
@@ -397,7 +426,7 @@ elif page == "Estratégias de Opções":
         ax.grid(True, alpha=0.3)
         ax.legend()
         
-        st.pyplot(fig)
+        charts.pyplot(fig)
         
         st.markdown(f"""
         **Lucro Máximo**: {K2-K1}€ (ocorre se o preço = exercício médio no vencimento)  
@@ -417,12 +446,11 @@ elif page == "Estratégias de Opções":
         - Pode ser estruturada para ser de custo zero (prémios compensam-se mutuamente)
         """)
         
-        K1 = st.slider("Preço de Exercício da Put (€)", 70, 95, 90)
-        K2 = st.slider("Preço de Exercício da Call (€)", 105, 130, 110)
+        K1, K2 = strike_sliders("Risk Reversal")
         
-        short_put = -put_payoff(S_range, K1)
-        long_call = call_payoff(S_range, K2)
-        risk_reversal_payoff = short_put + long_call
+        legs = strategy_contracts("Risk Reversal", K1, K2)
+        short_put, long_call = leg_payoffs(legs, S_range)
+        risk_reversal_payoff = strategy_payoff(legs, S_range)
         
         fig, ax = plt.subplots(figsize=(10, 6))
         ax.plot(S_range, short_put, 'r--', label=f'Put Curta (K={K1}€)')
@@ -439,7 +467,7 @@ elif page == "Estratégias de Opções":
         ax.grid(True, alpha=0.3)
         ax.legend()
         
-        st.pyplot(fig)
+        charts.pyplot(fig)
         
         st.markdown(f"""
         **Lucro Máximo**: Ilimitado (aumenta à medida que o preço sobe acima do exercício da call)  
@@ -448,6 +476,122 @@ elif page == "Estratégias de Opções":
         **Fórmula**: Payoff Risk Reversal = max(S-K2, 0) - max(K1-S, 0)
         """)
 
+    # Probabilidades no vencimento da estratégia selecionada, calculadas analiticamente
+    st.subheader("Probabilidades no Vencimento")
+    st.markdown("""
+    Lucro esperado, probabilidade de lucro e quantis do lucro no vencimento da estratégia acima (S=100€, r=5%,
+    T=1 ano), calculados sem simulação a partir da distribuição do preço do ativo: lognormal, com o retorno
+    esperado escolhido, ou a densidade neutra ao risco implícita na superfície de volatilidade (a calibrada na
+    página "Fatores que Afetam o Preço", se existir, ou a sintética).
+    """)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        density_kind = st.radio("Distribuição do Preço no Vencimento", ["Lognormal", "Implícita na Superfície"], horizontal=True)
+        # Com a superfície calibrada a volatilidade vem das cotações e o slider não se aplica
+        calibrated = density_kind != "Lognormal" and "vol_surface" in st.session_state
+        prob_vol = st.slider("Volatilidade (%)", 5, 60, 20, disabled=calibrated) / 100
+    with col2:
+        prob_drift = None
+        if density_kind == "Lognormal":
+            prob_drift = st.slider("Retorno Esperado do Ativo (%)", -10, 20, 5) / 100
+            st.markdown(f"Volatilidade: **{prob_vol:.0%}** (slider).")
+        elif calibrated:
+            st.markdown("Volatilidade: **superfície calibrada** às cotações carregadas na página "
+                        "\"Fatores que Afetam o Preço\" (o slider não se aplica).")
+        else:
+            st.markdown(f"Volatilidade: superfície **sintética** com σ ATM de **{prob_vol:.0%}** (slider).")
+
+    if density_kind == "Lognormal":
+        density = LognormalDensity(100, 1.0, prob_vol, prob_drift)
+        strategy_cost = float(strategy_value(legs, 100, 0.05, prob_vol))
+    else:
+        surface = st.session_state["vol_surface"] if calibrated else default_vol_surface(100, 0.05, atm_vol=prob_vol)
+        density = implied_density(surface, 1.0)
+        strategy_cost = float(exp(-0.05) * density.expectation(lambda x: strategy_payoff(legs, x)))
+
+    prob_start = time.perf_counter()
+    prob = strategy_metrics(legs, density, strategy_cost)
+    prob_elapsed = time.perf_counter() - prob_start
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Custo da Estratégia", f"{strategy_cost:.2f}€")
+    col2.metric("Lucro Esperado", f"{prob['expected_profit']:.2f}€")
+    col3.metric("Probabilidade de Lucro", f"{prob['prob_profit']:.1%}")
+    st.dataframe(pd.DataFrame({f"{q:.0%}": [v] for q, v in prob["quantiles"].items()}, index=["Quantil do Lucro (€)"]))
+    st.markdown(f"Calculado em {prob_elapsed * 1e6:.0f} µs (resultados em cache por estratégia, exercícios, distribuição e custo).")
+
+    profit = strategy_payoff(legs, S_range) - strategy_cost
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.plot(S_range, profit, 'g-', linewidth=2, label='Lucro no Vencimento')
+    ax.axhline(y=0, color='black', linestyle='-', alpha=0.3)
+    ax.set_xlabel('Preço do Ativo no Vencimento (€)')
+    ax.set_ylabel('Lucro (€)')
+    ax_density = ax.twinx()
+    pdf = density.pdf(S_range)
+    ax_density.plot(S_range, pdf, 'b-', alpha=0.5, label='Densidade')
+    ax_density.fill_between(S_range, 0, pdf, where=profit > 0, color='green', alpha=0.2, label='Região de Lucro')
+    ax_density.set_ylim(bottom=0)
+    ax_density.set_ylabel('Densidade')
+    ax.set_title("Lucro e Distribuição do Preço no Vencimento")
+    ax.grid(True, alpha=0.3)
+    ax.legend(loc='upper left')
+    ax_density.legend(loc='upper right')
+
+    charts.pyplot(fig)
+
+    # Otimizador: procura exercícios e quantidades para uma visão de mercado
+    st.subheader("Otimizador de Estratégias")
+    st.markdown("""
+    Indique o intervalo onde espera o preço do ativo no vencimento e as restrições de risco. O otimizador percorre
+    todas as combinações de exercícios (de 70€ a 130€, de 5 em 5) e quantidades de cada estratégia, com preços
+    Black-Scholes (S=100€, r=5%, σ=20%, T=1 ano), e ordena-as pelo lucro médio no intervalo da visão.
+    """)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        view_low, view_high = st.slider("Visão: Preço no Vencimento (€)", 60, 140, (105, 115))
+        opt_max_loss = st.slider("Perda Máxima (€)", 1, 30, 10)
+        opt_max_quantity = st.slider("Quantidade Máxima por Perna", 1, 3, 2)
+    with col2:
+        opt_budget = st.slider("Orçamento: Custo Líquido Máximo (€)", -10, 30, 10)
+        use_breakeven = st.checkbox("Exigir Break-even Alvo")
+        opt_breakeven = st.slider("Break-even Alvo (€)", 60, 140, 105) if use_breakeven else None
+
+    optimized, opt_stats = cached_optimize_strategies(
+        100, 0.05, 0.2, 1.0, view_low, view_high, max_loss=opt_max_loss, budget=opt_budget,
+        breakeven=opt_breakeven, max_quantity=opt_max_quantity, top=10,
+    )
+    st.markdown(
+        f"{opt_stats['candidates']} candidatos, {opt_stats['evaluated']} avaliados exatamente "
+        f"após os cortes analíticos, em {opt_stats['elapsed'] * 1e3:.0f} ms (resultado em cache para estes parâmetros)."
+    )
+
+    if len(optimized):
+        st.dataframe(optimized.rename(columns={
+            "strategy": "Estratégia", "strikes": "Exercícios", "quantities": "Quantidades", "cost": "Custo",
+            "view_profit": "Lucro Médio na Visão", "max_loss": "Perda Máxima", "max_profit": "Lucro Máximo",
+            "reward_risk": "Lucro/Risco", "breakevens": "Break-evens",
+        }))
+
+        fig, ax = plt.subplots(figsize=(10, 6))
+        for i, row in optimized.head(3).iterrows():
+            best_legs = result_contracts(row)
+            ax.plot(S_range, strategy_payoff(best_legs, S_range) - row["cost"], linewidth=2,
+                    label=f"{i + 1}. {row['strategy']} {row['strikes']} ({row['quantities']})")
+        ax.axvspan(view_low, view_high, color='green', alpha=0.1, label='Visão')
+        ax.axhline(y=0, color='black', linestyle='-', alpha=0.3)
+        ax.axhline(y=-opt_max_loss, color='red', linestyle=':', label=f'Perda Máxima ({opt_max_loss}€)')
+        ax.set_title("Lucro no Vencimento das Melhores Estratégias")
+        ax.set_xlabel('Preço do Ativo no Vencimento (€)')
+        ax.set_ylabel('Lucro (€)')
+        ax.grid(True, alpha=0.3)
+        ax.legend()
+
+        charts.pyplot(fig)
+    else:
+        st.info("Nenhuma estratégia satisfaz as restrições; experimente aumentar a perda máxima ou o orçamento.")
+
 # Página de Paridade Put-Call
 elif page == "Paridade Put-Call":
     st.header("Paridade Put-Call")
@@ -479,7 +623,7 @@ elif page == "Paridade Put-Call":
         T = st.slider("Tempo até ao Vencimento (anos)", 0.1, 2.0, 1.0, 0.1)
         
         # Calcular preços teóricos (usando modelo muito básico para ilustração)
-        vol = 0.2  # Volatilidade assumida
+        vol = vol_estimate  # Volatilidade constante ou estimada a partir de preços históricos
         from scipy.stats import norm
         d1 = 1/(vol*np.sqrt(T)) * (np.log(S0/K) + (r + vol**2/2)*T)
         d2 = d1 - vol*np.sqrt(T)
@@ -491,6 +635,7 @@ elif page == "Paridade Put-Call":
         - Preço da Opção de Compra: **{call_price:.2f}€**
         - Preço da Opção de Venda: **{put_price:.2f}€**
         - Valor Presente do Exercício: **{K*np.exp(-r*T):.2f}€**
+        - Volatilidade Utilizada: **{vol*100:.1f}%**
         """)
         
         # Verificar paridade put-call
@@ -533,9 +678,14 @@ elif page == "Paridade Put-Call":
         ax.grid(True, alpha=0.3)
         ax.legend()
         
-        st.pyplot(fig)
-        
-        st.markdown(f"""
+        charts.pyplot(fig)
+
+        st.markdown("""
+        A linha verde (Call - Put) sobrepõe-se perfeitamente à linha preta tracejada (Ativo - Exercício) no vencimento,
+        demonstrando a paridade put-call.
+        """)
+
+        st.markdown(r"""
         ### Oportunidade de Arbitragem
         
         Se a paridade put-call não se mantiver no mercado, existe uma oportunidade de arbitragem:
@@ -544,6 +694,44 @@ elif page == "Paridade Put-Call":
         2. Se $C - P < S - K \cdot e^{-rT}$, compre a call, venda a put, compre o ativo e peça emprestado $K \cdot e^{-rT}$
         """)
 
+    # Procura de violações da paridade em cotações de mercado
+    st.subheader("Procura de Oportunidades de Arbitragem em Cotações")
+    st.markdown("""
+    Carregue um ficheiro de cotações com colunas `underlying`, `type` (call/put), `strike`, `expiry` (anos), `bid`, `ask`
+    e `spot` (ou `spot_bid` e `spot_ask`). Calls e puts com o mesmo subjacente, exercício e vencimento são emparelhadas e a
+    margem de cada conversão/reversão é calculada já descontando os spreads bid/ask, à taxa sem risco escolhida acima.
+    Para gerar um ficheiro de exemplo: `python parity_scanner.py sample cotacoes.csv`.
+    """)
+
+    parity_file = st.file_uploader("Ficheiro de Cotações Call/Put (CSV/Parquet)", type=["csv", "parquet"])
+    min_edge = st.number_input("Margem Mínima (€)", 0.0, 100.0, 0.05, 0.05)
+
+    if parity_file is not None:
+        try:
+            # Repetir a análise apenas quando o conteúdo do ficheiro ou os parâmetros mudam
+            scan_key = (file_hash(parity_file), r, min_edge)
+            if st.session_state.get("parity_scan_key") != scan_key:
+                st.session_state["parity_scan"] = scan_parity(parity_file, r, min_edge=min_edge)
+                st.session_state["parity_scan_key"] = scan_key
+            opportunities, scan_stats = st.session_state["parity_scan"]
+
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Cotações", f"{scan_stats['quotes']:,}")
+            col2.metric("Pares Call/Put", f"{scan_stats['pairs']:,}")
+            col3.metric("Violações", f"{scan_stats['violations']:,}")
+            col4.metric("Tempo de Análise", f"{scan_stats['elapsed']:.2f} s")
+
+            if len(opportunities):
+                st.dataframe(opportunities.rename(columns={
+                    "underlying": "Subjacente", "strike": "Exercício", "expiry": "Vencimento",
+                    "call_bid": "Call Bid", "call_ask": "Call Ask", "put_bid": "Put Bid", "put_ask": "Put Ask",
+                    "spot": "Ativo", "deviation": "Desvio (mid)", "edge": "Margem Líquida", "trade": "Operação",
+                }))
+            else:
+                st.info("Nenhuma violação da paridade acima da margem mínima depois dos custos de bid/ask.")
+        except ValueError as e:
+            st.error(str(e))
+
 # Página de Fatores que Afetam o Preço
 elif page == "Fatores que Afetam o Preço":
     st.header("Fatores que Afetam os Preços das Opções")
@@ -572,17 +760,15 @@ elif page == "Fatores que Afetam o Preço":
         K = 100
         r = 0.05
         T = 1.0
-        vol = 0.2
+        vol = vol_estimate
         
         # Gerar intervalo de preços
         S_range = np.linspace(70, 130, 100)
         
-        # Calcular preços teóricos usando aproximação Black-Scholes
-        from scipy.stats import norm
-        d1 = 1/(vol*np.sqrt(T)) * (np.log(S_range/K) + (r + vol**2/2)*T)
-        d2 = d1 - vol*np.sqrt(T)
-        call_prices = S_range * norm.cdf(d1) - K * np.exp(-r*T) * norm.cdf(d2)
-        put_prices = K * np.exp(-r*T) * norm.cdf(-d2) - S_range * norm.cdf(-d1)
+        # Calcular preços teóricos e deltas usando Black-Scholes
+        prices = option_prices(S_range, K, r, T, vol, fields=("call", "put", "call_delta", "put_delta"))
+        call_prices = prices["call"]
+        put_prices = prices["put"]
         
         # Gráfico
         fig, ax = plt.subplots(figsize=(10, 6))
@@ -599,14 +785,13 @@ elif page == "Fatores que Afetam o Preço":
         ax.grid(True, alpha=0.3)
         ax.legend()
         
-        st.pyplot(fig)
+        charts.pyplot(fig)
         
         # Adicionar curva delta
         st.subheader("Delta: Taxa de Variação com o Preço do Ativo")
         
-        # Calcular delta
-        call_delta = norm.cdf(d1)
-        put_delta = call_delta - 1
+        call_delta = prices["call_delta"]
+        put_delta = prices["put_delta"]
         
         # Gráfico delta
         fig2, ax2 = plt.subplots(figsize=(10, 6))
@@ -623,7 +808,7 @@ elif page == "Fatores que Afetam o Preço":
         ax2.grid(True, alpha=0.3)
         ax2.legend()
         
-        st.pyplot(fig2)
+        charts.pyplot(fig2)
         
         st.markdown("""
         **Delta** mede a taxa de variação do preço da opção em relação às variações no preço do ativo subjacente:
@@ -633,7 +818,54 @@ elif page == "Fatores que Afetam o Preço":
         
         O delta é importante para a cobertura de risco e para entender a exposição da opção aos movimentos de preço.
         """)
-        
+
+        # Simulação de cobertura delta discreta
+        st.subheader("Cobertura Delta: Simulação do Erro de Cobertura")
+        st.markdown("""
+        Um vendedor da opção recebe o prémio teórico e compra **delta** unidades do ativo, rebalanceando periodicamente.
+        Com rebalanceamento contínuo e sem custos o resultado final seria nulo; na prática sobra um **erro de cobertura**
+        que cresce com o intervalo entre rebalanceamentos e com os custos de transação.
+        """)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            hedge_instrument = st.selectbox("Posição Vendida", ["Opção de Compra", "Opção de Venda", "Straddle", "Bull Spread", "Butterfly Spread"])
+            hedge_frequency = st.radio("Frequência de Rebalanceamento", list(REBALANCE_FREQUENCIES), horizontal=True)
+        with col2:
+            hedge_cost = st.slider("Custo de Transação (% do montante negociado)", 0.0, 1.0, 0.0, 0.05) / 100
+            hedge_paths = st.slider("Número de Trajetórias", 1000, 20000, 5000, 1000)
+
+        if hedge_instrument == "Opção de Compra":
+            hedge_contracts = make_contracts("call", K, T)
+        elif hedge_instrument == "Opção de Venda":
+            hedge_contracts = make_contracts("put", K, T)
+        else:
+            hedge_strikes = {"Straddle": (K,), "Bull Spread": (K, K + 10), "Butterfly Spread": (K - 10, K, K + 10)}
+            hedge_contracts = strategy_contracts(hedge_instrument, *hedge_strikes[hedge_instrument], expiry=T)
+
+        hedge = cached_delta_hedge(hedge_contracts, 100, r, vol, n_paths=hedge_paths,
+                                   rebalance_every=REBALANCE_FREQUENCIES[hedge_frequency], cost=hedge_cost, seed=0)
+        summary = hedge_error_summary(hedge)
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Prémio Recebido", f"{hedge['premium']:.2f}€")
+        col2.metric("Erro Médio", f"{summary['mean']:.3f}€")
+        col3.metric("Desvio Padrão do Erro", f"{summary['std']:.3f}€")
+        col4.metric("Custos Médios", f"{summary['mean_costs']:.3f}€")
+
+        fig3, ax3 = plt.subplots(figsize=(10, 5))
+        ax3.hist(hedge["error"], bins=60, color='steelblue', alpha=0.8)
+        ax3.axvline(x=0, color='black', linestyle='-', alpha=0.5)
+        ax3.axvline(x=summary['q05'], color='red', linestyle='--', label=f"Quantil 5% ({summary['q05']:.2f}€)")
+        ax3.axvline(x=summary['q95'], color='green', linestyle='--', label=f"Quantil 95% ({summary['q95']:.2f}€)")
+        ax3.set_title(f"Distribuição do Erro de Cobertura ({summary['rebalances']} rebalanceamentos)")
+        ax3.set_xlabel('Resultado Final da Carteira Coberta (€)')
+        ax3.set_ylabel('Número de Trajetórias')
+        ax3.grid(True, alpha=0.3)
+        ax3.legend()
+
+        charts.pyplot(fig3)
+
     elif factor == "Tempo até ao Vencimento":
         st.subheader("Efeito do Tempo até ao Vencimento")
         st.markdown("""
@@ -649,7 +881,7 @@ elif page == "Fatores que Afetam o Preço":
         S0 = 100
         K = 100
         r = 0.05
-        vol = 0.2
+        vol = vol_estimate
         
         # Intervalos de tempo
         T_values = [2.0, 1.0, 0.5, 0.25, 0.1, 0.01]
@@ -662,10 +894,7 @@ elif page == "Fatores que Afetam o Preço":
         
         for T in T_values:
             # Calcular preços das calls
-        from scipy.stats import norm
-            d1 = 1/(vol*np.sqrt(T)) * (np.log(S_range/K) + (r + vol**2/2)*T)
-            d2 = d1 - vol*np.sqrt(T)
-            call_prices = S_range * norm.cdf(d1) - K * np.exp(-r*T) * norm.cdf(d2)
+            call_prices = option_prices(S_range, K, r, T, vol)["call"]
             
             ax.plot(S_range, call_prices, linewidth=2, label=f'T = {T} anos')
         
@@ -682,44 +911,25 @@ elif page == "Fatores que Afetam o Preço":
         ax.grid(True, alpha=0.3)
         ax.legend()
         
-        st.pyplot(fig)
+        charts.pyplot(fig)
         
         # Ilustração do decaimento temporal
         st.subheader("Ilustração do Decaimento Temporal")
         
         # Preço fixo
-        atm_call_prices = []
-        otm_call_prices = []
-        itm_call_prices = []
         days = np.linspace(365, 0, 100)
         years = days/365
         
-        for T in years:
-            if T == 0:
-                # No vencimento
-                atm_call = max(S0 - K, 0)
-                otm_call = max(S0*0.9 - K, 0)
-                itm_call = max(S0*1.1 - K, 0)
-            else:
-                # Calcular preços das calls
-                # At-the-money
-                d1 = 1/(vol*np.sqrt(T)) * (np.log(S0/K) + (r + vol**2/2)*T)
-                d2 = d1 - vol*np.sqrt(T)
-                atm_call = S0 * norm.cdf(d1) - K * np.exp(-r*T) * norm.cdf(d2)
-                
-                # Out-of-the-money
-                d1 = 1/(vol*np.sqrt(T)) * (np.log(S0*0.9/K) + (r + vol**2/2)*T)
-                d2 = d1 - vol*np.sqrt(T)
-                otm_call = S0*0.9 * norm.cdf(d1) - K * np.exp(-r*T) * norm.cdf(d2)
-                
-                # In-the-money
-                d1 = 1/(vol*np.sqrt(T)) * (np.log(S0*1.1/K) + (r + vol**2/2)*T)
-                d2 = d1 - vol*np.sqrt(T)
-                itm_call = S0*1.1 * norm.cdf(d1) - K * np.exp(-r*T) * norm.cdf(d2)
-            
-            atm_call_prices.append(atm_call)
-            otm_call_prices.append(otm_call)
-            itm_call_prices.append(itm_call)
+        # Calcular preços das calls para todas as datas de uma vez (no vencimento, o payoff)
+        def decay_curve(S):
+            prices = call_payoff(S, K) * np.ones_like(years)
+            alive = years > 0
+            prices[alive] = option_prices(S, K, r, years[alive], vol)["call"]
+            return prices
+        
+        atm_call_prices = decay_curve(S0)        # At-the-money
+        otm_call_prices = decay_curve(S0*0.9)    # Out-of-the-money
+        itm_call_prices = decay_curve(S0*1.1)    # In-the-money
         
         fig2, ax2 = plt.subplots(figsize=(10, 6))
         
@@ -733,7 +943,7 @@ elif page == "Fatores que Afetam o Preço":
         ax2.grid(True, alpha=0.3)
         ax2.legend()
         
-        st.pyplot(fig2)
+        charts.pyplot(fig2)
         
         st.markdown("""
         O gráfico mostra como os preços das opções convergem para o seu valor intrínseco à medida que o vencimento se aproxima:
@@ -773,9 +983,7 @@ elif page == "Fatores que Afetam o Preço":
         
         for vol in vol_values:
             # Calcular preços das calls
-            d1 = 1/(vol*np.sqrt(T)) * (np.log(S_range/K) + (r + vol**2/2)*T)
-            d2 = d1 - vol*np.sqrt(T)
-            call_prices = S_range * norm.cdf(d1) - K * np.exp(-r*T) * norm.cdf(d2)
+            call_prices = option_prices(S_range, K, r, T, vol)["call"]
             
             ax.plot(S_range, call_prices, linewidth=2, label=f'σ = {vol*100:.0f}%')
         
@@ -792,33 +1000,58 @@ elif page == "Fatores que Afetam o Preço":
         ax.grid(True, alpha=0.3)
         ax.legend()
         
-        st.pyplot(fig)
+        charts.pyplot(fig)
         
         # Ilustração do sorriso de volatilidade
         st.subheader("Sorriso de Volatilidade")
         
-        # Criar dados sintéticos de volatilidade implícita para visualização
+        # Superfície de volatilidade: sintética por omissão, ou calibrada (SVI) a um ficheiro de cotações
+        quotes_file = st.file_uploader(
+            "Ficheiro de cotações (CSV/Parquet com colunas maturity, strike, implied_vol)",
+            type=["csv", "parquet"]
+        )
+
+        surface = default_vol_surface(S0, r, atm_vol=vol_estimate)
+        quotes = None
+        if quotes_file is not None:
+            try:
+                quotes = load_quotes(quotes_file)
+                # Recalibrar apenas quando o conteúdo do ficheiro (ou S0, r) muda, partindo da calibração anterior
+                quotes_key = (file_hash(quotes_file), S0, r)
+                if st.session_state.get("vol_surface_key") != quotes_key:
+                    st.session_state["vol_surface"] = calibrate_vol_surface(
+                        quotes, S0, r, previous=st.session_state.get("vol_surface")
+                    )
+                    st.session_state["vol_surface_key"] = quotes_key
+                surface = st.session_state["vol_surface"]
+            except ValueError as e:
+                st.error(str(e))
+                quotes = None
+
+        T_slice = st.slider("Maturidade da Fatia (anos)", 0.1, 2.0, T, 0.1)
+
+        # O sorriso é uma fatia da superfície à maturidade escolhida
         strikes = np.linspace(80, 120, 9)
-        atm_vol = 0.2
-        
-        # Sorriso de volatilidade sintético
-        def vol_smile(k):
-            return atm_vol + 0.001 * (k-K)**2
-        
-        implied_vols = [vol_smile(k) for k in strikes]
-        
+        implied_vols = surface.implied_vol(strikes, T_slice)
+
         fig2, ax2 = plt.subplots(figsize=(10, 6))
-        
-        ax2.plot(strikes, implied_vols, 'b-o', linewidth=2)
-        
+
+        ax2.plot(strikes, implied_vols, 'b-o', linewidth=2, label=f'Superfície (T = {T_slice} anos)')
+
+        if quotes is not None:
+            near = np.isclose(quotes["maturity"], T_slice, atol=0.05)
+            if near.any():
+                ax2.plot(quotes.loc[near, "strike"], quotes.loc[near, "implied_vol"], 'rx', label='Cotações')
+
         ax2.axvline(x=S0, color='gray', linestyle='--', label=f'Preço Atual ({S0}€)')
-        
+
         ax2.set_title("Sorriso de Volatilidade Implícita")
         ax2.set_xlabel('Preço de Exercício (€)')
         ax2.set_ylabel('Volatilidade Implícita')
         ax2.grid(True, alpha=0.3)
-        
-        st.pyplot(fig2)
+        ax2.legend()
+
+        charts.pyplot(fig2)
         
         st.markdown("""
         ### Sorriso de Volatilidade
@@ -849,7 +1082,7 @@ elif page == "Fatores que Afetam o Preço":
         S0 = 100
         K = 100
         T = 1.0
-        vol = 0.2
+        vol = vol_estimate
         
         # Valores de taxa de juro
         r_values = [0.01, 0.03, 0.05, 0.07, 0.10]
@@ -861,11 +1094,10 @@ elif page == "Fatores que Afetam o Preço":
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
         
         for r in r_values:
-            # Calcular preços das calls
-            d1 = 1/(vol*np.sqrt(T)) * (np.log(S_range/K) + (r + vol**2/2)*T)
-            d2 = d1 - vol*np.sqrt(T)
-            call_prices = S_range * norm.cdf(d1) - K * np.exp(-r*T) * norm.cdf(d2)
-            put_prices = K * np.exp(-r*T) * norm.cdf(-d2) - S_range * norm.cdf(-d1)
+            # Calcular preços das calls e puts
+            prices = option_prices(S_range, K, r, T, vol)
+            call_prices = prices["call"]
+            put_prices = prices["put"]
             
             ax1.plot(S_range, call_prices, linewidth=2, label=f'r = {r*100:.0f}%')
             ax2.plot(S_range, put_prices, linewidth=2, label=f'r = {r*100:.0f}%')
@@ -886,7 +1118,7 @@ elif page == "Fatores que Afetam o Preço":
         ax2.grid(True, alpha=0.3)
         ax2.legend()
         
-        st.pyplot(fig)
+        charts.pyplot(fig)
         
         # Ilustração do valor presente
         st.subheader("Valor Presente do Preço de Exercício")
@@ -903,7 +1135,7 @@ elif page == "Fatores que Afetam o Preço":
         ax3.set_ylabel('Valor Presente do Exercício (€)')
         ax3.grid(True, alpha=0.3)
         
-        st.pyplot(fig2)
+        charts.pyplot(fig2)
         
         st.markdown("""
         O valor presente do preço de exercício diminui à medida que as taxas de juro aumentam. Isto explica por que:
@@ -930,7 +1162,7 @@ elif page == "Fatores que Afetam o Preço":
         S0 = 100
         r = 0.05
         T = 1.0
-        vol = 0.2
+        vol = vol_estimate
         
         # Valores de exercício
         K_values = [80, 90, 100, 110, 120]
@@ -943,10 +1175,9 @@ elif page == "Fatores que Afetam o Preço":
         
         for K in K_values:
             # Calcular preços
-            d1 = 1/(vol*np.sqrt(T)) * (np.log(S_range/K) + (r + vol**2/2)*T)
-            d2 = d1 - vol*np.sqrt(T)
-            call_prices = S_range * norm.cdf(d1) - K * np.exp(-r*T) * norm.cdf(d2)
-            put_prices = K * np.exp(-r*T) * norm.cdf(-d2) - S_range * norm.cdf(-d1)
+            prices = option_prices(S_range, K, r, T, vol)
+            call_prices = prices["call"]
+            put_prices = prices["put"]
             
             ax1.plot(S_range, call_prices, linewidth=2, label=f'K = {K}€')
             ax2.plot(S_range, put_prices, linewidth=2, label=f'K = {K}€')
@@ -967,16 +1198,15 @@ elif page == "Fatores que Afetam o Preço":
         ax2.grid(True, alpha=0.3)
         ax2.legend()
         
-        st.pyplot(fig)
+        charts.pyplot(fig)
         
         # Gráfico do preço da opção vs. exercício
         K_range = np.linspace(70, 130, 100)
         
         # Calcular preços
-        d1 = 1/(vol*np.sqrt(T)) * (np.log(S0/K_range) + (r + vol**2/2)*T)
-        d2 = d1 - vol*np.sqrt(T)
-        call_prices = S0 * norm.cdf(d1) - K_range * np.exp(-r*T) * norm.cdf(d2)
-        put_prices = K_range * np.exp(-r*T) * norm.cdf(-d2) - S0 * norm.cdf(-d1)
+        prices = option_prices(S0, K_range, r, T, vol)
+        call_prices = prices["call"]
+        put_prices = prices["put"]
         
         fig2, ax3 = plt.subplots(figsize=(10, 6))
         
@@ -991,7 +1221,7 @@ elif page == "Fatores que Afetam o Preço":
         ax3.grid(True, alpha=0.3)
         ax3.legend()
         
-        st.pyplot(fig2)
+        charts.pyplot(fig2)
         
         st.markdown("""
         Os gráficos mostram como os preços das opções variam com o preço de exercício:
@@ -1003,6 +1233,85 @@ elif page == "Fatores que Afetam o Preço":
         A seleção do preço de exercício é crítica nas estratégias de opções.
         """)
 
+# Página de Carteira de Opções
+elif page == "Carteira de Opções":
+    st.header("Carteira de Opções")
+    
+    st.markdown("""
+    Uma carteira real contém muitas posições em opções sobre diferentes ativos e vencimentos.
+    Aqui a carteira é agregada por ativo subjacente (ou por ativo e vencimento):
+    
+    - As **pernas idênticas** (mesmo ativo, tipo, exercício e vencimento) são compensadas
+    - O **valor** e os **gregos** de cada grupo são a soma das posições ponderadas pela quantidade
+    - O **lucro no vencimento** mostra o resultado do grupo para variações do preço do subjacente
+    """)
+    
+    book_file = st.file_uploader(
+        "Ficheiro da carteira (CSV/Parquet com colunas underlying, type, strike, expiry, quantity, premium, spot)",
+        type=["csv", "parquet"]
+    )
+    
+    book = None
+    if book_file is not None:
+        try:
+            book = Portfolio.load(book_file)
+        except ValueError as e:
+            st.error(str(e))
+    else:
+        st.info("Sem ficheiro carregado: a usar uma carteira sintética de 20 000 posições.")
+        book = sample_portfolio()
+    
+    if book is not None:
+        col1, col2 = st.columns(2)
+        with col1:
+            r = st.slider("Taxa Sem Risco (%)", 0.0, 10.0, 3.0) / 100
+            group_by = st.radio("Agrupar por", ["Ativo Subjacente", "Ativo e Vencimento"])
+        
+        netted = book.net()
+        by = "underlying" if group_by == "Ativo Subjacente" else "underlying_expiry"
+        
+        with col2:
+            st.markdown(f"""
+            - Posições na carteira: **{len(book)}**
+            - Posições após compensação: **{len(netted)}**
+            - Ativos subjacentes: **{len(book.underlyings)}**
+            - Volatilidade utilizada: **{vol_estimate*100:.1f}%**
+            """)
+        
+        risk = netted.aggregate_risk(r, vol_estimate, by=by)
+        risk = risk.rename(columns={
+            "underlying": "Subjacente", "expiry": "Vencimento (anos)", "positions": "Posições",
+            "value": "Valor (€)", "delta": "Delta", "gamma": "Gama", "vega": "Vega",
+            "theta": "Theta", "pnl": "Lucro Atual (€)"
+        })
+        st.subheader("Valor e Gregos Agregados")
+        st.dataframe(risk)
+        
+        st.subheader("Lucro no Vencimento por Ativo Subjacente")
+        selected = st.selectbox("Ativo Subjacente", list(book.underlyings))
+        shocks = np.linspace(-0.5, 0.5, 101)
+        labels, profit = netted.aggregate_payoff(shocks)
+        row = np.flatnonzero(labels["underlying"] == selected)
+        spot = book.spots[list(book.underlyings).index(selected)]
+        
+        fig, ax = plt.subplots(figsize=(10, 6))
+        if len(row):
+            ax.plot(spot * (1 + shocks), profit[row[0]], 'g-', linewidth=2, label='Lucro no Vencimento')
+        ax.axhline(y=0, color='black', linestyle='-', alpha=0.3)
+        ax.axvline(x=spot, color='purple', linestyle='-', label=f'Preço Atual ({spot:.2f}€)')
+        ax.set_title(f"Lucro no Vencimento da Carteira em {selected}")
+        ax.set_xlabel('Preço do Ativo no Vencimento (€)')
+        ax.set_ylabel('Lucro (€)')
+        ax.grid(True, alpha=0.3)
+        ax.legend()
+        
+        charts.pyplot(fig)
+        
+        st.markdown("""
+        O lucro no vencimento assume que todas as posições do ativo vencem ao mesmo tempo, e é calculado
+        a partir dos payoffs de cada perna menos o prémio pago (ou mais o prémio recebido).
+        """)
+
 # Rodapé
 st.markdown("---")
 st.markdown("""
@@ -1045,4 +1354,13 @@ Para questões apenas relacionadas com os aspetos educacionais da aplicação, p
 
 ---
 *© 2025 Luís Simões da Cunha. Todos os direitos reservados, exceto os concedidos sob a licença CC BY-NC.*
-""")
\ No newline at end of file
+""")
+
+# Preencher os gráficos à medida que a renderização termina
+charts.flush()
+
+if charts.stats:
+    with st.sidebar.expander("Dados dos Gráficos"):
+        st.dataframe(pd.DataFrame(charts.stats).rename(columns={
+            "chart": "Gráfico", "points": "Pontos", "sent": "Pontos Enviados", "bytes": "Bytes (Arrow)", "ms": "Preparação (ms)",
+        }))
@@ -0,0 +1,310 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_files import iter_frames
+
+# Procura de violações da paridade put-call em ficheiros locais de cotações (CSV ou
+# Parquet) com milhões de linhas, em memória limitada:
+#
+# 1. O ficheiro é lido em blocos; cada cotação é convertida num registo compacto e
+#    escrita numa de várias partições em disco, escolhida pelo hash da chave
+#    (subjacente, exercício, vencimento). Call e put do mesmo par caem sempre na mesma
+#    partição.
+# 2. Cada partição é lida sozinha e as calls são emparelhadas com as puts por ordenação
+#    (sort-merge join). As margens de arbitragem líquidas de bid/ask são calculadas numa
+#    só passagem vetorizada e só as melhores oportunidades são mantidas.
+#
+# A memória máxima é a de um bloco de leitura ou de uma partição, não a do ficheiro. Uma
+# partição com mais de max_partition_rows registos (ficheiros grandes ou chaves mal
+# distribuídas) é lida aos bocados e repartida com outra função de hash, até ficar abaixo
+# do limite, pelo que o tamanho das partições não cresce com o do ficheiro.
+
+QUOTE_COLUMNS = ["underlying", "type", "strike", "expiry", "bid", "ask", "spot"]
+CHUNK_ROWS = 200_000
+N_PARTITIONS = 32
+MAX_PARTITION_ROWS = 1_000_000
+MAX_SPLIT_LEVEL = 4
+
+QUOTE_DTYPE = np.dtype([
+    ("underlying", np.uint32),
+    ("is_call", np.bool_),
+    ("strike", np.float64),
+    ("expiry", np.float64),
+    ("bid", np.float64),
+    ("ask", np.float64),
+    ("spot_bid", np.float64),
+    ("spot_ask", np.float64),
+    ("row", np.int64),
+])
+
+
+def _normalize(frame):
+    frame = frame.rename(columns=lambda c: str(c).strip().lower())
+    if "spot" not in frame.columns and {"spot_bid", "spot_ask"} <= set(frame.columns):
+        frame["spot"] = np.nan
+    missing = [c for c in QUOTE_COLUMNS if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Colunas em falta nas cotações: {', '.join(missing)}")
+    return frame
+
+
+# Blocos do ficheiro como DataFrames com nomes de colunas normalizados
+def iter_quote_chunks(source, chunk_rows=CHUNK_ROWS):
+    for chunk in iter_frames(source, chunk_rows):
+        yield _normalize(chunk)
+
+
+# Conversão de um bloco para registos compactos; os nomes dos subjacentes são
+# traduzidos para códigos inteiros partilhados por todos os blocos
+def _to_records(frame, codes, first_row):
+    option_type = frame["type"].astype(str).str.strip().str.lower()
+    if not option_type.isin(["call", "put"]).all():
+        raise ValueError("A coluna type só pode conter 'call' ou 'put'")
+
+    labels, uniques = pd.factorize(frame["underlying"].astype(str))
+    lookup = np.array([codes.setdefault(u, len(codes)) for u in uniques], dtype=np.uint32)
+
+    records = np.empty(len(frame), dtype=QUOTE_DTYPE)
+    records["underlying"] = lookup[labels]
+    records["is_call"] = option_type.to_numpy() == "call"
+    for field in ["strike", "expiry", "bid", "ask"]:
+        records[field] = frame[field].to_numpy(dtype=float)
+    spot = frame["spot"].to_numpy(dtype=float)
+    records["spot_bid"] = frame["spot_bid"].to_numpy(dtype=float) if "spot_bid" in frame else spot
+    records["spot_ask"] = frame["spot_ask"].to_numpy(dtype=float) if "spot_ask" in frame else spot
+    records["row"] = np.arange(first_row, first_row + len(frame))
+
+    valid = (records["bid"] >= 0) & (records["ask"] >= records["bid"]) & (records["expiry"] > 0)
+    return records[valid]
+
+
+# Partição de cada registo: mistura (multiplicativa) dos bits da chave; cada nível de
+# repartição usa uma mistura diferente
+def _partition(records, n_partitions, level=0):
+    key = records["strike"].view(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    key ^= records["expiry"].view(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)
+    key ^= records["underlying"].astype(np.uint64) * np.uint64(0x165667B19E3779F9)
+    key ^= key >> np.uint64(29)
+    if level:
+        key ^= np.uint64(level * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF)
+        key *= np.uint64(0xBF58476D1CE4E5B9)
+        key ^= key >> np.uint64(31)
+    return (key % np.uint64(n_partitions)).astype(np.intp)
+
+
+# Escreve os blocos de registos em n_partitions ficheiros; devolve os caminhos
+def _spill(blocks, prefix, n_partitions, level=0):
+    paths = [f"{prefix}{i:03d}.bin" for i in range(n_partitions)]
+    files = [open(p, "wb") for p in paths]
+    try:
+        for records in blocks:
+            part = _partition(records, n_partitions, level)
+            order = np.argsort(part, kind="stable")
+            records = records[order]
+            bounds = np.searchsorted(part[order], np.arange(n_partitions + 1))
+            for i in np.flatnonzero(np.diff(bounds)):
+                records[bounds[i]:bounds[i + 1]].tofile(files[i])
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def _read_slices(path, rows, slice_rows):
+    for first in range(0, rows, slice_rows):
+        yield np.fromfile(path, dtype=QUOTE_DTYPE, count=slice_rows, offset=first * QUOTE_DTYPE.itemsize)
+
+
+# Registos de cada partição, repartindo (em 2 x o número de vezes que excede o limite)
+# as partições com mais de max_rows registos
+def _iter_partitions(paths, max_rows, level=0):
+    for path in paths:
+        rows = os.path.getsize(path) // QUOTE_DTYPE.itemsize
+        if rows > max_rows and level < MAX_SPLIT_LEVEL:
+            n_split = 2 * -(-rows // max_rows)
+            split = _spill(_read_slices(path, rows, max_rows), path[:-4] + "_", n_split, level + 1)
+            os.remove(path)
+            yield from _iter_partitions(split, max_rows, level + 1)
+        elif rows:
+            records = np.fromfile(path, dtype=QUOTE_DTYPE)
+            os.remove(path)
+            yield records
+
+
+# Fica só a última cotação de cada chave (subjacente, vencimento, exercício, tipo)
+def _latest(records):
+    order = np.lexsort((records["row"], records["is_call"], records["strike"], records["expiry"], records["underlying"]))
+    records = records[order]
+    superseded = np.zeros(len(records), dtype=bool)
+    superseded[:-1] = True
+    for field in ["underlying", "expiry", "strike", "is_call"]:
+        superseded[:-1] &= records[field][1:] == records[field][:-1]
+    return records[~superseded]
+
+
+# Sort-merge join: depois de ordenar por chave e tipo, uma put seguida da call com a
+# mesma chave forma um par
+def _join(records):
+    records = _latest(records)
+    same_key = np.ones(max(len(records) - 1, 0), dtype=bool)
+    for field in ["underlying", "expiry", "strike"]:
+        same_key &= records[field][1:] == records[field][:-1]
+    pair = np.flatnonzero(same_key & ~records["is_call"][:-1] & records["is_call"][1:])
+    return records[pair + 1], records[pair]
+
+
+# Margens de arbitragem líquidas de bid/ask de cada par call/put:
+# - conversão (C - P demasiado alto): vende call, compra put, compra ativo, pede K e^{-rT}
+# - reversão (C - P demasiado baixo): compra call, vende put, vende ativo, empresta K e^{-rT}
+def parity_edges(calls, puts, r):
+    discounted_K = calls["strike"] * np.exp(-r * calls["expiry"])
+    conversion = calls["bid"] - puts["ask"] - calls["spot_ask"] + discounted_K
+    reversal = puts["bid"] - calls["ask"] + calls["spot_bid"] - discounted_K
+    mid_spot = (calls["spot_bid"] + calls["spot_ask"]) / 2
+    deviation = (calls["bid"] + calls["ask"]) / 2 - (puts["bid"] + puts["ask"]) / 2 - (mid_spot - discounted_K)
+    return conversion, reversal, deviation
+
+
+def _opportunities(calls, puts, r, min_edge):
+    conversion, reversal, deviation = parity_edges(calls, puts, r)
+    edge = np.maximum(conversion, reversal)
+    hit = edge > min_edge
+    return {
+        "underlying": calls["underlying"][hit],
+        "strike": calls["strike"][hit],
+        "expiry": calls["expiry"][hit],
+        "call_bid": calls["bid"][hit],
+        "call_ask": calls["ask"][hit],
+        "put_bid": puts["bid"][hit],
+        "put_ask": puts["ask"][hit],
+        "spot": calls["spot_ask"][hit],
+        "deviation": deviation[hit],
+        "edge": edge[hit],
+        "trade": np.where(conversion[hit] >= reversal[hit], "conversão", "reversão"),
+    }
+
+
+# Junta as oportunidades de uma partição às melhores até agora, mantendo no máximo `top`
+def _keep_best(best, found, top):
+    merged = found if best is None else {k: np.concatenate([best[k], found[k]]) for k in found}
+    if len(merged["edge"]) > top:
+        keep = np.argpartition(-merged["edge"], top - 1)[:top]
+        merged = {k: v[keep] for k, v in merged.items()}
+    return merged
+
+
+def scan_parity(source, r, min_edge=0.0, top=100, chunk_rows=CHUNK_ROWS, n_partitions=N_PARTITIONS, spill_dir=None,
+                max_partition_rows=MAX_PARTITION_ROWS):
+    start = time.perf_counter()
+    codes = {}
+    stats = {"quotes": 0, "valid_quotes": 0, "pairs": 0, "violations": 0, "partitions": 0}
+
+    def records():
+        for chunk in iter_quote_chunks(source, chunk_rows):
+            block = _to_records(chunk, codes, stats["quotes"])
+            stats["quotes"] += len(chunk)
+            stats["valid_quotes"] += len(block)
+            yield block
+
+    with tempfile.TemporaryDirectory(dir=spill_dir) as tmp:
+        paths = _spill(records(), os.path.join(tmp, "part"), n_partitions)
+        read_time = time.perf_counter() - start
+
+        best = None
+        for partition in _iter_partitions(paths, max_partition_rows):
+            stats["partitions"] += 1
+            calls, puts = _join(partition)
+            stats["pairs"] += len(calls)
+            found = _opportunities(calls, puts, r, min_edge)
+            stats["violations"] += len(found["edge"])
+            best = _keep_best(best, found, top)
+
+    if best is None:
+        empty = np.empty(0, dtype=QUOTE_DTYPE)
+        best = _opportunities(empty, empty, r, min_edge)
+    names = np.array(list(codes) or [""], dtype=object)
+    best["underlying"] = names[best["underlying"]]
+    table = pd.DataFrame(best).sort_values("edge", ascending=False, ignore_index=True)
+
+    stats["read_time"] = read_time
+    stats["elapsed"] = time.perf_counter() - start
+    return table, stats
+
+
+# Ficheiro sintético de cotações com algumas violações introduzidas de propósito
+def sample_quotes(n_pairs=500_000, n_underlyings=50, violation_rate=0.001, r=0.03, seed=0):
+    from pricing import black_scholes
+
+    rng = np.random.default_rng(seed)
+    names = np.array([f"ATIVO{i:02d}" for i in range(n_underlyings)])
+    spots = rng.uniform(20, 200, n_underlyings)
+    vols = rng.uniform(0.15, 0.45, n_underlyings)
+    expiries = np.array([1 / 12, 0.25, 0.5, 1.0, 2.0])
+
+    # Chaves (subjacente, vencimento, exercício) distintas, sorteadas de uma grelha
+    n_strikes = 2 * -(-n_pairs // (n_underlyings * len(expiries)))
+    cell = rng.choice(n_underlyings * len(expiries) * n_strikes, n_pairs, replace=False)
+    code, rest = np.divmod(cell, len(expiries) * n_strikes)
+    expiry_index, strike_index = np.divmod(rest, n_strikes)
+    S = spots[code]
+    K = np.round(S * (0.7 + 0.6 * strike_index / n_strikes), 4)
+    T = expiries[expiry_index]
+    call, put = black_scholes(S, K, r, T, vols[code])
+
+    # Desvio da paridade num pequeno número de pares, em ambos os sentidos
+    shift = np.where(rng.random(n_pairs) < violation_rate, rng.choice([-1, 1], n_pairs) * rng.uniform(0.5, 2, n_pairs), 0.0)
+    call = np.maximum(call + shift, 0.01)
+    spread = np.maximum(0.02, 0.01 * (call + put))
+
+    half = spread / 2
+    frame = pd.DataFrame({
+        "underlying": np.concatenate([names[code], names[code]]),
+        "type": np.repeat(["call", "put"], n_pairs),
+        "strike": np.concatenate([K, K]),
+        "expiry": np.concatenate([T, T]),
+        "bid": np.round(np.maximum(np.concatenate([call - half, put - half]), 0.0), 2),
+        "ask": np.round(np.concatenate([call + half, put + half]), 2),
+        "spot": np.concatenate([S, S]),
+    })
+    return frame.sample(frac=1, random_state=seed, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Procura de violações da paridade put-call em ficheiros de cotações")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    scan = subparsers.add_parser("scan", help="analisar um ficheiro CSV/Parquet de cotações")
+    scan.add_argument("file")
+    scan.add_argument("--rate", type=float, default=0.03)
+    scan.add_argument("--min-edge", type=float, default=0.0)
+    scan.add_argument("--top", type=int, default=20)
+    scan.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    sample = subparsers.add_parser("sample", help="gerar um ficheiro sintético de cotações")
+    sample.add_argument("file")
+    sample.add_argument("--pairs", type=int, default=500_000)
+    args = parser.parse_args()
+
+    if args.command == "sample":
+        frame = sample_quotes(args.pairs)
+        if args.file.endswith(".parquet"):
+            frame.to_parquet(args.file, index=False)
+        else:
+            frame.to_csv(args.file, index=False)
+        print(f"{len(frame)} cotações escritas em {args.file}")
+        return
+
+    table, stats = scan_parity(args.file, args.rate, args.min_edge, args.top, args.chunk_rows)
+    print(f"{stats['quotes']} cotações ({stats['valid_quotes']} válidas), {stats['pairs']} pares call/put, "
+          f"{stats['violations']} violações")
+    print(f"leitura e partição: {stats['read_time']:.2f} s, total: {stats['elapsed']:.2f} s "
+          f"({stats['quotes'] / stats['elapsed'] / 1e6:.2f} M cotações/s)")
+    with pd.option_context("display.width", 160, "display.max_columns", None):
+        print(table.head(args.top).to_string(float_format=lambda x: f"{x:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
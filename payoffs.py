@@ -0,0 +1,122 @@
+import numpy as np
+
+import kernels
+
+# Funções básicas para calcular payoffs (núcleo compilado em grelhas grandes, se disponível)
+def call_payoff(S, K):
+    if kernels.use_jit(S, K, min_size=kernels.PAYOFF_JIT_MIN_SIZE):
+        return kernels.payoff_jit(S, K, 1)
+    return np.maximum(S - K, 0)
+
+def put_payoff(S, K):
+    if kernels.use_jit(S, K, min_size=kernels.PAYOFF_JIT_MIN_SIZE):
+        return kernels.payoff_jit(S, K, -1)
+    return np.maximum(K - S, 0)
+
+def binary_call_payoff(S, K):
+    return (S > K).astype(float)
+
+def binary_put_payoff(S, K):
+    return (S < K).astype(float)
+
+
+# Digitais: cash-or-nothing paga `cash`; gap paga S - K_pay (call) ou K_pay - S (put)
+# quando o preço ultrapassa o gatilho K_trigger
+def cash_or_nothing_payoff(S, K, cash=1.0, option="call"):
+    hit = S > K if option == "call" else S < K
+    return np.where(hit, cash, 0.0)
+
+def asset_or_nothing_payoff(S, K, option="call"):
+    hit = S > K if option == "call" else S < K
+    return np.where(hit, S, 0.0)
+
+def gap_payoff(S, K_trigger, K_pay, option="call"):
+    if option == "call":
+        return np.where(S > K_trigger, S - K_pay, 0.0)
+    return np.where(S < K_trigger, K_pay - S, 0.0)
+
+
+# Trajetórias de preços simuladas (n_trajetórias x n_passos, sem S0) partilhadas por
+# todos os payoffs dependentes da trajetória. Cada redução (máximo, mínimo, médias) é
+# calculada uma única vez sobre o mesmo buffer e reutilizada.
+class PathSet:
+    def __init__(self, paths, S0):
+        self.paths = paths
+        self.S0 = S0
+        self._cache = {}
+
+    def _reduce(self, name, fn):
+        if name not in self._cache:
+            self._cache[name] = fn()
+        return self._cache[name]
+
+    @property
+    def terminal(self):
+        return self.paths[:, -1]
+
+    @property
+    def maximum(self):
+        return self._reduce("maximum", lambda: np.maximum(self.paths.max(axis=1), self.S0))
+
+    @property
+    def minimum(self):
+        return self._reduce("minimum", lambda: np.minimum(self.paths.min(axis=1), self.S0))
+
+    @property
+    def arithmetic_mean(self):
+        return self._reduce("arithmetic_mean", lambda: self.paths.mean(axis=1))
+
+    @property
+    def geometric_mean(self):
+        return self._reduce("geometric_mean", lambda: np.exp(np.log(self.paths).mean(axis=1)))
+
+
+# Simulação de trajetórias geométricas brownianas escrita num buffer reutilizável
+def simulate_gbm_paths(S0, r, vol, T, n_paths, n_steps, rng=None, out=None):
+    rng = np.random.default_rng() if rng is None else rng
+    if out is None:
+        out = np.empty((n_paths, n_steps))
+    dt = T / n_steps
+    rng.standard_normal(out=out)
+    out *= vol * np.sqrt(dt)
+    out += (r - vol**2 / 2) * dt
+    np.cumsum(out, axis=1, out=out)
+    np.exp(out, out=out)
+    out *= S0
+    return PathSet(out, S0)
+
+
+# Barreiras (monitorização discreta nas datas da simulação): kind é "up-and-out",
+# "up-and-in", "down-and-out" ou "down-and-in"
+def barrier_payoff(paths, K, barrier, kind="up-and-out", option="call"):
+    direction, knock = kind.split("-and-")
+    if direction == "up":
+        touched = paths.maximum >= barrier
+    else:
+        touched = paths.minimum <= barrier
+    alive = touched if knock == "in" else ~touched
+    vanilla = call_payoff(paths.terminal, K) if option == "call" else put_payoff(paths.terminal, K)
+    return np.where(alive, vanilla, 0.0)
+
+
+# Asiáticas de preço de exercício fixo sobre as datas de observação da simulação
+def asian_payoff(paths, K, average="arithmetic", option="call"):
+    mean = paths.arithmetic_mean if average == "arithmetic" else paths.geometric_mean
+    return call_payoff(mean, K) if option == "call" else put_payoff(mean, K)
+
+
+# Lookback: exercício flutuante se K for None, caso contrário exercício fixo
+def lookback_payoff(paths, K=None, option="call"):
+    if K is None:
+        if option == "call":
+            return paths.terminal - paths.minimum
+        return paths.maximum - paths.terminal
+    if option == "call":
+        return call_payoff(paths.maximum, K)
+    return put_payoff(paths.minimum, K)
+
+
+# Preço Monte Carlo descontado e respetivo erro padrão
+def monte_carlo_price(payoff, r, T):
+    discount = np.exp(-r * T)
+    return discount * payoff.mean(), discount * payoff.std(ddof=1) / np.sqrt(len(payoff))
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+
+from contracts import PUT
+from data_files import read_frame
+from payoffs import call_payoff, put_payoff
+from pricing import black_scholes, black_scholes_greeks
+
+# Carteira de opções em formato colunar (um array por campo, uma posição por índice).
+# As agregações ordenam as posições pela chave de agrupamento e usam reduções
+# segmentadas (np.add.reduceat) em vez de ciclos Python sobre as posições.
+
+BOOK_COLUMNS = ["underlying", "type", "strike", "expiry", "quantity", "premium", "spot"]
+OPTION_TYPES = np.array(["call", "put"])
+
+
+class Portfolio:
+    def __init__(self, underlying, option_type, strike, expiry, quantity, premium, spot=None):
+        self.underlyings, self.underlying_code = np.unique(np.asarray(underlying, dtype=str), return_inverse=True)
+        self.is_call = np.asarray(option_type) == "call"
+        self.strike = np.asarray(strike, dtype=float)
+        self.expiry = np.asarray(expiry, dtype=float)
+        self.quantity = np.asarray(quantity, dtype=float)
+        self.premium = np.asarray(premium, dtype=float)
+        # Fluxo de caixa já realizado por posição (pernas fechadas pela compensação)
+        self.realized = np.zeros(len(self.strike))
+
+        # Preço atual de cada ativo subjacente (um valor por subjacente)
+        self.spots = np.full(len(self.underlyings), np.nan)
+        if spot is not None:
+            self.spots[self.underlying_code] = np.asarray(spot, dtype=float)
+
+    def __len__(self):
+        return len(self.strike)
+
+    @classmethod
+    def from_frame(cls, frame):
+        frame = frame.rename(columns=lambda c: str(c).strip().lower())
+        missing = [c for c in BOOK_COLUMNS if c not in frame.columns]
+        if missing:
+            raise ValueError(f"Colunas em falta na carteira: {', '.join(missing)}")
+        option_type = frame["type"].astype(str).str.strip().str.lower()
+        if not option_type.isin(OPTION_TYPES).all():
+            raise ValueError("A coluna type só pode conter 'call' ou 'put'")
+        return cls(
+            frame["underlying"].to_numpy(), option_type.to_numpy(), frame["strike"].to_numpy(),
+            frame["expiry"].to_numpy(), frame["quantity"].to_numpy(), frame["premium"].to_numpy(),
+            frame["spot"].to_numpy(),
+        )
+
+    # Carteira a partir de um array de contratos (ver contracts.py) sobre um subjacente
+    @classmethod
+    def from_contracts(cls, contracts, underlying, spot=None):
+        if (contracts["type"] > PUT).any():
+            raise ValueError("A carteira só suporta calls e puts")
+        option_type = OPTION_TYPES[contracts["type"]]
+        spot = None if spot is None else np.broadcast_to(spot, len(contracts))
+        return cls(
+            np.broadcast_to(underlying, len(contracts)), option_type, contracts["strike"],
+            contracts["expiry"], contracts["quantity"], contracts["premium"], spot,
+        )
+
+    @classmethod
+    def load(cls, file):
+        return cls.from_frame(read_frame(file))
+
+    def _take(self, index, quantity=None, premium=None, realized=None):
+        taken = Portfolio.__new__(Portfolio)
+        taken.underlyings = self.underlyings
+        taken.spots = self.spots
+        taken.underlying_code = self.underlying_code[index]
+        taken.is_call = self.is_call[index]
+        taken.strike = self.strike[index]
+        taken.expiry = self.expiry[index]
+        taken.quantity = self.quantity[index] if quantity is None else quantity
+        taken.premium = self.premium[index] if premium is None else premium
+        taken.realized = self.realized[index] if realized is None else realized
+        return taken
+
+    # Índices que ordenam as posições pelas chaves (a primeira é a mais significativa)
+    # e início de cada segmento de chaves iguais
+    def _segments(self, keys):
+        order = np.lexsort(keys[::-1])
+        changed = np.zeros(len(order), dtype=bool)
+        if len(order):
+            changed[0] = True
+        for key in keys:
+            sorted_key = key[order]
+            changed[1:] |= sorted_key[1:] != sorted_key[:-1]
+        return order, np.flatnonzero(changed)
+
+    def _group_keys(self, by):
+        if by == "underlying":
+            return [self.underlying_code]
+        if by == "underlying_expiry":
+            return [self.underlying_code, self.expiry]
+        raise ValueError(f"Agrupamento desconhecido: {by}")
+
+    # Compensa pernas idênticas (subjacente, tipo, exercício, vencimento): soma as quantidades
+    # e mantém o prémio médio ponderado. Pernas com quantidade líquida nula ficam com
+    # quantidade 0 e o custo líquido passa a fluxo de caixa realizado; só desaparecem se
+    # esse fluxo também for nulo
+    def net(self):
+        order, starts = self._segments([self.underlying_code, self.expiry, self.is_call, self.strike])
+        if not len(order):
+            return self._take(order)
+        quantity = np.add.reduceat(self.quantity[order], starts)
+        cost = np.add.reduceat((self.quantity * self.premium)[order], starts)
+        realized = np.add.reduceat(self.realized[order], starts)
+        is_open = quantity != 0
+        premium = np.divide(cost, quantity, out=np.zeros_like(cost), where=is_open)
+        realized = np.where(is_open, realized, realized - cost)
+        keep = is_open | (realized != 0)
+        return self._take(order[starts][keep], quantity[keep], premium[keep], realized[keep])
+
+    def _labels(self, order, starts, by):
+        first = order[starts]
+        labels = {"underlying": self.underlyings[self.underlying_code[first]]}
+        if by == "underlying_expiry":
+            labels["expiry"] = self.expiry[first]
+        return labels
+
+    # Payoff no vencimento de cada posição para choques relativos do subjacente
+    # (matriz n_posições x n_choques)
+    def position_payoffs(self, shocks):
+        S = self.spots[self.underlying_code][:, None] * (1 + np.asarray(shocks)[None, :])
+        K = self.strike[:, None]
+        payoff = np.where(self.is_call[:, None], call_payoff(S, K), put_payoff(S, K))
+        return self.quantity[:, None] * (payoff - self.premium[:, None]) + self.realized[:, None]
+
+    # Lucro no vencimento agregado por grupo (linhas) para cada choque (colunas)
+    def aggregate_payoff(self, shocks, by="underlying"):
+        order, starts = self._segments(self._group_keys(by))
+        if not len(order):
+            return self._labels(order, starts, by), np.empty((0, len(shocks)))
+        profit = np.add.reduceat(self.position_payoffs(shocks)[order], starts, axis=0)
+        return self._labels(order, starts, by), profit
+
+    # Valor de mercado e gregos (Black-Scholes) agregados por grupo
+    def aggregate_risk(self, r, vol, by="underlying"):
+        order, starts = self._segments(self._group_keys(by))
+        S = self.spots[self.underlying_code]
+        T = np.maximum(self.expiry, 1e-8)
+        call, put = black_scholes(S, self.strike, r, T, vol)
+        greeks = black_scholes_greeks(S, self.strike, r, T, vol)
+
+        per_position = {
+            "value": np.where(self.is_call, call, put),
+            "delta": np.where(self.is_call, greeks["call_delta"], greeks["put_delta"]),
+            "gamma": greeks["gamma"],
+            "vega": greeks["vega"],
+            "theta": np.where(self.is_call, greeks["call_theta"], greeks["put_theta"]),
+        }
+
+        table = self._labels(order, starts, by)
+        is_open = (self.quantity != 0)[order]
+        table["positions"] = np.add.reduceat(is_open, starts) if len(order) else is_open.astype(int)
+        for name, values in per_position.items():
+            weighted = (self.quantity * values)[order]
+            table[name] = np.add.reduceat(weighted, starts) if len(order) else weighted
+        cost = (self.quantity * self.premium)[order]
+        cost = cost - self.realized[order]
+        table["pnl"] = table["value"] - (np.add.reduceat(cost, starts) if len(order) else cost)
+        return pd.DataFrame(table)
+
+
+# Carteira sintética para demonstração
+def sample_portfolio(n_positions=20_000, n_underlyings=20, seed=0):
+    rng = np.random.default_rng(seed)
+    names = np.array([f"ATIVO{i:02d}" for i in range(n_underlyings)])
+    spots = rng.uniform(20, 200, n_underlyings)
+    code = rng.integers(0, n_underlyings, n_positions)
+    strike = np.round(spots[code] * rng.uniform(0.7, 1.3, n_positions))
+    expiry = rng.choice([0.25, 0.5, 1.0, 2.0], n_positions)
+    option_type = rng.choice(OPTION_TYPES, n_positions)
+    quantity = rng.integers(-10, 11, n_positions)
+    call, put = black_scholes(spots[code], strike, 0.03, expiry, 0.25)
+    premium = np.where(option_type == "call", call, put)
+    return Portfolio(names[code], option_type, strike, expiry, quantity, premium, spots[code])
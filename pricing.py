@@ -0,0 +1,103 @@
+import numpy as np
+from scipy.stats import norm
+
+import kernels
+
+# Modelo Black-Scholes para opções europeias, vetorizado sobre todos os argumentos.
+# Em grelhas grandes usa os núcleos compilados de kernels.py quando o Numba está disponível.
+
+
+def d1_d2(S, K, r, T, vol):
+    vol_sqrt_T = vol * np.sqrt(T)
+    d1 = (np.log(S / K) + (r + vol**2 / 2) * T) / vol_sqrt_T
+    return d1, d1 - vol_sqrt_T
+
+
+def black_scholes(S, K, r, T, vol):
+    if kernels.use_jit(S, K, r, T, vol):
+        return kernels.black_scholes_jit(S, K, r, T, vol)
+    d1, d2 = d1_d2(S, K, r, T, vol)
+    discounted_K = K * np.exp(-r * T)
+    call = S * norm.cdf(d1) - discounted_K * norm.cdf(d2)
+    put = discounted_K * norm.cdf(-d2) - S * norm.cdf(-d1)
+    return call, put
+
+
+# Gregos: delta, gama, vega e theta (por ano) de calls e puts
+def black_scholes_greeks(S, K, r, T, vol):
+    if kernels.use_jit(S, K, r, T, vol):
+        return kernels.black_scholes_greeks_jit(S, K, r, T, vol)
+    d1, d2 = d1_d2(S, K, r, T, vol)
+    sqrt_T = np.sqrt(T)
+    discounted_K = K * np.exp(-r * T)
+    pdf_d1 = norm.pdf(d1)
+    call_delta = norm.cdf(d1)
+    decay = -S * pdf_d1 * vol / (2 * sqrt_T)
+    return {
+        "call_delta": call_delta,
+        "put_delta": call_delta - 1,
+        "gamma": pdf_d1 / (S * vol * sqrt_T),
+        "vega": S * pdf_d1 * sqrt_T,
+        "call_theta": decay - r * discounted_K * norm.cdf(d2),
+        "put_theta": decay + r * discounted_K * norm.cdf(-d2),
+    }
+
+
+# Asiática geométrica com n observações equidistantes em T/n, 2T/n, ..., T (forma fechada)
+def geometric_asian_price(S, K, r, T, vol, n_fixings, option="call"):
+    n = n_fixings
+    mean = np.log(S) + (r - vol**2 / 2) * T * (n + 1) / (2 * n)
+    std = vol * np.sqrt(T * (n + 1) * (2 * n + 1) / (6 * n**2))
+    d2 = (mean - np.log(K)) / std
+    d1 = d2 + std
+    forward = np.exp(mean + std**2 / 2)
+    discount = np.exp(-r * T)
+    if option == "call":
+        return discount * (forward * norm.cdf(d1) - K * norm.cdf(d2))
+    return discount * (K * norm.cdf(-d2) - forward * norm.cdf(-d1))
+
+
+# Barreiras com monitorização contínua e sem rebate (Merton, Reiner-Rubinstein)
+def barrier_price(S, K, r, T, vol, barrier, kind="up-and-out", option="call"):
+    S, K, H = np.asarray(S, dtype=float), np.asarray(K, dtype=float), np.asarray(barrier, dtype=float)
+    direction, knock = kind.split("-and-")
+    eta = 1 if direction == "down" else -1
+    phi = 1 if option == "call" else -1
+
+    vol_sqrt_T = vol * np.sqrt(T)
+    mu = (r - vol**2 / 2) / vol**2
+    discounted_K = K * np.exp(-r * T)
+
+    x1 = np.log(S / K) / vol_sqrt_T + (1 + mu) * vol_sqrt_T
+    x2 = np.log(S / H) / vol_sqrt_T + (1 + mu) * vol_sqrt_T
+    y1 = np.log(H**2 / (S * K)) / vol_sqrt_T + (1 + mu) * vol_sqrt_T
+    y2 = np.log(H / S) / vol_sqrt_T + (1 + mu) * vol_sqrt_T
+
+    A = phi * S * norm.cdf(phi * x1) - phi * discounted_K * norm.cdf(phi * (x1 - vol_sqrt_T))
+    B = phi * S * norm.cdf(phi * x2) - phi * discounted_K * norm.cdf(phi * (x2 - vol_sqrt_T))
+    C = (phi * S * (H / S)**(2 * (mu + 1)) * norm.cdf(eta * y1)
+         - phi * discounted_K * (H / S)**(2 * mu) * norm.cdf(eta * (y1 - vol_sqrt_T)))
+    D = (phi * S * (H / S)**(2 * (mu + 1)) * norm.cdf(eta * y2)
+         - phi * discounted_K * (H / S)**(2 * mu) * norm.cdf(eta * (y2 - vol_sqrt_T)))
+
+    # Combinação de A, B, C e D para exercício acima / abaixo da barreira
+    formulas = {
+        ("in", "down", "call"): (lambda: C, lambda: A - B + D),
+        ("in", "up", "call"): (lambda: A, lambda: B - C + D),
+        ("in", "down", "put"): (lambda: B - C + D, lambda: A),
+        ("in", "up", "put"): (lambda: A - B + D, lambda: C),
+        ("out", "down", "call"): (lambda: A - C, lambda: B - D),
+        ("out", "up", "call"): (lambda: 0.0, lambda: A - B + C - D),
+        ("out", "down", "put"): (lambda: A - B + C - D, lambda: 0.0),
+        ("out", "up", "put"): (lambda: B - D, lambda: A - C),
+    }
+    strike_above, strike_below = formulas[(knock, direction, option)]
+    price = np.where(K > H, strike_above(), strike_below())
+
+    # Barreira já atingida: a opção "out" deixou de existir e a "in" é uma opção vanilla
+    breached = S <= H if direction == "down" else S >= H
+    if breached.any():
+        call, put = black_scholes(S, K, r, T, vol)
+        vanilla = call if option == "call" else put
+        price = np.where(breached, vanilla if knock == "in" else 0.0, price)
+    return price
@@ -0,0 +1,309 @@
+import argparse
+import hashlib
+import time
+from collections import OrderedDict
+
+import numpy as np
+from scipy.special import ndtr
+
+from contracts import CALL, make_contracts, contract_payoffs, contract_prices, strategy_contracts
+from pricing import black_scholes
+from vol_surface import default_vol_surface
+
+# Lucro esperado, probabilidade de lucro e quantis do P&L de estratégias no vencimento,
+# sem simulação.
+#
+# O lucro de uma estratégia de calls, puts e binárias é linear por troços em S, com vértices
+# (e saltos, nas binárias) nos exercícios. Em cada troço [a, b] com lucro alpha + beta * S:
+#
+#   E[lucro; a < S < b] = alpha * (C(b) - C(a)) + beta * (M(b) - M(a))
+#
+# onde C é a função de distribuição de S e M(x) = E[S; S < x] a média parcial. Basta por
+# isso que cada densidade saiba calcular C e M: analiticamente na lognormal, por somas
+# cumulativas (quadratura) numa densidade implícita calibrada. A probabilidade de lucro é
+# a massa dos subintervalos onde alpha + beta * S > 0, e os quantis invertem essa mesma
+# massa por pesquisa em k secções (bisseção generalizada). Todas as funções trabalham sobre
+# lotes de estratégias de uma vez.
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+GAUSS_HERMITE_NODES = 64
+BISECTION_STEPS = 24
+# Pontos da distribuição do lucro avaliados por passo da pesquisa dos quantis
+QUANTILE_POINTS = 256
+# Métricas de estratégias individuais guardadas (LRU) por contratos, densidade e custo
+METRICS_CACHE_SIZE = 1024
+
+
+def _simpson_weights(grid):
+    n = len(grid) - (len(grid) + 1) % 2
+    h = (grid[n - 1] - grid[0]) / (n - 1)
+    weights = np.zeros(len(grid))
+    weights[:n:2] = 2 * h / 3
+    weights[1:n:2] = 4 * h / 3
+    weights[[0, n - 1]] = h / 3
+    if n < len(grid):
+        # Número par de pontos: último intervalo pelo trapézio
+        weights[n - 1] += (grid[-1] - grid[-2]) / 2
+        weights[-1] = (grid[-1] - grid[-2]) / 2
+    return weights
+
+
+# S_T lognormal: ln S_T ~ N(m, s^2), com m = ln S0 + (drift - vol^2 / 2) T e s = vol sqrt(T).
+# Com drift = r é a densidade neutra ao risco de Black-Scholes.
+class LognormalDensity:
+    def __init__(self, S0, T, vol, drift):
+        self.s = vol * np.sqrt(T)
+        self.m = np.log(S0) + (drift - vol**2 / 2) * T
+        self.mean = float(np.exp(self.m + self.s**2 / 2))
+        self.upper = float(np.exp(self.m + 8 * self.s))
+        self.key = ("lognormal", float(self.m), float(self.s))
+
+    def _z(self, x):
+        with np.errstate(divide="ignore"):
+            return (np.log(np.asarray(x, dtype=float)) - self.m) / self.s
+
+    def cdf(self, x):
+        return ndtr(self._z(x))
+
+    def partial_mean(self, x):
+        return self.mean * ndtr(self._z(x) - self.s)
+
+    def pdf(self, x):
+        x = np.asarray(x, dtype=float)
+        z = self._z(x)
+        return np.exp(-z**2 / 2) / (np.sqrt(2 * np.pi) * self.s * np.where(x > 0, x, 1.0)) * (x > 0)
+
+    # Gauss-Hermite em ln S para payoffs arbitrários
+    def expectation(self, fn, n_nodes=GAUSS_HERMITE_NODES):
+        nodes, weights = np.polynomial.hermite_e.hermegauss(n_nodes)
+        return fn(np.exp(self.m + self.s * nodes)) @ weights / np.sqrt(2 * np.pi)
+
+
+# Densidade tabelada numa grelha uniforme (p.ex. implícita numa superfície calibrada). C e M
+# são somas cumulativas (trapézios) pré-calculadas e interpoladas linearmente.
+class GridDensity:
+    def __init__(self, grid, density):
+        self.grid = np.asarray(grid, dtype=float)
+        density = np.maximum(np.asarray(density, dtype=float), 0.0)
+        self.density = density / (_simpson_weights(self.grid) @ density)
+
+        widths = np.diff(self.grid)
+        cum_p = np.concatenate([[0.0], np.cumsum((self.density[1:] + self.density[:-1]) / 2 * widths)])
+        moment = self.grid * self.density
+        cum_m = np.concatenate([[0.0], np.cumsum((moment[1:] + moment[:-1]) / 2 * widths)])
+        self._cum_p = cum_p / cum_p[-1]
+        self._cum_m = cum_m / cum_p[-1]
+        self.mean = float(self._cum_m[-1])
+        self.upper = float(self.grid[-1])
+        self.key = ("grelha", hashlib.sha1(self.grid.tobytes() + self.density.tobytes()).hexdigest())
+
+    def cdf(self, x):
+        return np.interp(x, self.grid, self._cum_p, left=0.0, right=1.0)
+
+    def partial_mean(self, x):
+        return np.interp(x, self.grid, self._cum_m, left=0.0, right=self.mean)
+
+    def pdf(self, x):
+        return np.interp(x, self.grid, self.density, left=0.0, right=0.0)
+
+    # Regra de Simpson na grelha para payoffs arbitrários
+    def expectation(self, fn):
+        return fn(self.grid) @ (_simpson_weights(self.grid) * self.density)
+
+
+# Densidade neutra ao risco implícita numa superfície de volatilidade (vol_surface.py) à
+# maturidade T, pela fórmula de Breeden-Litzenberger: f(K) = e^(rT) d2C/dK2
+def implied_density(surface, T, n_points=801, width=6.0):
+    forward = surface.spot * np.exp(surface.rate * T)
+    atm = float(surface.implied_vol(forward, T)) * np.sqrt(T)
+    grid = np.linspace(forward * np.exp(-width * atm), forward * np.exp(width * atm), n_points)
+    call, _ = black_scholes(surface.spot, grid, surface.rate, T, surface.implied_vol(grid, T))
+
+    h = grid[1] - grid[0]
+    density = np.zeros(n_points)
+    density[1:-1] = np.exp(surface.rate * T) * (call[2:] - 2 * call[1:-1] + call[:-2]) / h**2
+    return GridDensity(grid, density)
+
+
+# Lucro linear por troços de um lote de estratégias com `n_legs` pernas cada (contratos
+# seguidos, como em strategy_optimizer.py). Os vértices são 0 e os limites à esquerda e à
+# direita de cada exercício, o que representa também os saltos das binárias.
+# Devolve (pontos, lucros (n, pontos), inclinação acima do último ponto (n,)).
+def profit_profiles(contracts, cost=0.0, n_legs=None):
+    n_legs = len(contracts) if n_legs is None else n_legs
+    n = len(contracts) // n_legs
+    strikes = np.unique(contracts["strike"])
+    points = np.unique(np.concatenate([[0.0], np.nextafter(strikes, -np.inf), np.nextafter(strikes, np.inf)]))
+
+    quantity = contracts["quantity"]
+    payoff = (quantity[:, None] * contract_payoffs(contracts, points)).reshape(n, n_legs, len(points)).sum(axis=1)
+    profit = payoff - np.reshape(cost, (-1, 1))
+    upper_slope = (quantity * (contracts["type"] == CALL)).reshape(n, n_legs).sum(axis=1)
+    return points, profit, upper_slope
+
+
+# Troços (a, b, alpha, beta) de cada estratégia, o último de points[-1] a infinito. Os troços
+# de largura nula entre os limites de um exercício (saltos) têm massa nula e ficam constantes.
+def _segments(points, profit, upper_slope):
+    a = points
+    b = np.append(points[1:], np.inf)
+    widths = np.diff(points)
+    jump = widths <= 4 * np.spacing(points[1:])
+    slopes = np.where(jump, 0.0, np.diff(profit, axis=1) / widths)
+    beta = np.column_stack([slopes, upper_slope])
+    alpha = profit - beta * a
+    return a, b, alpha, beta
+
+
+# Função de distribuição do lucro, P(alpha + beta * S <= x) somada sobre os troços, para x
+# de forma (n, k). Os troços constantes contribuem com a sua massa inteira ou nada; nos
+# inclinados só a raiz (limitada ao troço) precisa da distribuição de S, pelo que a
+# avaliação é feita apenas sobre esses troços.
+def _profit_cdf(density, a, b, alpha, beta):
+    C_a, C_b = density.cdf(a), density.cdf(b)
+    flat_mass = (beta == 0) * (C_b - C_a)
+    rows, cols = np.nonzero(beta)
+    alpha_s, beta_s = alpha[rows, cols, None], beta[rows, cols, None]
+    a_s, b_s = a[cols, None], b[cols, None]
+    rising = beta_s > 0
+    base = np.where(rising, -C_a[cols, None], C_b[cols, None])
+    sign = np.where(rising, 1.0, -1.0)
+    # Soma por estratégia das contribuições dos troços inclinados (seguidos, por linha)
+    ends = np.searchsorted(rows, np.arange(1, len(alpha) + 1))
+    starts = np.concatenate([[0], ends[:-1]])
+
+    def cdf(x):
+        mass = ((alpha[:, None, :] <= x[..., None]) * flat_mass[:, None, :]).sum(axis=-1)
+        part = base + sign * density.cdf(np.clip((x[rows] - alpha_s) / beta_s, a_s, b_s))
+        total = np.concatenate([np.zeros((1, x.shape[1])), np.cumsum(part, axis=0)])
+        return mass + total[ends] - total[starts]
+
+    return cdf
+
+
+def profile_metrics(points, profit, upper_slope, density, quantiles=QUANTILES):
+    a, b, alpha, beta = _segments(points, profit, upper_slope)
+
+    C_a, C_b = density.cdf(a), density.cdf(b)
+    M_a, M_b = density.partial_mean(a), density.partial_mean(b)
+    expected = (alpha * (C_b - C_a) + beta * (M_b - M_a)).sum(axis=1)
+    cdf = _profit_cdf(density, a, b, alpha, beta)
+    prob_profit = 1 - cdf(np.zeros((len(profit), 1)))[:, 0]
+
+    # Quantis entre o menor e o maior lucro até ao limite superior da densidade. Em cada passo
+    # o intervalo de cada quantil é dividido em `sections` partes, avaliadas numa só chamada:
+    # com poucas estratégias bastam 5 passos largos para a precisão de BISECTION_STEPS
+    # bisseções; em lotes grandes `sections` = 2 e a pesquisa é a bisseção habitual.
+    tail = profit[:, -1] + upper_slope * (density.upper - points[-1])
+    lo = np.minimum(profit.min(axis=1), tail)[:, None] - 1e-9
+    hi = np.maximum(profit.max(axis=1), tail)[:, None] + 1e-9
+    q = np.asarray(quantiles, dtype=float)
+    lo, hi = np.repeat(lo, len(q), axis=1), np.repeat(hi, len(q), axis=1)
+    sections = int(np.clip(QUANTILE_POINTS // max(lo.size, 1), 2, 1024))
+    steps = int(np.ceil(BISECTION_STEPS / np.log2(sections)))
+    fractions = np.arange(1, sections) / sections
+    for _ in range(steps):
+        inner = lo[..., None] + (hi - lo)[..., None] * fractions
+        below = cdf(inner.reshape(len(lo), -1)).reshape(inner.shape) >= q[:, None]
+        # Primeiro ponto interior com F >= q (F é crescente); se nenhum, o próprio hi
+        first = sections - 1 - below.sum(axis=-1)
+        bounds = np.concatenate([lo[..., None], inner, hi[..., None]], axis=-1)
+        lo = np.take_along_axis(bounds, first[..., None], axis=-1)[..., 0]
+        hi = np.take_along_axis(bounds, first[..., None] + 1, axis=-1)[..., 0]
+
+    return {"expected_profit": expected, "prob_profit": prob_profit, "quantiles": hi}
+
+
+_metrics_cache = OrderedDict()
+
+
+# Métricas de uma estratégia (array de contratos) com custo `cost` pago no início. Numa
+# aplicação interativa a mesma estratégia é pedida repetidamente (a cada reexecução), pelo
+# que os resultados ficam numa cache LRU: um acerto custa microssegundos.
+def strategy_metrics(contracts, density, cost=0.0, quantiles=QUANTILES):
+    key = (contracts.tobytes(), density.key, float(cost), tuple(quantiles))
+    if key in _metrics_cache:
+        _metrics_cache.move_to_end(key)
+        metrics = _metrics_cache[key]
+    else:
+        batch = profile_metrics(*profit_profiles(contracts, cost), density, quantiles)
+        metrics = {
+            "expected_profit": float(batch["expected_profit"][0]),
+            "prob_profit": float(batch["prob_profit"][0]),
+            "quantiles": dict(zip(quantiles, batch["quantiles"][0].tolist())),
+        }
+        _metrics_cache[key] = metrics
+        if len(_metrics_cache) > METRICS_CACHE_SIZE:
+            _metrics_cache.popitem(last=False)
+    return dict(metrics, quantiles=dict(metrics["quantiles"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lucro esperado, probabilidade de lucro e quantis de estratégias")
+    parser.add_argument("--spot", type=float, default=100.0)
+    parser.add_argument("--rate", type=float, default=0.05)
+    parser.add_argument("--vol", type=float, default=0.2)
+    parser.add_argument("--drift", type=float, default=None, help="retorno esperado do ativo (por omissão, a taxa sem risco)")
+    parser.add_argument("--expiry", type=float, default=1.0)
+    parser.add_argument("--density", choices=["lognormal", "implicita"], default="lognormal",
+                        help="lognormal ou implícita na superfície SVI sintética de vol_surface.py")
+    parser.add_argument("--batch", type=int, default=10_000, help="estratégias por lote no teste de velocidade")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.density == "lognormal":
+        drift = args.rate if args.drift is None else args.drift
+        density = LognormalDensity(args.spot, args.expiry, args.vol, drift)
+        S = np.exp(density.m + density.s * rng.standard_normal(1_000_000))
+    else:
+        density = implied_density(default_vol_surface(args.spot, args.rate, atm_vol=args.vol), args.expiry)
+        S = np.interp(rng.random(1_000_000), density._cum_p, density.grid)
+        strikes = np.arange(70, 131, 10.0)
+        calls = make_contracts("call", strikes, args.expiry)
+        repriced = np.exp(-args.rate * args.expiry) * np.array([density.expectation(lambda x, k=k: np.maximum(x - k, 0)) for k in strikes])
+        vols = default_vol_surface(args.spot, args.rate, atm_vol=args.vol).implied_vol(strikes, args.expiry)
+        market = black_scholes(args.spot, strikes, args.rate, args.expiry, vols)[0]
+        print(f"reprecificação de {len(calls)} calls pela densidade implícita: erro máximo {np.abs(repriced - market).max():.4f}€")
+
+    # Custo pago: preço de mercado (Black-Scholes na lognormal, valor descontado na implícita)
+    def strategy_cost(legs):
+        if args.density == "lognormal":
+            return float(contract_prices(legs, args.spot, args.rate, args.vol) @ legs["quantity"])
+        return float(np.exp(-args.rate * args.expiry) * density.expectation(lambda x: legs["quantity"] @ contract_payoffs(legs, x)))
+
+    strikes = {"Bull Spread": (90, 110), "Bear Spread": (90, 110), "Straddle": (100,), "Strangle": (90, 110),
+               "Butterfly Spread": (90, 100, 110), "Risk Reversal": (90, 110)}
+    print(f"{'estratégia':<18}{'custo':>8}{'E[lucro]':>10}{'MC':>9}{'P(lucro)':>10}{'MC':>8}"
+          f"{'q5%':>9}{'q50%':>9}{'q95%':>9}{'µs':>8}{'cache':>8}")
+    for name, K in strikes.items():
+        legs = strategy_contracts(name, *K, expiry=args.expiry)
+        cost = strategy_cost(legs)
+        start = time.perf_counter()
+        for _ in range(100):
+            profile_metrics(*profit_profiles(legs, cost), density)
+        elapsed = (time.perf_counter() - start) / 100
+        metrics = strategy_metrics(legs, density, cost)
+        start = time.perf_counter()
+        for _ in range(100):
+            strategy_metrics(legs, density, cost)
+        cached = (time.perf_counter() - start) / 100
+        simulated = legs["quantity"] @ contract_payoffs(legs, S) - cost
+        q = metrics["quantiles"]
+        print(f"{name:<18}{cost:>8.3f}{metrics['expected_profit']:>10.4f}{simulated.mean():>9.4f}{metrics['prob_profit']:>10.4f}"
+              f"{np.mean(simulated > 0):>8.4f}{q[0.05]:>9.3f}{q[0.5]:>9.3f}{q[0.95]:>9.3f}{elapsed * 1e6:>8.0f}{cached * 1e6:>8.1f}")
+
+    # Lote de bull spreads com exercícios aleatórios numa cadeia de 5 em 5
+    K1 = rng.choice(np.arange(70, 121, 5), args.batch).astype(float)
+    K2 = K1 + rng.choice(np.arange(5, 31, 5), args.batch)
+    contracts = make_contracts("call", np.column_stack([K1, K2]), args.expiry, np.array([1.0, -1.0]))
+    cost = (contract_prices(contracts, args.spot, args.rate, args.vol) * contracts["quantity"]).reshape(-1, 2).sum(axis=1)
+    profiles = profit_profiles(contracts, cost, n_legs=2)
+    for label, quantiles in [("E[lucro] e P(lucro)", ()), ("com quantis", QUANTILES)]:
+        start = time.perf_counter()
+        profile_metrics(*profiles, density, quantiles)
+        elapsed = time.perf_counter() - start
+        print(f"lote de {args.batch} bull spreads, {label}: {elapsed * 1e3:.0f} ms ({elapsed / args.batch * 1e6:.2f} µs por estratégia)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from contracts import OPTION_TYPES, STRATEGY_SLIDERS, contract_payoffs, make_contracts, strategy_contracts
+from hedging import REBALANCE_FREQUENCIES, hedge_error_summary, simulate_delta_hedge
+from surface_cache import exact_fields
+from vol_surface import default_vol_surface
+
+# Exportação estática das páginas "Opções Básicas", "Estratégias de Opções" e "Fatores que
+# Afetam o Preço": o espaço de estados dos widgets de cada página é enumerado, as curvas de
+# todos os estados são calculadas em paralelo (um processo por tarefa) e escritas como
+# blocos float32 little-endian com um manifest.json. O visualizador (static_viewer.html)
+# desenha os gráficos no browser a partir desses blocos, pelo que o pacote pode ser servido
+# por qualquer servidor de ficheiros sem um processo Python por utilizador.
+#
+# As secções listadas em OMITTED_SECTIONS não são exportadas; o visualizador indica-as na
+# barra de navegação.
+#
+# Os parâmetros que só desenham marcadores (preço atual) ou que entram como constante
+# aditiva (prémio: lucro = payoff - prémio) não multiplicam o número de curvas guardadas.
+
+VIEWER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static_viewer.html")
+BUNDLE_DIR = "static_bundle"
+
+# Volatilidade constante da aplicação (sem ficheiro de preços carregado)
+VOL = 0.2
+
+BASIC_S = (50, 150, 100)
+BASIC_STRIKES = np.arange(50, 151)
+BASIC_TYPES = ["call", "put", "binary_call", "binary_put"]
+
+# Secções da aplicação que não são exportadas
+OMITTED_SECTIONS = [
+    "Estratégias de Opções: Probabilidades no Vencimento",
+    "Estratégias de Opções: Otimizador de Estratégias",
+    "Paridade Put-Call",
+    "Carteira de Opções",
+]
+
+FACTOR_S = (70, 130, 100)
+HEDGE_INSTRUMENTS = ["Opção de Compra", "Opção de Venda", "Straddle", "Bull Spread", "Butterfly Spread"]
+HEDGE_COSTS = np.round(np.arange(0, 1.0001, 0.05), 2)
+HEDGE_PATHS = 5000
+HEDGE_BINS = 60
+
+
+def _axis(start, stop, n):
+    return np.linspace(start, stop, n)
+
+
+def _slider_states(sliders, prefix=()):
+    if len(prefix) == len(sliders):
+        yield prefix
+        return
+    _, low, high, _ = sliders[len(prefix)]
+    for value in range(low(*prefix), high + 1):
+        yield from _slider_states(sliders, prefix + (value,))
+
+
+# Opções Básicas: payoff por tipo e exercício
+def _basic_page():
+    S = _axis(*BASIC_S)
+    codes = np.array([OPTION_TYPES.index(t) for t in BASIC_TYPES], dtype=np.uint8)
+    contracts = make_contracts(codes[:, None], BASIC_STRIKES[None, :])
+    payoff = contract_payoffs(contracts, S).reshape(len(BASIC_TYPES), len(BASIC_STRIKES), len(S))
+    return {"basic_payoff": (payoff, {"x": BASIC_S, "types": BASIC_TYPES, "strikes": [int(BASIC_STRIKES[0]), int(BASIC_STRIKES[-1])]})}
+
+
+# Estratégias: payoff total para todas as combinações de exercícios; a curva de cada perna
+# só depende do seu exercício, pelo que é guardada uma vez por (perna, exercício)
+STRATEGY_STRIKES = np.arange(70, 131)
+
+
+def _strategy_page(name):
+    S = _axis(*BASIC_S)
+    states = list(_slider_states(STRATEGY_SLIDERS[name]))
+    contracts = np.concatenate([strategy_contracts(name, *state) for state in states])
+    totals = (contracts["quantity"][:, None] * contract_payoffs(contracts, S)).reshape(len(states), -1, len(S)).sum(axis=1)
+
+    # Tipo, quantidade e slider que define o exercício de cada perna (para as legendas)
+    last = list(states[-1])
+    legs = strategy_contracts(name, *last)
+    legs_meta = [
+        {"type": OPTION_TYPES[leg["type"]], "quantity": float(leg["quantity"]), "strike": last.index(leg["strike"])}
+        for leg in legs
+    ]
+    grid = make_contracts(legs["type"][:, None], STRATEGY_STRIKES[None, :], quantity=legs["quantity"][:, None])
+    leg_curves = (grid["quantity"][:, None] * contract_payoffs(grid, S)).reshape(len(legs), len(STRATEGY_STRIKES), len(S))
+
+    key = "strategy_" + name.lower().replace(" ", "_")
+    meta = {
+        "x": BASIC_S, "strategy": name, "states": [list(s) for s in states],
+        "labels": [label for label, _, _, _ in STRATEGY_SLIDERS[name]],
+        "defaults": [default for _, _, _, default in STRATEGY_SLIDERS[name]],
+    }
+    legs_meta = {"x": BASIC_S, "legs": legs_meta, "strikes": [int(STRATEGY_STRIKES[0]), int(STRATEGY_STRIKES[-1])]}
+    return {key: (totals, meta), key + "_legs": (leg_curves, legs_meta)}
+
+
+def _factor_pages():
+    S = _axis(*FACTOR_S)
+    K, r, T = 100, 0.05, 1.0
+    datasets = {}
+
+    prices = exact_fields(S, K, r, T, VOL, ("call", "put", "call_delta", "put_delta"))
+    datasets["factor_price"] = (np.stack([prices[f] for f in prices]), {"x": FACTOR_S, "rows": list(prices)})
+
+    T_values = [2.0, 1.0, 0.5, 0.25, 0.1, 0.01]
+    calls = [exact_fields(S, K, r, t, VOL, ("call",))["call"] for t in T_values]
+    datasets["factor_time"] = (np.stack(calls + [np.maximum(S - K, 0)]), {"x": FACTOR_S, "T_values": T_values})
+
+    days = np.linspace(365, 0, 100)
+    years = days / 365
+    decay = np.maximum(np.array([100.0, 90.0, 110.0])[:, None] - K, 0) * np.ones_like(years)
+    alive = years > 0
+    decay[:, alive] = exact_fields(np.array([100.0, 90.0, 110.0])[:, None], K, r, years[alive], VOL, ("call",))["call"]
+    datasets["factor_decay"] = (decay, {"x": [365, 0, 100], "rows": ["atm", "otm", "itm"]})
+
+    vol_values = [0.1, 0.2, 0.3, 0.4, 0.5]
+    calls = [exact_fields(S, K, r, T, v, ("call",))["call"] for v in vol_values]
+    datasets["factor_vol"] = (np.stack(calls + [np.maximum(S - K, 0)]), {"x": FACTOR_S, "vol_values": vol_values})
+
+    surface = default_vol_surface(100, r, atm_vol=VOL)
+    T_slices = np.round(np.arange(0.1, 2.0001, 0.1), 1)
+    smile = np.stack([surface.implied_vol(np.linspace(80, 120, 9), t) for t in T_slices])
+    datasets["factor_smile"] = (smile, {"x": [80, 120, 9], "T_slices": T_slices.tolist()})
+
+    r_values = [0.01, 0.03, 0.05, 0.07, 0.10]
+    rate = [exact_fields(S, K, rv, T, VOL) for rv in r_values]
+    datasets["factor_rate"] = (np.stack([p["call"] for p in rate] + [p["put"] for p in rate]), {"x": FACTOR_S, "r_values": r_values})
+    datasets["factor_pv"] = (K * np.exp(-_axis(0.01, 0.10, 100) * T)[None, :], {"x": [1, 10, 100]})
+
+    K_values = [80, 90, 100, 110, 120]
+    strike = [exact_fields(S, k, r, T, VOL) for k in K_values]
+    datasets["factor_strike"] = (np.stack([p["call"] for p in strike] + [p["put"] for p in strike]), {"x": FACTOR_S, "K_values": K_values})
+    by_strike = exact_fields(100, _axis(70, 130, 100), r, T, VOL)
+    datasets["factor_strike_curve"] = (np.stack([by_strike["call"], by_strike["put"]]), {"x": [70, 130, 100]})
+    return datasets
+
+
+# Cobertura delta: histograma e estatísticas do erro para cada custo de transação
+# (número de trajetórias fixo no valor por omissão da aplicação)
+SUMMARY_FIELDS = ["premium", "mean", "std", "q05", "q95", "mean_costs", "rebalances"]
+
+
+def _hedge_page(instrument, frequency):
+    K, r, T = 100, 0.05, 1.0
+    if instrument == "Opção de Compra":
+        contracts = make_contracts("call", K, T)
+    elif instrument == "Opção de Venda":
+        contracts = make_contracts("put", K, T)
+    else:
+        strikes = {"Straddle": (K,), "Bull Spread": (K, K + 10), "Butterfly Spread": (K - 10, K, K + 10)}
+        contracts = strategy_contracts(instrument, *strikes[instrument], expiry=T)
+
+    rows = []
+    for cost in HEDGE_COSTS:
+        result = simulate_delta_hedge(contracts, 100, r, VOL, n_paths=HEDGE_PATHS,
+                                      rebalance_every=REBALANCE_FREQUENCIES[frequency], cost=cost / 100, seed=0)
+        summary = dict(hedge_error_summary(result), premium=result["premium"])
+        counts, edges = np.histogram(result["error"], bins=HEDGE_BINS)
+        rows.append(np.concatenate([counts, edges, [summary[f] for f in SUMMARY_FIELDS]]))
+    key = f"hedge_{HEDGE_INSTRUMENTS.index(instrument)}_{list(REBALANCE_FREQUENCIES).index(frequency)}"
+    return {key: (np.stack(rows), {"costs": HEDGE_COSTS.tolist(), "bins": HEDGE_BINS, "summary": SUMMARY_FIELDS})}
+
+
+def export_jobs():
+    jobs = [(_basic_page, ())]
+    jobs += [(_strategy_page, (name,)) for name in STRATEGY_SLIDERS]
+    jobs += [(_factor_pages, ())]
+    jobs += [(_hedge_page, (i, f)) for i in HEDGE_INSTRUMENTS for f in REBALANCE_FREQUENCIES]
+    return jobs
+
+
+def _write(directory, datasets, manifest):
+    for name, (values, meta) in datasets.items():
+        values = np.ascontiguousarray(values, dtype="<f4")
+        path = os.path.join(directory, "data", f"{name}.f32")
+        values.tofile(path)
+        manifest["datasets"][name] = dict(meta, file=f"data/{name}.f32", shape=list(values.shape))
+
+
+# Um diretório só é apagado se contiver um pacote anterior (manifest.json com datasets)
+def _is_bundle(directory):
+    try:
+        with open(os.path.join(directory, "manifest.json")) as f:
+            return "datasets" in json.load(f)
+    except (OSError, ValueError, TypeError):
+        return False
+
+
+def _prepare_directory(directory):
+    if os.path.exists(directory):
+        if not os.path.isdir(directory):
+            raise ValueError(f"{directory} não é um diretório")
+        if _is_bundle(directory):
+            shutil.rmtree(directory)
+        elif os.listdir(directory):
+            raise ValueError(f"O diretório {directory} não está vazio e não contém um pacote exportado")
+    os.makedirs(os.path.join(directory, "data"), exist_ok=True)
+
+
+def export_bundle(directory=BUNDLE_DIR, workers=None):
+    start = time.perf_counter()
+    _prepare_directory(directory)
+
+    manifest = {
+        "vol": VOL,
+        "strategies": list(STRATEGY_SLIDERS),
+        "frequencies": list(REBALANCE_FREQUENCIES),
+        "hedge_instruments": HEDGE_INSTRUMENTS,
+        "omitted": OMITTED_SECTIONS,
+        "datasets": {},
+    }
+    jobs = export_jobs()
+    if workers == 1:
+        for fn, args in jobs:
+            _write(directory, fn(*args), manifest)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for future in as_completed([executor.submit(fn, *args) for fn, args in jobs]):
+                _write(directory, future.result(), manifest)
+
+    manifest["datasets"] = dict(sorted(manifest["datasets"].items()))
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    shutil.copyfile(VIEWER, os.path.join(directory, "index.html"))
+
+    files = [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names]
+    states = sum(int(np.prod(d["shape"][:-1])) for d in manifest["datasets"].values())
+    return {
+        "elapsed": time.perf_counter() - start,
+        "files": len(files),
+        "bytes": sum(os.path.getsize(p) for p in files),
+        "data_bytes": sum(os.path.getsize(p) for p in files if p.endswith(".f32")),
+        "curves": states,
+        "jobs": len(jobs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportação estática das páginas da aplicação")
+    parser.add_argument("--out", default=BUNDLE_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="processos (por omissão, um por CPU)")
+    args = parser.parse_args()
+
+    try:
+        report = export_bundle(args.out, args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{report['jobs']} tarefas, {report['curves']} curvas pré-calculadas")
+    print(f"pacote em {args.out}: {report['files']} ficheiros, {report['bytes'] / 1e6:.2f} MB "
+          f"(dados {report['data_bytes'] / 1e6:.2f} MB)")
+    print(f"tempo de geração: {report['elapsed']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
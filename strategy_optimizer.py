@@ -0,0 +1,217 @@
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from contracts import OPTION_TYPES, contract_payoffs, contract_prices, make_contracts
+
+# Procura de estratégias multi-perna (exercícios e quantidades) para uma visão de mercado.
+#
+# A visão é um intervalo [view_low, view_high] onde se espera o preço no vencimento; o
+# objetivo é o lucro médio nesse intervalo. As restrições são a perda máxima, o orçamento
+# (custo líquido máximo) e, opcionalmente, um preço de break-even alvo (lucro >= 0 nesse
+# preço). Os candidatos de cada modelo de estratégia são avaliados em lotes:
+#
+# 1. Preço de todas as pernas do lote de uma vez (Black-Scholes) e cortes analíticos:
+#    orçamento, perda ilimitada (inclinação negativa acima do último exercício) e um
+#    majorante do objetivo (só as pernas compradas, no melhor ponto da visão), comparado
+#    com o pior dos `top` melhores resultados já encontrados.
+# 2. Os sobreviventes são avaliados exatamente: o payoff é linear por troços com vértices
+#    nos exercícios da cadeia, pelo que basta calculá-lo nesses pontos (e nos extremos da
+#    visão) para obter perda máxima, lucro máximo, lucro médio na visão e break-evens.
+
+# Pernas de cada modelo: (tipo, sinal, índice do exercício); os exercícios de um candidato
+# são crescentes (índice 0 o mais baixo), como nas páginas de estratégias
+TEMPLATES = {
+    "Bull Spread": [("call", 1, 0), ("call", -1, 1)],
+    "Bear Spread": [("put", 1, 1), ("put", -1, 0)],
+    "Straddle": [("call", 1, 0), ("put", 1, 0)],
+    "Strangle": [("put", 1, 0), ("call", 1, 1)],
+    "Butterfly Spread": [("call", 1, 0), ("call", -1, 1), ("call", 1, 2)],
+    "Risk Reversal": [("put", -1, 0), ("call", 1, 1)],
+}
+
+CHAIN_STRIKES = np.arange(70, 131, 5)
+BATCH_SIZE = 4096
+
+
+# Todos os candidatos de um modelo: exercícios (n, pernas) e quantidades com sinal (n, pernas)
+def _candidates(legs, chain, max_quantity):
+    n_slots = max(slot for _, _, slot in legs) + 1
+    combos = np.array(list(itertools.combinations(range(len(chain)), n_slots)))
+    quantities = np.array(list(itertools.product(range(1, max_quantity + 1), repeat=len(legs))))
+    slots = np.array([slot for _, _, slot in legs])
+    signs = np.array([sign for _, sign, _ in legs])
+
+    strikes = chain[combos[:, slots]]
+    strikes = np.repeat(strikes, len(quantities), axis=0)
+    quantities = np.tile(quantities * signs, (len(combos), 1))
+    return strikes, quantities
+
+
+def _view_points(chain, view_low, view_high):
+    inside = chain[(chain > view_low) & (chain < view_high)]
+    return np.unique(np.concatenate([[view_low, view_high], inside]))
+
+
+# Lucro médio no intervalo da visão: integral exata (trapézios) de uma função linear por
+# troços cujos vértices estão todos em `points`
+def _mean_over(points, values):
+    if points[-1] == points[0]:
+        return values[:, 0]
+    widths = np.diff(points)
+    return ((values[:, 1:] + values[:, :-1]) / 2 * widths).sum(axis=1) / (points[-1] - points[0])
+
+
+# Zeros do lucro entre vértices consecutivos (interpolação linear exata)
+def _breakevens(points, profit, upper_slope):
+    found = []
+    for a, b, pa, pb in zip(points[:-1], points[1:], profit[:-1], profit[1:]):
+        if pa == 0:
+            found.append(a)
+        elif pa * pb < 0:
+            found.append(a + (b - a) * pa / (pa - pb))
+    if profit[-1] == 0 or (profit[-1] * upper_slope < 0):
+        found.append(points[-1] if profit[-1] == 0 else points[-1] - profit[-1] / upper_slope)
+    return sorted(set(np.round(found, 2)))
+
+
+def optimize_strategies(S0, r, vol, T, view_low, view_high, max_loss=None, budget=None, breakeven=None,
+                        chain=CHAIN_STRIKES, templates=TEMPLATES, max_quantity=3, top=10, batch_size=BATCH_SIZE):
+    start = time.perf_counter()
+    chain = np.asarray(chain, dtype=float)
+    view_points = _view_points(chain, view_low, view_high)
+
+    # Vértices do payoff (mais S = 0 e, se houver, o break-even alvo)
+    extra = [0.0] + ([breakeven] if breakeven is not None else [])
+    kinks = np.unique(np.concatenate([extra, chain, view_points]))
+    be_index = int(np.searchsorted(kinks, breakeven)) if breakeven is not None else None
+    view_index = np.searchsorted(kinks, view_points)
+
+    stats = {"candidates": 0, "budget": 0, "unbounded": 0, "bound": 0, "max_loss": 0, "breakeven": 0, "evaluated": 0}
+    best = []
+    threshold = -np.inf
+
+    for name, legs in templates.items():
+        strikes, quantities = _candidates(legs, chain, max_quantity)
+        types = np.array([OPTION_TYPES.index(t) for t, _, _ in legs], dtype=np.uint8)
+        is_call = types == OPTION_TYPES.index("call")
+
+        for lo in range(0, len(strikes), batch_size):
+            K = strikes[lo:lo + batch_size]
+            q = quantities[lo:lo + batch_size]
+            n, n_legs = K.shape
+            stats["candidates"] += n
+
+            contracts = make_contracts(np.broadcast_to(types, K.shape), K, T, q)
+            prices = contract_prices(contracts, S0, r, vol).reshape(n, n_legs)
+            cost = (q * prices).sum(axis=1)
+
+            # Cortes analíticos, sem avaliar o payoff
+            keep = np.ones(n, dtype=bool)
+            if budget is not None:
+                over = cost > budget
+                stats["budget"] += int(over.sum())
+                keep &= ~over
+            upper_slope = (q * is_call).sum(axis=1)
+            if max_loss is not None:
+                unbounded = keep & (upper_slope < 0)
+                stats["unbounded"] += int(unbounded.sum())
+                keep &= ~unbounded
+            best_case = np.where(is_call, np.maximum(view_high - K, 0), np.maximum(K - view_low, 0))
+            bound = (np.maximum(q, 0) * best_case).sum(axis=1) - cost
+            pruned = keep & (bound < threshold)
+            stats["bound"] += int(pruned.sum())
+            keep &= ~pruned
+            if not keep.any():
+                continue
+
+            # Avaliação exata dos sobreviventes nos vértices
+            idx = np.flatnonzero(keep)
+            K, q, cost, upper_slope = K[idx], q[idx], cost[idx], upper_slope[idx]
+            survivors = contracts.reshape(n, n_legs)[idx].reshape(-1)
+            payoff = survivors["quantity"][:, None] * contract_payoffs(survivors, kinks)
+            profit = payoff.reshape(len(idx), n_legs, len(kinks)).sum(axis=1) - cost[:, None]
+            stats["evaluated"] += len(idx)
+
+            worst = np.where(upper_slope < 0, -np.inf, profit.min(axis=1))
+            ok = np.ones(len(idx), dtype=bool)
+            if max_loss is not None:
+                too_risky = -worst > max_loss
+                stats["max_loss"] += int(too_risky.sum())
+                ok &= ~too_risky
+            if be_index is not None:
+                below = profit[:, be_index] < 0
+                stats["breakeven"] += int((ok & below).sum())
+                ok &= ~below
+            if not ok.any():
+                continue
+
+            # Só os `top` melhores do lote entram na lista de resultados
+            ok = np.flatnonzero(ok)
+            score = _mean_over(view_points, profit[ok][:, view_index])
+            if len(ok) > top:
+                chosen = np.argpartition(-score, top - 1)[:top]
+                ok, score = ok[chosen], score[chosen]
+            best += [(s, name, K[j], q[j], cost[j], worst[j], profit[j], upper_slope[j]) for j, s in zip(ok, score)]
+            best.sort(key=lambda row: -row[0])
+            del best[top:]
+            if len(best) == top:
+                threshold = best[-1][0]
+
+    best.sort(key=lambda row: -row[0])
+    rows = []
+    for score, name, K, q, cost, worst, profit, upper_slope in best[:top]:
+        best_profit = np.inf if upper_slope > 0 else profit.max()
+        rows.append({
+            "strategy": name,
+            "strikes": "/".join(f"{k:g}" for k in K),
+            "quantities": "/".join(f"{int(x):+d}" for x in q),
+            "cost": cost,
+            "view_profit": score,
+            "max_loss": -worst,
+            "max_profit": best_profit,
+            "reward_risk": score / -worst if worst < 0 else np.inf,
+            "breakevens": ", ".join(f"{b:g}" for b in _breakevens(kinks, profit, upper_slope)),
+        })
+    stats["elapsed"] = time.perf_counter() - start
+    return pd.DataFrame(rows), stats
+
+
+# Contratos de uma linha do resultado (para desenhar o perfil de lucro)
+def result_contracts(row, T=1.0):
+    legs = TEMPLATES[row["strategy"]]
+    strikes = [float(k) for k in row["strikes"].split("/")]
+    quantities = [int(x) for x in row["quantities"].split("/")]
+    return make_contracts([t for t, _, _ in legs], strikes, T, quantities)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Otimizador de estratégias de opções para uma visão de mercado")
+    parser.add_argument("--spot", type=float, default=100.0)
+    parser.add_argument("--rate", type=float, default=0.05)
+    parser.add_argument("--vol", type=float, default=0.2)
+    parser.add_argument("--expiry", type=float, default=1.0)
+    parser.add_argument("--view", type=float, nargs=2, default=[105.0, 115.0], metavar=("LOW", "HIGH"))
+    parser.add_argument("--max-loss", type=float, default=10.0)
+    parser.add_argument("--budget", type=float, default=None)
+    parser.add_argument("--breakeven", type=float, default=None)
+    parser.add_argument("--max-quantity", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    table, stats = optimize_strategies(
+        args.spot, args.rate, args.vol, args.expiry, *args.view, max_loss=args.max_loss, budget=args.budget,
+        breakeven=args.breakeven, max_quantity=args.max_quantity, top=args.top,
+    )
+    print(f"{stats['candidates']} candidatos, {stats['evaluated']} avaliados exatamente em {stats['elapsed'] * 1e3:.0f} ms")
+    print(f"cortados: orçamento {stats['budget']}, perda ilimitada {stats['unbounded']}, majorante {stats['bound']}, "
+          f"perda máxima {stats['max_loss']}, break-even {stats['breakeven']}")
+    with pd.option_context("display.width", 160, "display.max_columns", None):
+        print(table.to_string(float_format=lambda x: f"{x:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
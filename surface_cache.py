@@ -0,0 +1,234 @@
+import argparse
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+from pricing import black_scholes, black_scholes_greeks
+from timing import best_time
+
+# Cache em disco de superfícies Black-Scholes pré-calculadas sobre (S/K, T, σ, r).
+#
+# Cada grandeza é guardada num ficheiro .npy próprio (formato colunar) calculado com K = 1,
+# e lida por memory-mapping: uma consulta só lê as células da grelha de que precisa.
+# Pontos fora da grelha (incluindo T < 0,1) são calculados exatamente com o modelo.
+# A cache só compensa em curvas longas com T, σ e r fixos (a partir de ~1000 pontos); pontos
+# dispersos são mais lentos e menos exatos do que o modelo (ver `benchmark`/`report`), pelo
+# que a aplicação calcula os preços exatamente.
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pricing_cache")
+
+# Eixos uniformes (início, fim, número de pontos) na ordem das dimensões dos ficheiros
+DEFAULT_AXES = {
+    "moneyness": (0.5, 1.5, 201),
+    "T": (0.1, 2.1, 41),
+    "vol": (0.05, 0.65, 13),
+    "r": (0.0, 0.10, 11),
+}
+
+FIELDS = ["call", "put", "call_delta", "put_delta", "gamma", "vega", "call_theta", "put_theta"]
+
+# Como cada grandeza escala com K a partir dos valores calculados com K = 1
+K_POWER = {
+    "call": 1, "put": 1, "call_delta": 0, "put_delta": 0,
+    "gamma": -1, "vega": 1, "call_theta": 1, "put_theta": 1,
+}
+
+
+def _axis_values(start, stop, n):
+    return np.linspace(start, stop, n)
+
+
+def exact_fields(S, K, r, T, vol, fields=FIELDS):
+    call, put = black_scholes(S, K, r, T, vol)
+    values = {"call": call, "put": put}
+    if any(f not in values for f in fields):
+        values.update(black_scholes_greeks(S, K, r, T, vol))
+    return {f: values[f] for f in fields}
+
+
+def build_surface_cache(directory=CACHE_DIR, axes=DEFAULT_AXES, block=16):
+    os.makedirs(directory, exist_ok=True)
+    values = [_axis_values(*axes[name]) for name in DEFAULT_AXES]
+    shape = tuple(len(v) for v in values)
+
+    outputs = {
+        f: np.lib.format.open_memmap(os.path.join(directory, f"{f}.npy"), mode="w+", dtype=np.float32, shape=shape)
+        for f in FIELDS
+    }
+
+    # Cálculo por blocos de moneyness para limitar a memória usada
+    moneyness, T, vol, r = values
+    T_grid, vol_grid, r_grid = np.meshgrid(T, vol, r, indexing="ij")
+    for start in range(0, shape[0], block):
+        m = moneyness[start:start + block, None, None, None]
+        computed = exact_fields(m, 1.0, r_grid, T_grid, vol_grid)
+        for f in FIELDS:
+            outputs[f][start:start + block] = computed[f]
+
+    for out in outputs.values():
+        out.flush()
+    del outputs
+
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump({"axes": {name: list(axes[name]) for name in DEFAULT_AXES}, "fields": FIELDS}, f)
+
+
+class PricingSurfaceCache:
+    def __init__(self, directory=CACHE_DIR):
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        self.axes = [tuple(meta["axes"][name]) for name in DEFAULT_AXES]
+        self.shape = tuple(int(n) for _, _, n in self.axes)
+        self.strides = np.array([int(np.prod(self.shape[i + 1:])) for i in range(4)])
+        self.moneyness = _axis_values(*self.axes[0])
+        self.grids = {f: np.load(os.path.join(directory, f"{f}.npy"), mmap_mode="r") for f in meta["fields"]}
+        # Vistas planas sobre os ficheiros mapeados em memória (sem cópia)
+        self.data = {f: grid.reshape(-1) for f, grid in self.grids.items()}
+
+    def _cell(self, coord, axis):
+        start, stop, n = self.axes[axis]
+        pos = (coord - start) / (stop - start) * (n - 1)
+        inside = (pos >= 0) & (pos <= n - 1)
+        pos = np.clip(pos, 0, n - 1)
+        lo = np.minimum(pos.astype(np.intp), n - 2)
+        return lo, pos - lo, inside
+
+    # Caso típico dos gráficos: T, σ e r fixos. Corta-se a faixa 2x2x2 da grelha (vista sem
+    # cópia do ficheiro mapeado), reduz-se a uma curva em S/K e interpola-se nessa curva.
+    def _query_curve(self, S, K, r, T, vol, fields):
+        cells = [self._cell(x, axis) for axis, x in ((1, T), (2, vol), (3, r))]
+        if not all(inside for _, _, inside in cells):
+            return None
+        (t, ft, _), (v, fv, _), (q, fq, _) = cells
+        weights = np.einsum("i,j,k->ijk", [1 - ft, ft], [1 - fv, fv], [1 - fq, fq])
+
+        m = S / K
+        inside = (m >= self.moneyness[0]) & (m <= self.moneyness[-1])
+        results = {}
+        for f in fields:
+            block = self.grids[f][:, t:t + 2, v:v + 2, q:q + 2]
+            curve = np.tensordot(block, weights, axes=3)
+            results[f] = np.interp(m, self.moneyness, curve)
+            if K_POWER[f]:
+                results[f] *= K ** K_POWER[f]
+        return results, inside
+
+    # Interpolação multilinear nos pontos dentro da grelha, modelo exato fora dela
+    def query(self, S, K, r, T, vol, fields=("call", "put")):
+        S, K, r, T, vol = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (S, K, r, T, vol)))
+        shape = S.shape
+        S, K, r, T, vol = (x.reshape(-1) for x in (S, K, r, T, vol))
+
+        curve = None
+        if len(S) and (T == T[0]).all() and (vol == vol[0]).all() and (r == r[0]).all():
+            curve = self._query_curve(S, K, r[0], T[0], vol[0], fields)
+        if curve is not None:
+            results, inside = curve
+        else:
+            results, inside = self._query_points(S, K, r, T, vol, fields)
+
+        outside = ~inside
+        if outside.any():
+            exact = exact_fields(S[outside], K[outside], r[outside], T[outside], vol[outside], fields)
+            for f in fields:
+                results[f][outside] = exact[f]
+
+        return {f: results[f].reshape(shape) for f in fields}
+
+    # Caso geral: interpolação multilinear nos 16 vértices da célula de cada ponto
+    def _query_points(self, S, K, r, T, vol, fields):
+        inside = np.ones(S.shape, dtype=bool)
+        base = np.zeros(S.shape, dtype=np.intp)
+        fracs = []
+        for axis, coord in enumerate((S / K, T, vol, r)):
+            lo, frac, ok = self._cell(coord, axis)
+            inside &= ok
+            fracs.append(frac)
+            base += lo * self.strides[axis]
+
+        results = {f: np.zeros(S.shape) for f in fields}
+        for corner in itertools.product((0, 1), repeat=4):
+            weight = np.ones(S.shape)
+            for bit, frac in zip(corner, fracs):
+                weight *= frac if bit else 1 - frac
+            index = base + int(np.dot(corner, self.strides))
+            for f in fields:
+                results[f] += weight * self.data[f][index]
+
+        for f in fields:
+            if K_POWER[f]:
+                results[f] *= K ** K_POWER[f]
+        return results, inside
+
+
+def _random_inside_points(axes, n, rng, K=100.0):
+    (m0, m1, _), (t0, t1, _), (v0, v1, _), (r0, r1, _) = axes
+    return (
+        K * rng.uniform(m0, m1, n), np.full(n, K),
+        rng.uniform(r0, r1, n), rng.uniform(t0, t1, n), rng.uniform(v0, v1, n),
+    )
+
+
+def accuracy_report(cache, n=200_000, seed=0):
+    S, K, r, T, vol = _random_inside_points(cache.axes, n, np.random.default_rng(seed))
+    approx = cache.query(S, K, r, T, vol, fields=FIELDS)
+    exact = exact_fields(S, K, r, T, vol)
+    report = {}
+    for f in FIELDS:
+        error = np.abs(approx[f] - exact[f])
+        report[f] = {"max_abs": float(error.max()), "mean_abs": float(error.mean()), "p99_abs": float(np.quantile(error, 0.99))}
+    return report
+
+def benchmark(directory=CACHE_DIR, repeat=5):
+    start = time.perf_counter()
+    cache = PricingSurfaceCache(directory)
+    S_range = np.linspace(70, 130, 100)
+    cache.query(S_range, 100.0, 0.05, 1.0, 0.2)
+    cold_cache = time.perf_counter() - start
+
+    start = time.perf_counter()
+    black_scholes(S_range, 100.0, 0.05, 1.0, 0.2)
+    cold_live = time.perf_counter() - start
+
+    rows = [("arranque a frio (100 pontos)", cold_cache, cold_live)]
+    for n in (100, 10_000):
+        S = np.linspace(60, 140, n)
+        _, cached = best_time(lambda: cache.query(S, 100.0, 0.05, 1.0, 0.2, fields=FIELDS), repeat)
+        _, live = best_time(lambda: exact_fields(S, 100.0, 0.05, 1.0, 0.2), repeat)
+        rows.append((f"curva, {n} pontos", cached, live))
+
+    rng = np.random.default_rng(1)
+    for n in (100, 10_000, 1_000_000):
+        S, K, r, T, vol = _random_inside_points(cache.axes, n, rng)
+        for label, fields in (("preços", ("call", "put")), ("preços e gregos", FIELDS)):
+            _, cached = best_time(lambda: cache.query(S, K, r, T, vol, fields=fields), repeat)
+            _, live = best_time(lambda: exact_fields(S, K, r, T, vol, fields), repeat)
+            rows.append((f"{label}, {n} pontos dispersos", cached, live))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache em disco de superfícies Black-Scholes pré-calculadas")
+    parser.add_argument("command", choices=["build", "report", "benchmark"])
+    parser.add_argument("--dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        build_surface_cache(args.dir)
+        size = sum(os.path.getsize(os.path.join(args.dir, f"{f}.npy")) for f in FIELDS)
+        print(f"Cache escrita em {args.dir} ({size / 1e6:.1f} MB) em {time.perf_counter() - start:.2f}s")
+    elif args.command == "report":
+        for f, stats in accuracy_report(PricingSurfaceCache(args.dir)).items():
+            print(f"{f:>11}: erro máx {stats['max_abs']:.2e}  médio {stats['mean_abs']:.2e}  p99 {stats['p99_abs']:.2e}")
+    else:
+        print(f"{'consulta':<40}{'cache (ms)':>12}{'exato (ms)':>12}")
+        for label, cached, live in benchmark(args.dir):
+            print(f"{label:<40}{cached * 1e3:>12.3f}{live * 1e3:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
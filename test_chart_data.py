@@ -0,0 +1,62 @@
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from chart_data import encode_arrow, figure_charts, series_table, vega_spec
+
+
+@pytest.fixture
+def figure():
+    fig, ax = plt.subplots()
+    S = np.linspace(50, 150, 5000)
+    ax.plot(S, np.maximum(S - 100, 0), "b-", label="Call")
+    ax.plot(S, np.maximum(100 - S, 0), "r--", label="Put")
+    ax.axvline(x=100, color="gray", linestyle=":", label="Exercício")
+    ax.axhline(y=0, color="black")
+    ax.set_title("Payoff")
+    yield fig
+    plt.close(fig)
+
+
+def test_figure_charts_keeps_series_styles_and_reference_lines(figure):
+    (chart,) = figure_charts(figure)
+    assert [name for name, _, _, _ in chart["series"]] == ["Call", "Put"]
+    assert [style["dash"] for style in chart["styles"]] == [None, [6, 4]]
+    assert [(rule["axis"], rule["value"], rule["name"]) for rule in chart["rules"]] == [("x", 100.0, "Exercício"), ("y", 0.0, None)]
+
+    spec = vega_spec(chart, series_table(chart["series"]))
+    assert [layer["mark"]["type"] for layer in spec["layer"]] == ["line", "line", "rule", "rule"]
+    assert spec["layer"][2]["mark"]["strokeDash"] == [1.5, 3]
+
+
+def test_figure_with_text_falls_back_to_image(figure):
+    figure.axes[0].text(100, 10, "nota")
+    assert figure_charts(figure) is None
+
+
+def test_series_table_downsamples_and_round_trips(figure):
+    (chart,) = figure_charts(figure)
+    table = series_table(chart["series"], max_points=200)
+    assert table.column_names == ["x", "y0", "y1"]
+    assert 200 <= table.num_rows <= 400
+
+    # Os pontos mantidos são pontos das curvas originais, incluindo os extremos e o vértice
+    x = table["x"].to_numpy()
+    _, _, S, call = chart["series"][0]
+    np.testing.assert_allclose(table["y0"].to_numpy(), np.interp(x, S, call).astype(np.float32), atol=1e-3)
+    assert x[0] == np.float32(S[0]) and x[-1] == np.float32(S[-1])
+    assert table["y1"].to_numpy().max() == np.float32(50)
+
+    received = pa.ipc.open_stream(encode_arrow(table)).read_all()
+    assert received.equals(table)
+
+
+def test_series_table_long_format_for_different_x():
+    series = [("a", "#000000", np.arange(10.0), np.arange(10.0)), ("b", "#ff0000", np.arange(5.0), -np.arange(5.0))]
+    table = series_table(series, max_points=None)
+    assert table.column_names == ["x", "y", "series"]
+    assert table["series"].to_pylist() == ["a"] * 10 + ["b"] * 5
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from grid_stream import Extrema, Histogram, Moments, NpyWriter, QuantileSketch, iter_grid_blocks, stream_grid
+from payoffs import put_payoff
+from surface_cache import exact_fields
+
+S, K, T = np.linspace(50, 150, 23), np.linspace(60, 140, 17), np.linspace(0.05, 2.0, 11)
+
+
+def _full_grid(field):
+    S_g, K_g, T_g = S[:, None, None], K[None, :, None], T[None, None, :]
+    if field == "put_payoff":
+        return np.broadcast_to(put_payoff(S_g, K_g), (len(S), len(K), len(T)))
+    return exact_fields(S_g, K_g, 0.05, T_g, 0.2, [field])[field]
+
+
+# Blocos de vários planos, de linhas parciais e de pedaços de uma linha
+@pytest.mark.parametrize("chunk_size", [1000, 50, 4])
+def test_blocks_cover_grid_in_order(chunk_size):
+    full = _full_grid("call").reshape(-1)
+    position = 0
+    for start, block in iter_grid_blocks(S, K, T, ["call"], chunk_size=chunk_size):
+        assert start == position
+        np.testing.assert_allclose(block["call"], full[start:start + len(block["call"])])
+        position += len(block["call"])
+    assert position == full.size
+
+
+@pytest.mark.parametrize("field", ["call", "put_payoff"])
+@pytest.mark.parametrize("chunk_size", [1000, 50, 4])
+def test_reducers_match_full_grid(tmp_path, field, chunk_size):
+    full = _full_grid(field)
+    flat = full.reshape(-1)
+    path = str(tmp_path / "grid.npy")
+    reducers = {field: [Extrema(), Moments(), Histogram(0, 50, bins=10), QuantileSketch(0.01), NpyWriter(path, full.shape)]}
+    extrema, moments, histogram, sketch, written = stream_grid(S, K, T, reducers, chunk_size=chunk_size)[field]
+
+    # Os blocos são avaliados com outras formas de broadcast: iguais a menos de arredondamentos
+    for key in ["min", "max"]:
+        exact = getattr(flat, key)()
+        assert extrema[key] == pytest.approx(exact, rel=1e-9, abs=1e-12)
+        assert flat[extrema["arg" + key]] == pytest.approx(exact, rel=1e-9, abs=1e-12)
+    assert moments["count"] == flat.size
+    assert moments["mean"] == pytest.approx(flat.mean(), rel=1e-12)
+    assert moments["std"] == pytest.approx(flat.std(), rel=1e-9)
+
+    counts, _ = np.histogram(flat, histogram["edges"])
+    np.testing.assert_array_equal(histogram["counts"], counts)
+    assert histogram["below"] == (flat < 0).sum() and histogram["above"] == (flat > 50).sum()
+
+    for q, value in sketch.items():
+        exact = np.quantile(flat, q, method="inverted_cdf")
+        assert abs(value - exact) <= 0.01 * abs(exact) + 1e-9
+
+    assert written["elements"] == flat.size
+    np.testing.assert_array_equal(np.load(path, mmap_mode="r"), full.astype(np.float32))
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import kernels
+from chart_data import lttb
+from payoffs import call_payoff, put_payoff
+from pricing import black_scholes, black_scholes_greeks
+
+pytestmark = pytest.mark.skipif(not kernels.JIT_AVAILABLE, reason="numba não instalado")
+
+
+# Mesma função com o núcleo compilado e com NumPy
+def _both(monkeypatch, fn):
+    monkeypatch.setattr(kernels, "JIT_ENABLED", True)
+    jit = fn()
+    monkeypatch.setattr(kernels, "JIT_ENABLED", False)
+    return jit, fn()
+
+
+def test_black_scholes_matches_numpy(monkeypatch):
+    rng = np.random.default_rng(0)
+    n = 2 * kernels.JIT_MIN_SIZE
+    S, K = rng.uniform(50, 150, n), rng.uniform(60, 140, n)
+    T, vol = rng.uniform(0.05, 2.0, n), rng.uniform(0.1, 0.5, n)
+    jit, plain = _both(monkeypatch, lambda: black_scholes(S, K, 0.05, T, vol))
+    np.testing.assert_allclose(jit, plain, rtol=1e-10, atol=1e-12)
+
+    # Parâmetros escalares e grelha 2-D por broadcast
+    S_grid = np.linspace(50, 150, 200)[:, None]
+    K_grid = np.linspace(60, 140, 50)[None, :]
+    jit, plain = _both(monkeypatch, lambda: black_scholes_greeks(S_grid, K_grid, 0.05, 1.0, 0.2))
+    assert jit.keys() == plain.keys()
+    for name in plain:
+        assert jit[name].shape == plain[name].shape == (200, 50)
+        np.testing.assert_allclose(jit[name], plain[name], rtol=1e-10, atol=1e-12)
+
+
+def test_payoffs_match_numpy(monkeypatch):
+    S = np.linspace(0, 200, kernels.PAYOFF_JIT_MIN_SIZE + 1)
+    for payoff in (call_payoff, put_payoff):
+        jit, plain = _both(monkeypatch, lambda: payoff(S, 100.0))
+        np.testing.assert_array_equal(jit, plain)
+
+
+def test_lttb_matches_numpy(monkeypatch):
+    x = np.linspace(0, 10, 50_000)
+    y = np.sin(x) + np.random.default_rng(1).normal(0, 0.1, len(x))
+    jit, plain = _both(monkeypatch, lambda: lttb(x, y, 500).copy())
+    np.testing.assert_array_equal(jit, plain)
+    assert jit[0] == 0 and jit[-1] == len(x) - 1 and (np.diff(jit) > 0).all()
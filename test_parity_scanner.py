@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_files import read_frame
+from parity_scanner import sample_quotes, scan_parity
+
+R = 0.03
+
+
+# Referência em pandas: última cotação válida de cada chave e tipo, merge calls/puts
+def _pandas_scan(quotes, r, min_edge):
+    valid = quotes[(quotes["bid"] >= 0) & (quotes["ask"] >= quotes["bid"]) & (quotes["expiry"] > 0)]
+    latest = valid.drop_duplicates(["underlying", "expiry", "strike", "type"], keep="last")
+    key = ["underlying", "strike", "expiry"]
+    pairs = latest[latest["type"] == "call"].merge(latest[latest["type"] == "put"], on=key, suffixes=("_call", "_put"))
+    discounted_K = pairs["strike"] * np.exp(-r * pairs["expiry"])
+    conversion = pairs["bid_call"] - pairs["ask_put"] - pairs["spot_call"] + discounted_K
+    reversal = pairs["bid_put"] - pairs["ask_call"] + pairs["spot_call"] - discounted_K
+    pairs["edge"] = np.maximum(conversion, reversal)
+    return pairs, pairs[pairs["edge"] > min_edge]
+
+
+@pytest.fixture(scope="module")
+def quotes():
+    frame = sample_quotes(3_000, n_underlyings=5, violation_rate=0.05, r=R, seed=1)
+    # Cotações antigas de algumas chaves (substituídas pelas seguintes) e linhas inválidas
+    stale = frame.sample(300, random_state=2).assign(bid=0.0, ask=1000.0)
+    invalid = frame.sample(50, random_state=3).assign(ask=-1.0)
+    return pd.concat([stale, frame, invalid], ignore_index=True)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+@pytest.mark.parametrize("max_partition_rows", [1_000_000, 200])
+def test_scan_matches_pandas_merge(tmp_path, quotes, suffix, max_partition_rows):
+    path = tmp_path / ("quotes" + suffix)
+    quotes.to_csv(path, index=False) if suffix == ".csv" else quotes.to_parquet(path, index=False)
+    table, stats = scan_parity(str(path), R, min_edge=0.0, top=50, chunk_rows=700, n_partitions=4,
+                               max_partition_rows=max_partition_rows)
+    # A referência lê o mesmo ficheiro (o CSV arredonda os vencimentos fracionários)
+    pairs, hits = _pandas_scan(read_frame(str(path)), R, 0.0)
+
+    assert stats["quotes"] == len(quotes)
+    # Com o limite baixo, as 4 partições iniciais são repartidas
+    assert (stats["partitions"] > 4) == (max_partition_rows < len(quotes) / 4)
+    assert stats["valid_quotes"] == len(quotes) - 50
+    assert stats["pairs"] == len(pairs)
+    assert stats["violations"] == len(hits) > 0
+    expected = hits.sort_values("edge", ascending=False).head(50)
+    np.testing.assert_allclose(table["edge"], expected["edge"], rtol=1e-12)
+    merged = table.merge(expected, on=["underlying", "strike", "expiry"], suffixes=("", "_pandas"))
+    assert len(merged) == len(table)
+    np.testing.assert_allclose(merged["edge"], merged["edge_pandas"], rtol=1e-12)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from payoffs import (
+    asian_payoff, asset_or_nothing_payoff, barrier_payoff, call_payoff, cash_or_nothing_payoff, monte_carlo_price,
+    put_payoff, simulate_gbm_paths,
+)
+from pricing import barrier_price, black_scholes, geometric_asian_price
+
+S0, R, VOL, T = 100.0, 0.05, 0.2, 1.0
+N_STEPS = 50
+
+
+@pytest.fixture(scope="module")
+def paths():
+    return simulate_gbm_paths(S0, R, VOL, T, n_paths=20_000, n_steps=N_STEPS, rng=np.random.default_rng(0))
+
+
+@pytest.mark.parametrize("option", ["call", "put"])
+@pytest.mark.parametrize("direction, barrier", [("up", 120.0), ("down", 85.0)])
+def test_barrier_in_plus_out_is_vanilla(paths, option, direction, barrier):
+    knocked_in = barrier_payoff(paths, 100.0, barrier, f"{direction}-and-in", option)
+    knocked_out = barrier_payoff(paths, 100.0, barrier, f"{direction}-and-out", option)
+    vanilla = (call_payoff if option == "call" else put_payoff)(paths.terminal, 100.0)
+    np.testing.assert_allclose(knocked_in + knocked_out, vanilla)
+    assert (knocked_in > 0).any() and (knocked_out > 0).any()
+
+
+def test_monte_carlo_matches_black_scholes(paths):
+    call, put = black_scholes(S0, 100.0, R, T, VOL)
+    for payoff, exact in ((call_payoff(paths.terminal, 100.0), call), (put_payoff(paths.terminal, 100.0), put)):
+        price, stderr = monte_carlo_price(payoff, R, T)
+        assert abs(price - exact) < 4 * stderr
+
+
+def test_geometric_asian_matches_closed_form(paths):
+    for option in ("call", "put"):
+        price, stderr = monte_carlo_price(asian_payoff(paths, 100.0, "geometric", option), R, T)
+        assert abs(price - geometric_asian_price(S0, 100.0, R, T, VOL, N_STEPS, option)) < 4 * stderr
+
+
+# Monitorização discreta vs fórmula contínua: barreira deslocada de exp(±0.5826 σ √dt)
+# (correção de Broadie-Glasserman-Kou)
+@pytest.mark.parametrize("kind, barrier", [("up-and-out", 130.0), ("up-and-in", 130.0), ("down-and-out", 85.0), ("down-and-in", 85.0)])
+def test_barrier_matches_closed_form(paths, kind, barrier):
+    shift = np.exp(0.5826 * VOL * np.sqrt(T / N_STEPS))
+    continuous = barrier * shift if kind.startswith("up") else barrier / shift
+    price, stderr = monte_carlo_price(barrier_payoff(paths, 100.0, barrier, kind, "call"), R, T)
+    assert abs(price - barrier_price(S0, 100.0, R, T, VOL, continuous, kind, "call")) < 4 * stderr + 0.02
+
+
+def test_geometric_asian_below_arithmetic(paths):
+    assert (asian_payoff(paths, 100.0, "geometric") <= asian_payoff(paths, 100.0, "arithmetic") + 1e-12).all()
+
+
+def test_digitals_replicate_vanilla():
+    S = np.linspace(50, 150, 101)
+    for option, vanilla in (("call", call_payoff(S, 100.0)), ("put", put_payoff(S, 100.0))):
+        sign = 1 if option == "call" else -1
+        replicated = sign * (asset_or_nothing_payoff(S, 100.0, option) - 100.0 * cash_or_nothing_payoff(S, 100.0, option=option))
+        np.testing.assert_allclose(replicated, vanilla)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from portfolio import Portfolio, sample_portfolio
+
+
+def _offsetting_book():
+    # +10 calls compradas a 5 e -10 vendidas a 6: quantidade líquida nula, 10€ realizados
+    return Portfolio(["A", "A"], ["call", "call"], [100, 100], [1.0, 1.0], [10, -10], [5.0, 6.0], [100, 100])
+
+
+def test_net_keeps_realized_cash_of_closed_legs():
+    book = _offsetting_book()
+    netted = book.net()
+    assert book.aggregate_risk(0.03, 0.2)["pnl"].iloc[0] == pytest.approx(10)
+    assert netted.aggregate_risk(0.03, 0.2)["pnl"].iloc[0] == pytest.approx(10)
+    assert netted.aggregate_risk(0.03, 0.2)["positions"].iloc[0] == 0
+
+    shocks = np.linspace(-0.5, 0.5, 11)
+    _, raw_profit = book.aggregate_payoff(shocks)
+    _, net_profit = netted.aggregate_payoff(shocks)
+    np.testing.assert_allclose(net_profit, raw_profit)
+    np.testing.assert_allclose(net_profit, 10)
+
+
+def test_net_preserves_aggregates_of_sample_book():
+    book = sample_portfolio(n_positions=5_000, n_underlyings=5)
+    netted = book.net()
+    assert len(netted) < len(book)
+
+    risk, net_risk = book.aggregate_risk(0.03, 0.25), netted.aggregate_risk(0.03, 0.25)
+    for column in ["value", "delta", "pnl"]:
+        np.testing.assert_allclose(net_risk[column], risk[column], rtol=1e-9, atol=1e-6)
+
+    shocks = np.linspace(-0.5, 0.5, 21)
+    np.testing.assert_allclose(netted.aggregate_payoff(shocks)[1], book.aggregate_payoff(shocks)[1], atol=1e-6)
@@ -0,0 +1,26 @@
+import time
+import tracemalloc
+
+# Medições partilhadas pelos benchmarks das linhas de comando dos módulos
+
+
+# Melhor tempo de várias repetições (menos sensível a ruído do que a média), com o resultado
+# da última chamada
+def best_time(fn, repeat=5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+# Memória alocada por fn: a que fica retida no fim (current) e o pico durante a chamada
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
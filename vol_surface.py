@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import least_squares
+
+from data_files import read_frame
+
+# Superfície de volatilidade: uma fatia SVI (parametrização "raw") por maturidade,
+# com interpolação linear da variância total entre maturidades.
+#
+#   w(k) = a + b * (rho * (k - m) + sqrt((k - m)^2 + s^2)),   k = ln(K / F)
+#
+# Os parâmetros de cada fatia são guardados numa matriz (n_maturidades x 5) para que
+# a avaliação sobre grelhas inteiras de (K, T) seja feita sem ciclos Python.
+
+SVI_LOWER = np.array([-1.0, 0.0, -0.999, -2.0, 1e-4])
+SVI_UPPER = np.array([4.0, 5.0, 0.999, 2.0, 5.0])
+
+QUOTE_COLUMNS = ["maturity", "strike", "implied_vol"]
+
+
+def svi_total_variance(k, params):
+    a, b, rho, m, s = (params[..., i] for i in range(5))
+    x = k - m
+    return a + b * (rho * x + np.sqrt(x**2 + s**2))
+
+
+class VolSurface:
+    def __init__(self, maturities, params, spot, rate):
+        order = np.argsort(maturities)
+        self.maturities = np.asarray(maturities, dtype=float)[order]
+        self.params = np.asarray(params, dtype=float).reshape(-1, 5)[order]
+        self.spot = float(spot)
+        self.rate = float(rate)
+
+    def log_moneyness(self, K, T):
+        return np.log(K / (self.spot * np.exp(self.rate * T)))
+
+    # Variância total w(K, T) para quaisquer arrays K e T (com broadcasting)
+    def total_variance(self, K, T):
+        K, T = np.broadcast_arrays(np.asarray(K, dtype=float), np.asarray(T, dtype=float))
+        k = self.log_moneyness(K, T)
+
+        # Fatias vizinhas de cada ponto; fora do intervalo de maturidades usa-se a fatia
+        # extrema com volatilidade constante (w proporcional a T)
+        n = len(self.maturities)
+        idx = np.searchsorted(self.maturities, T)
+        lo = np.clip(idx - 1, 0, n - 1)
+        hi = np.clip(idx, 0, n - 1)
+
+        w_lo = svi_total_variance(k, self.params[lo])
+        w_hi = svi_total_variance(k, self.params[hi])
+        T_lo = self.maturities[lo]
+        T_hi = self.maturities[hi]
+
+        same = lo == hi
+        weight = np.where(same, 0.0, (T - T_lo) / np.where(same, 1.0, T_hi - T_lo))
+        w = np.where(same, w_lo * T / T_lo, (1 - weight) * w_lo + weight * w_hi)
+        return np.maximum(w, 1e-12)
+
+    def implied_vol(self, K, T):
+        T = np.asarray(T, dtype=float)
+        return np.sqrt(self.total_variance(K, T) / T)
+
+    # Parâmetros de arranque para as maturidades pedidas (fatia mais próxima)
+    def nearest_params(self, maturities):
+        idx = np.abs(self.maturities[None, :] - np.asarray(maturities)[:, None]).argmin(axis=1)
+        return self.params[idx]
+
+
+# Superfície sintética usada quando não há cotações carregadas (ATM ≈ 20%)
+def default_vol_surface(spot, rate, atm_vol=0.2):
+    maturities = np.array([0.1, 0.25, 0.5, 1.0, 2.0])
+    b = 0.1 * np.sqrt(maturities)
+    s = np.full_like(maturities, 0.15)
+    a = atm_vol**2 * maturities - b * s
+    params = np.column_stack([a, b, np.full_like(maturities, -0.2), np.zeros_like(maturities), s])
+    return VolSurface(maturities, params, spot, rate)
+
+
+def load_quotes(file):
+    quotes = read_frame(file)
+    quotes.columns = [str(c).strip().lower() for c in quotes.columns]
+    missing = [c for c in QUOTE_COLUMNS if c not in quotes.columns]
+    if missing:
+        raise ValueError(f"Colunas em falta no ficheiro de cotações: {', '.join(missing)}")
+
+    quotes = quotes[QUOTE_COLUMNS].apply(pd.to_numeric, errors="coerce").dropna()
+    quotes = quotes[(quotes["maturity"] > 0) & (quotes["strike"] > 0) & (quotes["implied_vol"] > 0)]
+    if quotes.empty:
+        raise ValueError("O ficheiro de cotações não contém linhas válidas")
+    return quotes
+
+
+def _initial_params(k, w, slice_idx, n_slices):
+    # Arranque heurístico: ATM pela variância mínima observada em cada fatia
+    w_min = np.full(n_slices, np.inf)
+    np.minimum.at(w_min, slice_idx, w)
+    b = np.full(n_slices, 0.1)
+    s = np.full(n_slices, 0.1)
+    a = w_min - b * s
+    return np.column_stack([a, b, np.full(n_slices, -0.3), np.zeros(n_slices), s])
+
+
+# Calibração de todas as fatias num único problema de mínimos quadrados vetorizado.
+# O jacobiano é analítico e esparso em blocos (cada cotação só depende da sua fatia).
+# Se `previous` for dada, a calibração parte dos parâmetros dessa superfície.
+def calibrate_vol_surface(quotes, spot, rate, previous=None):
+    T = quotes["maturity"].to_numpy(dtype=float)
+    K = quotes["strike"].to_numpy(dtype=float)
+    iv = quotes["implied_vol"].to_numpy(dtype=float)
+
+    maturities, slice_idx = np.unique(T, return_inverse=True)
+    n_slices = len(maturities)
+    k = np.log(K / (spot * np.exp(rate * T)))
+    w_obs = iv**2 * T
+    scale = 1.0 / T
+
+    if previous is not None:
+        x0 = previous.nearest_params(maturities)
+    else:
+        x0 = _initial_params(k, w_obs, slice_idx, n_slices)
+    lower = np.tile(SVI_LOWER, n_slices)
+    upper = np.tile(SVI_UPPER, n_slices)
+    eps = 1e-9 * (upper - lower)
+    x0 = np.clip(x0.ravel(), lower + eps, upper - eps)
+
+    rows = np.repeat(np.arange(len(k)), 5)
+    cols = (5 * slice_idx[:, None] + np.arange(5)).ravel()
+
+    def residuals(x):
+        p = x.reshape(n_slices, 5)[slice_idx]
+        return (svi_total_variance(k, p) - w_obs) * scale
+
+    def jacobian(x):
+        p = x.reshape(n_slices, 5)[slice_idx]
+        b, rho, m, s = p[:, 1], p[:, 2], p[:, 3], p[:, 4]
+        dx = k - m
+        root = np.sqrt(dx**2 + s**2)
+        grads = np.column_stack([
+            np.ones_like(k),
+            rho * dx + root,
+            b * dx,
+            -b * (rho + dx / root),
+            b * s / root,
+        ]) * scale[:, None]
+        return sparse.csr_matrix((grads.ravel(), (rows, cols)), shape=(len(k), 5 * n_slices))
+
+    result = least_squares(residuals, x0, jac=jacobian, bounds=(lower, upper), method="trf")
+    return VolSurface(maturities, result.x.reshape(n_slices, 5), spot, rate)